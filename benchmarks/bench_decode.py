@@ -0,0 +1,80 @@
+"""
+compares the precompiled tag decoders with the former dynamic dispatch
+
+usage: python benchmarks/bench_decode.py
+"""
+import struct
+import timeit
+
+from pywaterkotte.ecotouch import EcotouchTags, ReadPlan, TagData
+
+
+def legacy_parse(tag, vals):
+    """TagData.parse_value up to version 0.1.2"""
+    if tag.read_function is not TagData._parse_value_default:
+        return tag.read_function(tag, vals)
+    first_tag = tag.tags[0]
+    first_val = vals[0]
+    if first_tag.startswith("A"):
+        if len(tag.tags) == 1:
+            return float(first_val) / 10.0
+        ivals = [int(str_val) & 0xFFFF for str_val in vals]
+        hex_string = f"{ivals[0]:04x}{ivals[1]:04x}"
+        return struct.unpack("!f", bytes.fromhex(hex_string))[0]
+    if first_tag.startswith("I"):
+        if tag.bit is not None:
+            return (int(first_val) & (1 << tag.bit)) > 0
+        return int("".join(vals))
+    if first_tag.startswith("D"):
+        return first_val == "1"
+    raise Exception("Invalid tag type")
+
+
+CASES = {
+    "scaled A": (EcotouchTags.OUTSIDE_TEMPERATURE, ["86"]),
+    "float32 pair": (EcotouchTags.HOT_WATER_ENERGY_PRODUCED_YEAR, ["17877", "-17979"]),
+    "bitfield": (EcotouchTags.STATE_COMPRESSOR, ["170"]),
+    "boolean": (EcotouchTags.HOLIDAY_ENABLED, ["1"]),
+    "time": (EcotouchTags.HOLIDAY_START_TIME, ["19", "3", "1", "18", "2"]),
+    "firmware": (EcotouchTags.FIRMWARE_VERSION, ["10896"]),
+}
+
+
+def best(func, number=20000, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e9
+
+
+def main():
+    print(f"{'decoder':>14} {'legacy ns':>10} {'compiled ns':>12} {'speedup':>8}")
+    for name, (tag, vals) in CASES.items():
+        assert legacy_parse(tag, vals) == tag.parse_value(vals)
+        legacy = best(lambda: legacy_parse(tag, vals))
+        compiled = best(lambda: tag.decoder(vals))
+        print(f"{name:>14} {legacy:10.0f} {compiled:12.0f} {legacy / compiled:7.2f}x")
+
+    tags = [
+        value
+        for value in vars(EcotouchTags).values()
+        if isinstance(value, TagData)
+        and value.read_function is TagData._parse_value_default
+    ]
+    plan = ReadPlan(tags)
+    values = ["1"] * len(plan.registers)
+    register_values = dict(zip(plan.registers, values))
+
+    def legacy_batch():
+        return {
+            tag: legacy_parse(tag, [register_values[reg] for reg in tag.tags])
+            for tag in tags
+        }
+
+    legacy = best(legacy_batch, number=2000)
+    compiled = best(lambda: plan.decode(values), number=2000)
+    print(
+        f"{'plan batch':>14} {legacy:10.0f} {compiled:12.0f} {legacy / compiled:7.2f}x"
+        f"  ({len(tags)} tags)"
+    )
+
+
+if __name__ == "__main__":
+    main()
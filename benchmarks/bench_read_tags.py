@@ -0,0 +1,45 @@
+"""
+compares the single pass readTags parser with the former regex loop
+
+usage: python benchmarks/bench_read_tags.py [number of tags]
+"""
+import re
+import sys
+import timeit
+
+from pywaterkotte.protocol import check_tag_records, parse_tag_records
+
+
+def regex_loop(text, tags):
+    """the parser used by Ecotouch._read_tags up to version 0.1.2"""
+    results = {}
+    for tag in tags:
+        match = re.search(
+            rf"#{tag}\t(?P<status>[A-Z_]+)\n\d+\t(?P<value>\-?\d+)",
+            text,
+            re.MULTILINE,
+        )
+        if match is None:
+            raise Exception("tag not found in response")
+        results[tag] = match.group("value")
+    return results
+
+
+def single_pass(text, tags):
+    return check_tag_records(parse_tag_records(text.splitlines()), tags)
+
+
+def main(no_tags=75, repeat=5, number=200):
+    tags = [f"A{i}" for i in range(1, no_tags + 1)]
+    text = "".join(f"#{tag}\tS_OK\n192\t{i * 7}\n" for i, tag in enumerate(tags))
+    assert regex_loop(text, tags) == single_pass(text, tags)
+
+    for name, func in (("regex loop", regex_loop), ("single pass", single_pass)):
+        best = min(
+            timeit.repeat(lambda: func(text, tags), repeat=repeat, number=number)
+        )
+        print(f"{name:>12}: {best / number * 1e6:10.1f} us per response")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 75)
@@ -0,0 +1,80 @@
+"""
+compares the single pass dictionary.js tokenizer with the former regex passes
+
+The dictionary is generated from the entries of tests/fixtures/dictionary.js,
+repeated under new keys, to the size of the file served by the heatpump.
+
+usage: python benchmarks/bench_translations.py [number of entries]
+"""
+import os
+import re
+import sys
+import timeit
+
+from pywaterkotte.translations import parse_translations
+
+FIXTURE = os.path.join(
+    os.path.dirname(__file__), os.pardir, "tests", "fixtures", "dictionary.js"
+)
+
+
+def legacy_parse(text):
+    """Ecotouch.init_translations up to version 0.1.2"""
+    translation_regex = r'[^"]*'
+
+    def replace_unicode(match):
+        char_bytes = ord(match.group(1)).to_bytes(2, "little") + int(
+            match.group(2), 16
+        ).to_bytes(2, "little")
+        return char_bytes.decode("utf-16")
+
+    def replace_x_code(match):
+        return int(match.group(1), 16).to_bytes(2, "little").decode("utf-16")
+
+    text = re.sub(r"\\x([0-9a-fA-F]{2})", replace_x_code, text)
+    text = re.sub(r"(\w)\\u(\d{4})", replace_unicode, text)
+    translations = {}
+    for match in re.findall(
+        rf'lng([\w\d]+)=\["({translation_regex})","({translation_regex})","({translation_regex})"]',
+        text,
+    ):
+        translations[match[0]] = (match[1], match[2], match[3])
+    for match in re.findall(
+        rf'lng([\w\d]+)=\["({translation_regex})","({translation_regex})"]', text
+    ):
+        translations[match[0]] = (match[1], match[2], None)
+    for match in re.findall(rf'lng([\w\d]+)="({translation_regex})"', text):
+        translations[match[0]] = (match[1], match[1], match[1])
+    for match in re.findall(r"lng([\w\d]+)=lng([\w\d]+)", text):
+        if match[1] in translations:
+            translations[match[0]] = translations[match[1]]
+    return translations
+
+
+def generate_dictionary(no_entries):
+    with open(FIXTURE, encoding="utf-8") as fixture:
+        lines = [
+            line.strip()
+            for line in fixture
+            if line.startswith("var lng") and '\\"' not in line
+        ]
+    entries = []
+    for i in range(no_entries):
+        line = lines[i % len(lines)]
+        entries.append(re.sub(r"lng(\w+)", lambda m: f"lng{m.group(1)}_{i}", line, 1))
+    return "\n".join(entries)
+
+
+def main(no_entries=8000, repeat=5, number=5):
+    text = generate_dictionary(no_entries)
+    print(f"dictionary: {no_entries} entries, {len(text) / 1024:.0f} KiB")
+    for name, func in (
+        ("regex passes", legacy_parse),
+        ("tokenizer", parse_translations),
+    ):
+        best = min(timeit.repeat(lambda: func(text), repeat=repeat, number=number))
+        print(f"{name:>13}: {best / number * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8000)
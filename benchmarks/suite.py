@@ -0,0 +1,279 @@
+"""
+benchmark suite of the client hot paths
+
+Runs offline: HTTP requests are answered in-process by a transport adapter,
+the end-to-end benchmark uses the local simulator. Results are written as
+JSON and compared against a stored baseline; a benchmark whose best time got
+slower than the baseline by more than the tolerance is reported as a
+regression and makes the suite exit with status 1. Baselines are only
+comparable on the same machine and Python version.
+
+usage: python benchmarks/suite.py [-k filter] [--json results.json]
+       [--baseline benchmarks/baseline.json] [--save-baseline] [--quick]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+
+from pywaterkotte.ecotouch import Ecotouch, EcotouchTags, ReadPlan, TagData
+from pywaterkotte.protocol import check_tag_records, parse_tag_records
+from pywaterkotte.simulator import Simulator, default_registers
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+FIXTURE = os.path.join(
+    os.path.dirname(__file__), os.pardir, "tests", "fixtures", "dictionary.js"
+)
+TOLERANCE = 0.25
+
+ALL_TAGS = [tag for tag in vars(EcotouchTags).values() if isinstance(tag, TagData)]
+REGISTERS = default_registers()
+
+BENCHMARKS: List[Tuple[str, Callable[[], Callable[[], object]]]] = []
+
+
+def benchmark(name: str):
+    """registers a setup function returning the function to time"""
+
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+
+    return register
+
+
+def generate_dictionary(no_entries: int = 8000) -> str:
+    """dictionary.js of the size served by the heatpump, generated from the
+    entries of the test fixture repeated under new keys"""
+    with open(FIXTURE, encoding="utf-8") as fixture:
+        lines = [line.strip() for line in fixture if line.startswith("var lng")]
+    return "\n".join(
+        re.sub(r"lng(\w+)", rf"lng\g<1>_{i}", lines[i % len(lines)], count=1)
+        for i in range(no_entries)
+    )
+
+
+class CannedAdapter(BaseAdapter):
+    """answers the requests of an Ecotouch in-process, without sockets"""
+
+    def __init__(self, registers: Dict[str, str], dictionary: str = ""):
+        super().__init__()
+        self.registers = registers
+        self.dictionary = dictionary
+
+    def send(self, request, stream=False, **kwargs):
+        url = urlsplit(request.url)
+        params = dict(parse_qsl(url.query))
+        if url.path == "/cgi/readTags":
+            body = "".join(
+                f"#{tag}\tS_OK\n192\t{self.registers.get(tag, '0')}\n"
+                for key, tag in params.items()
+                if key[:1] == "t"
+            )
+        elif url.path == "/easycon/js/dictionary.js":
+            body = self.dictionary
+        else:
+            body = "1\n#S_OK\nIDALToken=1"
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.encoding = "latin-1"
+        response.raw = io.BytesIO(body.encode("latin-1", errors="replace"))
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def canned_ecotouch(dictionary: str = "") -> Ecotouch:
+    session = requests.Session()
+    session.mount("http://", CannedAdapter(REGISTERS, dictionary))
+    return Ecotouch("heatpump", session=session)
+
+
+def _parse_setup(no_tags: int):
+    tags = [f"A{i}" for i in range(1, no_tags + 1)]
+    lines = "".join(f"#{tag}\tS_OK\n192\t{i * 7}\n" for i, tag in enumerate(tags))
+    lines = lines.splitlines()
+    return lambda: check_tag_records(parse_tag_records(lines), tags)
+
+
+def _read_tags_setup(no_tags: int):
+    tags = [f"A{i}" for i in range(1, no_tags + 1)]
+    ecotouch = canned_ecotouch()
+    return lambda: ecotouch._read_tags(tags)
+
+
+for _no_tags in (1, 75, 750):
+    benchmark(f"parse_tags/{_no_tags}")(lambda no_tags=_no_tags: _parse_setup(no_tags))
+    benchmark(f"read_tags/{_no_tags}")(
+        lambda no_tags=_no_tags: _read_tags_setup(no_tags)
+    )
+
+DECODE_CASES = {
+    "scaled_a": (EcotouchTags.OUTSIDE_TEMPERATURE, ["86"]),
+    "float32_pair": (EcotouchTags.HOT_WATER_ENERGY_PRODUCED_YEAR, ["17877", "-17979"]),
+    "bitfield": (EcotouchTags.STATE_COMPRESSOR, ["170"]),
+    "integer": (EcotouchTags.ADAPT_HEATING, ["3"]),
+    "boolean": (EcotouchTags.HOLIDAY_ENABLED, ["1"]),
+    "time": (EcotouchTags.HOLIDAY_START_TIME, ["19", "3", "1", "18", "2"]),
+    "firmware": (EcotouchTags.FIRMWARE_VERSION, ["10896"]),
+    "bios_date": (EcotouchTags.BIOS_DATE, ["14092"]),
+}
+
+for _name, (_tag, _vals) in DECODE_CASES.items():
+    benchmark(f"parse_value/{_name}")(
+        lambda tag=_tag, vals=_vals: lambda: tag.parse_value(vals)
+    )
+
+
+@benchmark("read_values/all_tags")
+def _read_values_all():
+    ecotouch = canned_ecotouch()
+    plan = ReadPlan(ALL_TAGS)
+    return lambda: ecotouch.read_values(plan)
+
+
+@benchmark("read_values/plan")
+def _read_values_plan():
+    registers = [f"A{i}" for i in range(1, 751)]
+    tags = [TagData([register]) for register in registers]
+    return lambda: ReadPlan(tags)
+
+
+def _bulk_setup(bulk: bool):
+    from pywaterkotte.vectorized import BulkDecoder, to_int_array
+
+    tags = [TagData([f"A{i}"]) for i in range(1, 701)]
+    tags += [TagData(["I51"], bit=bit) for bit in range(16)]
+    tags += [TagData([f"A{i}", f"A{i + 1}"]) for i in range(701, 768, 2)]
+    plan = ReadPlan(tags)
+    values = [str(i * 7) for i in range(len(plan.registers))]
+    if not bulk:
+        return lambda: plan.decode(values)
+    decoder = BulkDecoder(plan)
+    return lambda: decoder.decode(to_int_array(values))
+
+
+benchmark("decode/750/plan")(lambda: _bulk_setup(False))
+benchmark("decode/750/bulk")(lambda: _bulk_setup(True))
+
+
+@benchmark("init_translations")
+def _init_translations():
+    ecotouch = canned_ecotouch(generate_dictionary())
+    return ecotouch.init_translations
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """best and median time of one call in microseconds"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = [total / number * 1e6 for total in timer.repeat(repeat, number)]
+    return {"best": min(times), "median": statistics.median(times)}
+
+
+def measure_end_to_end(polls: int, latency: float) -> Dict[str, float]:
+    """latency of polling all tags from the local simulator in microseconds"""
+    plan = ReadPlan(ALL_TAGS)
+    with Simulator(latency=latency) as simulator, Ecotouch(simulator.host) as wp:
+        wp.login()
+        wp.read_values(plan)
+        times = []
+        for _ in range(polls):
+            start = time.perf_counter()
+            wp.read_values(plan)
+            times.append((time.perf_counter() - start) * 1e6)
+    times.sort()
+    return {
+        "best": times[0],
+        "median": statistics.median(times),
+        "p95": times[int(len(times) * 0.95)],
+        "p99": times[int(len(times) * 0.99)],
+    }
+
+
+def run(pattern: Optional[str], quick: bool) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, setup in BENCHMARKS:
+        if pattern and not re.search(pattern, name):
+            continue
+        results[name] = measure(setup(), repeat=3 if quick else 7)
+        print(f"{name:<28} {results[name]['median']:12.2f} us", file=sys.stderr)
+    name = "end_to_end/poll"
+    if not pattern or re.search(pattern, name):
+        results[name] = measure_end_to_end(polls=20 if quick else 200, latency=0.0)
+        print(
+            f"{name:<28} {results[name]['median']:12.2f} us"
+            f"  (p95 {results[name]['p95']:.0f} us)",
+            file=sys.stderr,
+        )
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """names of the benchmarks slower than the baseline by more than tolerance
+
+    The best of the repetitions is compared, as it is the least noisy."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["best"] / baseline[name]["best"]
+        marker = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            marker = "  REGRESSION"
+        print(f"{name:<28} {ratio:6.2f}x baseline{marker}", file=sys.stderr)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="benchmark suite of pywaterkotte")
+    parser.add_argument("-k", dest="pattern", help="only run matching benchmarks")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--quick", action="store_true", help="fewer repetitions")
+    args = parser.parse_args(argv)
+
+    output = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": run(args.pattern, args.quick),
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(output, json_file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as json_file:
+            json.dump(output, json_file, indent=2)
+            json_file.write("\n")
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, encoding="utf-8") as json_file:
+        baseline = json.load(json_file)
+    return 1 if compare(output["results"], baseline["results"], args.tolerance) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
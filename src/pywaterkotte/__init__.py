@@ -1,5 +1,7 @@
 name = "pywaterkotte"
 
+from .cache import RegisterCache
+from .chunking import ChunkSizer
 from .ecotouch import (
     AuthenticationException,
     ConnectionException,
@@ -7,5 +9,16 @@ from .ecotouch import (
     EcotouchTags,
     InvalidResponseException,
     InvalidValueException,
+    ReadPlan,
+    SessionExpiredException,
     TagData,
+    create_session,
 )
+from .fleet import DeviceResult, FleetPoller, FleetStats
+from .instrumentation import Metrics, Observer
+from .metadata import MetadataCache
+from .performance import PerformanceTracker
+from .priority import RequestScheduler
+from .recorder import Recorder
+from .registry import TagRegistry
+from .protocol import TagRecord, TagStatusException, WriteException
@@ -0,0 +1,346 @@
+"""
+asyncio client for waterkotte ecotouch heatpumps (requires aiohttp)
+"""
+import asyncio
+import random
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import aiohttp
+
+from .ecotouch import (
+    BACKOFF,
+    CONNECT_TIMEOUT,
+    MAX_BACKOFF,
+    MAX_NO_TAGS,
+    READ_TIMEOUT,
+    RETRIES,
+    EcotouchTags,
+    ReadPlan,
+    TagData,
+    parse_heatpump_types,
+    split_chunks,
+)
+from .exceptions import (
+    AuthenticationException,
+    ConnectionException,
+    InvalidValueException,
+    SessionExpiredException,
+)
+from .metadata import MetadataCache
+from .protocol import (
+    TagRecord,
+    WriteException,
+    check_tag_records,
+    check_write_records,
+    pack_write_chunks,
+    parse_status,
+    parse_tag_records,
+    read_tags_params,
+    write_tags_params,
+)
+from .translations import TranslationTable, parse_translations
+
+MAX_CONCURRENCY = 2
+
+
+class AsyncEcotouch:
+    """asyncio counterpart of Ecotouch.
+
+    Chunks of large reads are requested concurrently, but never more than
+    ``max_concurrency`` requests are sent to the heatpump at the same time.
+    Failed readTags/writeTags requests are retried and expired sessions
+    renewed like Ecotouch does (see ``retries``, ``backoff``,
+    ``max_backoff`` and ``poll_deadline`` there)."""
+
+    def __init__(
+        self,
+        host,
+        session: Optional[aiohttp.ClientSession] = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        metadata_cache: Optional[MetadataCache] = None,
+        retries: int = RETRIES,
+        backoff: float = BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+        poll_deadline: Optional[float] = None,
+    ):
+        self.hostname = host
+        self.language_dictionary = None
+        self.hp_type_csv = None
+        self.metadata_cache = metadata_cache
+        self._firmware_key: Optional[str] = None
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_deadline = poll_deadline
+        self._credentials: Optional[Tuple[str, str]] = None
+        # number of logins, so concurrent requests log in again only once
+        self._logins = 0
+        self._login_lock: Optional[asyncio.Lock] = None
+        self._owns_session = session is None
+        self._session = session
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """closes the session if it is owned by this instance"""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """the session is created lazily as it has to live inside the event loop"""
+        if self._session is None:
+            # the heatpump is usually addressed by its ip address, which the
+            # default cookie jar does not accept cookies from
+            self._session = aiohttp.ClientSession(
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT
+                ),
+            )
+        return self._session
+
+    async def _get(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[aiohttp.ClientTimeout] = None,
+    ) -> str:
+        """sends a GET request to the heatpump and returns the body"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            async with self._semaphore:
+                async with self.session.get(
+                    f"http://{self.hostname}{path}", params=params, timeout=timeout
+                ) as response:
+                    if response.status >= 400:
+                        raise ConnectionException(
+                            f"heatpump returned {response.status} {response.reason}"
+                        )
+                    return await response.text(encoding="latin-1")
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as conn_error:
+            raise ConnectionException("could not connect to heatpump") from conn_error
+
+    async def login(self, username="waterkotte", password="waterkotte"):
+        """performs a login. Has to be called before any other method."""
+        text = await self._get(
+            "/cgi/login", params={"username": username, "password": password}
+        )
+        status = parse_status(text)
+        if status != "S_OK":
+            raise AuthenticationException(f"login error: {status}")
+        self._credentials = (username, password)
+        self._logins += 1
+        self._firmware_key = None
+
+    def _deadline(self) -> Optional[float]:
+        """monotonic time at which the current poll has to give up"""
+        if self.poll_deadline is None:
+            return None
+        return time.monotonic() + self.poll_deadline
+
+    def _request_timeout(
+        self, deadline: Optional[float]
+    ) -> Optional[aiohttp.ClientTimeout]:
+        """the timeout of the next request, shortened to meet the deadline"""
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ConnectionException(
+                f"no response within the deadline of {self.poll_deadline}s"
+            )
+        return aiohttp.ClientTimeout(
+            total=remaining,
+            sock_connect=min(CONNECT_TIMEOUT, remaining),
+            sock_read=min(READ_TIMEOUT, remaining),
+        )
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """exponential backoff with jitter, so heatpumps are not hit in lockstep"""
+        delay = min(self.max_backoff, self.backoff * 2**attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _login_again(self, logins: int):
+        """repeats the last login, unless another request did since ``logins``"""
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        async with self._login_lock:
+            if self._logins == logins:
+                await self.login(*self._credentials)
+
+    async def _request_records(
+        self, path: str, params: Dict[str, Any], deadline: Optional[float] = None
+    ) -> Dict[str, TagRecord]:
+        """sends a readTags/writeTags request and parses the response,
+        retrying failed requests and logging in again if the session expired"""
+        attempt = 0
+        logged_in_again = False
+        while True:
+            logins = self._logins
+            try:
+                text = await self._get(path, params, self._request_timeout(deadline))
+                return parse_tag_records(text.splitlines())
+            except SessionExpiredException:
+                if self._credentials is None or logged_in_again:
+                    raise
+                logged_in_again = True
+                await self._login_again(logins)
+            except ConnectionException:
+                delay = self._backoff_delay(attempt)
+                if attempt >= self.retries or (
+                    deadline is not None and time.monotonic() + delay >= deadline
+                ):
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def init_translations(self):
+        """initializes value-names: key: (de, en, fr)"""
+        return TranslationTable.from_json(
+            await self._cached_metadata(
+                "translations",
+                "/easycon/js/dictionary.js",
+                lambda text: parse_translations(text).to_json(),
+            )
+        )
+
+    async def firmware_key(self) -> str:
+        """firmware version and build (see Ecotouch.firmware_key)"""
+        if self._firmware_key is None:
+            values = await self.read_values(
+                [EcotouchTags.FIRMWARE_VERSION, EcotouchTags.BUILD]
+            )
+            self._firmware_key = (
+                f"{values[EcotouchTags.FIRMWARE_VERSION]}"
+                f"-{values[EcotouchTags.BUILD]}"
+            )
+        return self._firmware_key
+
+    async def _cached_metadata(self, name: str, path: str, parse):
+        """downloads and parses a file, using the metadata cache if set"""
+        if self.metadata_cache is None:
+            return parse(await self._get(path))
+        firmware = await self.firmware_key()
+        data = self.metadata_cache.load(self.hostname, firmware, name)
+        if data is None:
+            data = parse(await self._get(path))
+            self.metadata_cache.store(self.hostname, firmware, name, data)
+        return data
+
+    async def get_tag_description(self, tag: TagData, language_no=0) -> str:
+        """returns the description of a tag
+        0=DE
+        1=EN
+        2=FR"""
+        if self.language_dictionary is None:
+            self.language_dictionary = await self.init_translations()
+        key = tag.tags[0]
+        if tag.bit is not None:
+            key += f"_{tag.bit}"
+        res = self.language_dictionary.get(key, (None, None, None))[language_no]
+        if res == "":
+            return None
+        return res
+
+    async def decode_heatpump_series(self, heatpump_type: int) -> str:
+        """Translates the heatpump type (number) to a human readable series string"""
+        if self.hp_type_csv is None:
+            self.hp_type_csv = await self._cached_metadata(
+                "hp_types", "/easycon/hpType.csv", parse_heatpump_types
+            )
+        return self.hp_type_csv[heatpump_type][2]
+
+    async def read_value(self, tag: TagData):
+        """reads a single value from heatpump"""
+        res = await self.read_values([tag])
+        return res.get(tag)
+
+    async def read_values(
+        self, tags: Union[ReadPlan, Iterable[TagData]]
+    ) -> Dict[TagData, Any]:
+        """reads multiple values from heatpump
+
+        ``tags`` can be a precompiled ReadPlan to avoid planning on every poll."""
+        plan = tags if isinstance(tags, ReadPlan) else ReadPlan(tags)
+        return plan.decode(await self._read_registers(plan))
+
+    async def _read_registers(self, plan: ReadPlan) -> List[str]:
+        """reads the raw values of a plan, requesting all chunks concurrently"""
+        deadline = self._deadline()
+        responses = await asyncio.gather(
+            *(
+                self._request_records(
+                    "/cgi/readTags", read_tags_params(chunk), deadline
+                )
+                for chunk in plan.chunks
+            )
+        )
+        values: List[str] = []
+        for chunk, records in zip(plan.chunks, responses):
+            chunk_values = check_tag_records(records, chunk)
+            values.extend(chunk_values[reg] for reg in chunk)
+        return values
+
+    async def _read_tags(self, tags: List[str]) -> Dict[str, str]:
+        """reads a list of ecotouch tags, requesting all chunks concurrently"""
+        chunks = split_chunks(list(dict.fromkeys(tags)))
+        deadline = self._deadline()
+        responses = await asyncio.gather(
+            *(
+                self._request_records(
+                    "/cgi/readTags", read_tags_params(chunk), deadline
+                )
+                for chunk in chunks
+            )
+        )
+        results: Dict[str, str] = {}
+        for chunk, records in zip(chunks, responses):
+            results.update(check_tag_records(records, chunk))
+        return results
+
+    async def write_values(
+        self, kv_pairs: Dict[TagData, Any], verify: bool = False
+    ) -> Dict[str, str]:
+        """writes values to heatpump (see Ecotouch.write_values)"""
+        groups = []
+        for tag, value in kv_pairs.items():
+            if not tag.writeable:
+                raise InvalidValueException("tried to write to an readonly field")
+            groups.append(tag.write_value(value))
+        chunks = pack_write_chunks(groups, MAX_NO_TAGS)
+        deadline = self._deadline()
+        responses = await asyncio.gather(
+            *(
+                self._request_records(
+                    "/cgi/writeTags", write_tags_params(chunk), deadline
+                )
+                for chunk in chunks
+            )
+        )
+        written: Dict[str, str] = {}
+        errors: Dict[str, Optional[str]] = {}
+        mismatches: Dict[str, Tuple[str, str]] = {}
+        for chunk, records in zip(chunks, responses):
+            chunk_written, chunk_errors, chunk_mismatches = check_write_records(
+                records, chunk, verify
+            )
+            written.update(chunk_written)
+            errors.update(chunk_errors)
+            mismatches.update(chunk_mismatches)
+        if errors or mismatches:
+            raise WriteException(errors, mismatches, written)
+        return written
+
+    async def write_value(self, tag: TagData, value, verify: bool = False):
+        """writes single value to heatpump"""
+        await self.write_values({tag: value}, verify)
@@ -0,0 +1,75 @@
+"""
+short lived cache of raw register values
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Tuple
+
+CACHE_SIZE = 1024
+
+
+class RegisterCache:
+    """bounded cache of raw register values which expire after ``ttl`` seconds.
+
+    The least recently used registers are dropped once ``maxsize`` is
+    reached. ``hits`` and ``misses`` count register lookups."""
+
+    def __init__(
+        self,
+        ttl: float,
+        maxsize: int = CACHE_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def lookup(self, registers: Iterable[str]) -> Tuple[Dict[str, str], List[str]]:
+        """returns the cached values and the registers which have to be read"""
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        now = self._clock()
+        with self._lock:
+            for register in registers:
+                entry = self._entries.get(register)
+                if entry is None or entry[0] <= now:
+                    missing.append(register)
+                    continue
+                self._entries.move_to_end(register)
+                found[register] = entry[1]
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def update(self, values: Dict[str, str]):
+        """stores freshly read or written register values"""
+        expires = self._clock() + self.ttl
+        with self._lock:
+            for register, value in values.items():
+                self._entries[register] = (expires, value)
+                self._entries.move_to_end(register)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, registers: Iterable[str]):
+        """drops registers, e.g. after they have been written"""
+        with self._lock:
+            for register in registers:
+                self._entries.pop(register, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
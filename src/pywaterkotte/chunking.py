@@ -0,0 +1,117 @@
+"""
+adaptive size of the readTags requests sent to a heatpump
+"""
+from typing import Any, Dict, Optional
+
+MIN_CHUNK_SIZE = 10
+MAX_CHUNK_SIZE = 250
+GROWTH = 1.5
+SAMPLES = 3
+IMPROVEMENT = 0.05
+# successful requests after which sizes above a failed one are tried again
+RETEST_AFTER = 100
+
+
+class ChunkSizer:
+    """learns the number of registers per readTags request for one heatpump.
+
+    Starting at ``size``, the size grows by GROWTH as long as the time per
+    register of the last ``samples`` requests improves by more than
+    ``improvement`` and then settles on the best size seen. A request
+    which timed out or lost registers halves the size and caps it below
+    the failed size; probing then continues from there. The cap only
+    holds for ``retest_after`` successful requests, after which larger
+    sizes are probed again. ``changed`` is set whenever the learned state
+    should be persisted (see state and restore)."""
+
+    def __init__(
+        self,
+        size: int,
+        min_size: int = MIN_CHUNK_SIZE,
+        max_size: int = MAX_CHUNK_SIZE,
+        samples: int = SAMPLES,
+        improvement: float = IMPROVEMENT,
+        retest_after: int = RETEST_AFTER,
+    ):
+        self.min_size = min_size
+        self.limit = max_size
+        self.max_size = max_size
+        self.retest_after = retest_after
+        self._successes = 0
+        self.size = max(min_size, min(size, max_size))
+        self.samples = samples
+        self.improvement = improvement
+        self.settled = False
+        self.changed = False
+        self._best_size: Optional[int] = None
+        self._best_cost = float("inf")
+        self._reset_samples()
+
+    def _reset_samples(self):
+        self._count = 0
+        self._registers = 0
+        self._seconds = 0.0
+
+    def record(self, size: int, registers: int, seconds: float):
+        """records a successful request for ``registers`` registers, split
+        with chunk size ``size``"""
+        # requests split with an earlier size or small requests (e.g. of
+        # short reads) say little about the current size
+        if size != self.size or registers * 2 < size:
+            return
+        if self.max_size < self.limit:
+            self._successes += 1
+            if self._successes >= self.retest_after:
+                self._retest()
+        if self.settled:
+            return
+        self._count += 1
+        self._registers += registers
+        self._seconds += seconds
+        if self._count < self.samples:
+            return
+        cost = self._seconds / self._registers
+        self._reset_samples()
+        if cost < self._best_cost * (1 - self.improvement):
+            self._best_size, self._best_cost = self.size, cost
+            grown = min(self.max_size, int(self.size * GROWTH))
+            if grown > self.size:
+                self.size = grown
+                return
+        self.size = self._best_size or self.size
+        self.settled = True
+        self.changed = True
+
+    def _retest(self):
+        """lifts the cap of an earlier failure and probes larger sizes"""
+        self.max_size = self.limit
+        self._successes = 0
+        self._best_size = None
+        self._best_cost = float("inf")
+        self._reset_samples()
+        self.settled = False
+        self.changed = True
+
+    def record_failure(self):
+        """records a request which timed out or lost registers because it
+        was too large. Do not call it if the heatpump was not reachable."""
+        self.max_size = max(self.min_size, self.size - 1)
+        self._successes = 0
+        self.size = max(self.min_size, self.size // 2)
+        self._best_size = None
+        self._best_cost = float("inf")
+        self._reset_samples()
+        self.settled = False
+        self.changed = True
+
+    def state(self) -> Dict[str, Any]:
+        """JSON serializable learned state"""
+        return {"size": self.size, "max_size": self.max_size}
+
+    def restore(self, state: Dict[str, Any]):
+        """continues with a state learned before, without probing again"""
+        self.max_size = min(state["max_size"], self.limit)
+        self._successes = 0
+        self.size = max(self.min_size, min(state["size"], self.max_size))
+        self.settled = True
+        self.changed = False
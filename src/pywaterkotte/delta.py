@@ -0,0 +1,99 @@
+"""
+change detection for polled values
+"""
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .ecotouch import Ecotouch, ReadPlan, TagData
+from .priority import POLL
+
+
+class DeltaFilter:
+    """passes on only the values which changed since they were last passed on.
+
+    Float values only count as changed if they moved by more than their
+    deadband, taken from ``deadbands`` (per tag) or ``unit_deadbands``
+    (per unit, e.g. ``{"°C": 0.2, "kW": 0.1}``). The comparison is made
+    against the last value passed on, so a slow drift is reported once it
+    exceeds the deadband."""
+
+    def __init__(
+        self,
+        deadbands: Optional[Dict[TagData, float]] = None,
+        unit_deadbands: Optional[Dict[str, float]] = None,
+    ):
+        self.deadbands = dict(deadbands or {})
+        self.unit_deadbands = dict(unit_deadbands or {})
+        self._last: Dict[TagData, Any] = {}
+
+    def deadband(self, tag: TagData) -> float:
+        if tag in self.deadbands:
+            return self.deadbands[tag]
+        return self.unit_deadbands.get(tag.unit, 0.0)
+
+    def update(self, values: Dict[TagData, Any]) -> Dict[TagData, Any]:
+        """returns the changed values; all values are new on the first call"""
+        changes = {}
+        last = self._last
+        for tag, value in values.items():
+            if tag in last:
+                previous = last[tag]
+                if isinstance(value, float) and isinstance(previous, float):
+                    if abs(value - previous) <= self.deadband(tag):
+                        continue
+                elif value == previous:
+                    continue
+            changes[tag] = value
+        last.update(changes)
+        return changes
+
+    def reset(self):
+        """forgets all values, so the next update reports everything again"""
+        self._last.clear()
+
+
+class ChangeStream:
+    """polls a heatpump every ``interval`` seconds and reports only changes.
+
+    Iterating yields a dict of the changed values whenever there are any;
+    the first poll reports all values. Callbacks registered with
+    subscribe() get the same dicts."""
+
+    def __init__(
+        self,
+        ecotouch: Ecotouch,
+        tags: Iterable[TagData],
+        interval: float = 10.0,
+        deadbands: Optional[Dict[TagData, float]] = None,
+        unit_deadbands: Optional[Dict[str, float]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.ecotouch = ecotouch
+        self.plan = tags if isinstance(tags, ReadPlan) else ReadPlan(tags)
+        self.interval = interval
+        self.filter = DeltaFilter(deadbands, unit_deadbands)
+        self._sleep = sleep
+        self._callbacks: List[Callable[[Dict[TagData, Any]], None]] = []
+
+    def subscribe(self, callback: Callable[[Dict[TagData, Any]], None]):
+        """registers a callback which gets every dict of changed values"""
+        self._callbacks.append(callback)
+
+    def poll(self) -> Dict[TagData, Any]:
+        """reads all tags once and returns the changed values"""
+        with self.ecotouch.priority(POLL):
+            changes = self.filter.update(self.ecotouch.read_values(self.plan))
+        if changes:
+            for callback in self._callbacks:
+                callback(changes)
+        return changes
+
+    def __iter__(self) -> Iterator[Dict[TagData, Any]]:
+        while True:
+            start = time.monotonic()
+            changes = self.poll()
+            if changes:
+                yield changes
+            delay = self.interval - (time.monotonic() - start)
+            if delay > 0:
+                self._sleep(delay)
@@ -0,0 +1,95 @@
+"""
+bulk dump of all registers of a heatpump
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, NamedTuple, Sequence, TextIO
+
+from .ecotouch import Ecotouch, split_chunks
+from .priority import BULK
+from .protocol import STATUS_OK, TagRecord
+
+
+class RegisterRange(NamedTuple):
+    """registers ``prefix``start to ``prefix``stop (exclusive), e.g. A1-A999"""
+
+    prefix: str
+    start: int
+    stop: int
+
+    def registers(self) -> List[str]:
+        return [f"{self.prefix}{number}" for number in range(self.start, self.stop)]
+
+
+# covers the addresses of all known tags with plenty of headroom
+DEFAULT_RANGES = (
+    RegisterRange("A", 1, 1000),
+    RegisterRange("I", 1, 2000),
+    RegisterRange("D", 1, 1000),
+)
+
+
+@dataclass
+class DumpStats:
+    """summary of a dump"""
+
+    registers: int = 0
+    supported: int = 0
+    requests: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def skipped(self) -> int:
+        """registers not supported by the heatpump"""
+        return self.registers - self.supported
+
+    @property
+    def registers_per_second(self) -> float:
+        return self.registers / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.supported} of {self.registers} registers in {self.requests} "
+            f"requests, {self.elapsed:.1f}s ({self.registers_per_second:.0f} "
+            "registers/s)"
+        )
+
+
+def dump_registers(
+    ecotouch: Ecotouch,
+    out: TextIO,
+    ranges: Iterable[RegisterRange] = DEFAULT_RANGES,
+    workers: int = 1,
+) -> DumpStats:
+    """reads all registers in ``ranges`` and writes ``register<TAB>value``
+    lines to ``out`` as soon as each request is answered (in register
+    order). Registers the heatpump reports without S_OK are skipped. With
+    ``workers`` > 1, that many requests are sent in parallel."""
+    registers = [reg for register_range in ranges for reg in register_range.registers()]
+    chunks = split_chunks(registers)
+    stats = DumpStats(registers=len(registers), requests=len(chunks))
+    start = time.monotonic()
+
+    def write_chunk(chunk: Sequence[str], records: Dict[str, TagRecord]):
+        for register in chunk:
+            record = records.get(register)
+            if record is None or record.status != STATUS_OK or not record.value:
+                continue
+            out.write(f"{register}\t{record.value}\n")
+            stats.supported += 1
+
+    def fetch(chunk: Sequence[str]) -> Dict[str, TagRecord]:
+        # in the thread sending the request
+        with ecotouch.priority(BULK):
+            return ecotouch._fetch_tags(chunk)
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for chunk, records in zip(chunks, executor.map(fetch, chunks)):
+                write_chunk(chunk, records)
+    else:
+        for chunk in chunks:
+            write_chunk(chunk, fetch(chunk))
+    stats.elapsed = time.monotonic() - start
+    return stats
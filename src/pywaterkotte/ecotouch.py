@@ -1,42 +1,118 @@
 """
 library for communicating with waterkote ecotouch heatpumps
 """
-import re
-from dataclasses import dataclass
+from contextlib import contextmanager, nullcontext
+from dataclasses import FrozenInstanceError
 from datetime import datetime, timedelta, date
+from functools import partial
+import random
 import struct
-from typing import Any, Callable, Collection, Dict, List, Tuple
+import sys
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import requests
-
-import types
+from requests.adapters import HTTPAdapter
+
+from .cache import CACHE_SIZE, RegisterCache
+from .chunking import ChunkSizer
+from .exceptions import (
+    AuthenticationException,
+    ConnectionException,
+    InvalidResponseException,
+    InvalidValueException,
+    SessionExpiredException,
+)
+from .instrumentation import Observer, endpoint_name
+from .metadata import MetadataCache
+from .priority import BULK, CONTROL, INTERACTIVE, RequestScheduler
+from .protocol import (
+    TagRecord,
+    WriteException,
+    check_tag_records,
+    check_write_records,
+    pack_write_chunks,
+    parse_status,
+    parse_tag_records,
+    read_tags_params,
+    write_tags_params,
+)
+from .translations import TranslationTable, parse_translations
 
 MAX_NO_TAGS = 75
-REQUEST_TIMEOUT = 3000
-
-
-class InvalidResponseException(Exception):
-    """the heatpump sent an unexpected response"""
-
-
-class InvalidValueException(Exception):
-    """thrown if value to be written is not suitable for a tag"""
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10.0
+REQUEST_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+RETRIES = 2
+BACKOFF = 0.5
+MAX_BACKOFF = 8.0
+POOL_MAXSIZE = 4
+# priorities of requests sent outside of Ecotouch.priority, by path
+DEFAULT_PRIORITIES = {
+    "/cgi/writeTags": CONTROL,
+    "/cgi/readTags": INTERACTIVE,
+    "/cgi/login": INTERACTIVE,
+}
+
+_WORDS = struct.Struct("!HH")
+_FLOAT32 = struct.Struct("!f")
+_BOOLEANS = {"1": True, "0": False}
+
+
+def decode_float32(high: int, low: int) -> float:
+    """reconstructs a float32 from the two 16 bit words of a register pair"""
+    return _FLOAT32.unpack(_WORDS.pack(high & 0xFFFF, low & 0xFFFF))[0]
+
+
+def create_session(
+    pool_connections: int = 10, pool_maxsize: int = POOL_MAXSIZE
+) -> requests.Session:
+    """creates a session with a keep-alive connection pool.
+
+    The session can be shared between several Ecotouch instances:
+    ``pool_connections`` is the number of heatpumps to keep connections
+    for and ``pool_maxsize`` the number of connections per heatpump."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def parse_heatpump_types(text: str) -> List[List[str]]:
+    """parses the rows of hpType.csv"""
+    return [line.split(";") for line in text.splitlines()]
 
 
-class AuthenticationException(Exception):
-    """thrown if login failed"""
-
-
-class ConnectionException(Exception):
-    """thrown if connection with heatpump not possible"""
-
-
-@dataclass
 class TagData:
-    """collects all information required to read/write values"""
-
-    def __hash__(self) -> int:
-        return hash(tuple(self.tags))
+    """collects all information required to read/write values
+
+    Tags are immutable. ``tags`` is a tuple of interned register names and
+    the hash is computed once, as tags are dict keys of every poll result."""
+
+    __slots__ = (
+        "tags",
+        "unit",
+        "writeable",
+        "read_function",
+        "write_function",
+        "bit",
+        "decoder",
+        "_hash",
+    )
 
     def _parse_value_default(self, vals: List[str]) -> Any:
         """
@@ -51,9 +127,7 @@ class TagData:
         if first_tag.startswith("A"):
             if len(self.tags) == 1:
                 return float(first_val) / 10.0
-            ivals = [int(str_val) & 0xFFFF for str_val in vals]
-            hex_string = f"{ivals[0]:04x}{ivals[1]:04x}"
-            return struct.unpack("!f", bytes.fromhex(hex_string))[0]
+            return decode_float32(int(vals[0]), int(vals[1]))
 
         # integer case
         if first_tag.startswith("I"):
@@ -147,15 +221,94 @@ class TagData:
 
         return date(bios_year + 2000, bios_month, bios_day)
 
-    tags: Collection[str]
-    unit: str = None
-    writeable: bool = False
-    read_function: Callable[[Any, Dict[Any, str], int], Any] = _parse_value_default
-    write_function: Callable[[Any, Any], Dict[str, str]] = _write_value_default
-    bit: int = None
+    def __init__(
+        self,
+        tags: Collection[str],
+        unit: str = None,
+        writeable: bool = False,
+        read_function: Callable[[Any, List[str]], Any] = _parse_value_default,
+        write_function: Callable[[Any, Any], Dict[str, str]] = _write_value_default,
+        bit: int = None,
+    ):
+        set_field = object.__setattr__
+        set_field(self, "tags", tuple(sys.intern(tag) for tag in tags))
+        set_field(self, "unit", unit)
+        set_field(self, "writeable", writeable)
+        set_field(self, "read_function", read_function)
+        set_field(self, "write_function", write_function)
+        set_field(self, "bit", bit)
+        set_field(self, "_hash", hash((self.tags, bit)))
+        set_field(self, "decoder", self._compile_decoder())
+
+    def _fields(self) -> tuple:
+        return (
+            self.tags,
+            self.unit,
+            self.writeable,
+            self.read_function,
+            self.write_function,
+            self.bit,
+        )
+
+    def __setattr__(self, name: str, value):
+        raise FrozenInstanceError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self, name: str):
+        raise FrozenInstanceError(f"cannot delete field {name!r}")
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self is other or self._fields() == other._fields()
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __repr__(self) -> str:
+        return (
+            f"TagData(tags={self.tags!r}, unit={self.unit!r}, "
+            f"writeable={self.writeable!r}, read_function={self.read_function!r}, "
+            f"write_function={self.write_function!r}, bit={self.bit!r})"
+        )
+
+    def __reduce__(self):
+        return (TagData, self._fields())
+
+    def _compile_decoder(self) -> Callable[[List[str]], Any]:
+        """specializes the read function once for this tag, so decoding a
+        value needs no checks of the tag type at poll time"""
+        if self.read_function is not TagData._parse_value_default:
+            return partial(self.read_function, self)
+
+        first_tag = self.tags[0]
+        if first_tag.startswith("A"):
+            if len(self.tags) == 1:
+                return lambda vals: float(vals[0]) / 10.0
+            return lambda vals: decode_float32(int(vals[0]), int(vals[1]))
+
+        if first_tag.startswith("I"):
+            if self.bit is not None:
+                mask = 1 << self.bit
+                return lambda vals: (int(vals[0]) & mask) > 0
+            if len(self.tags) == 1:
+                return lambda vals: int(vals[0])
+            return lambda vals: int("".join(vals))
+
+        if first_tag.startswith("D"):
+
+            def decode_bool(vals: List[str]) -> bool:
+                try:
+                    return _BOOLEANS[vals[0]]
+                except KeyError:
+                    raise InvalidValueException(
+                        f"{vals[0]} is not a valid value for {first_tag}"
+                    ) from None
+
+            return decode_bool
+        return partial(self.read_function, self)
 
     def parse_value(self, str_vals: List[str]) -> Any:
-        return self.read_function(self, str_vals)
+        return self.decoder(str_vals)
 
     def write_value(self, val) -> Dict[str, str]:
         return self.write_function(self, val)
@@ -217,84 +370,232 @@ class EcotouchTags(TagData):
     BIOS_DATE = TagData(["I4"], read_function=TagData._parse_bios_date)
 
 
+def split_chunks(registers: Sequence[str], chunk_size: int = MAX_NO_TAGS):
+    """splits registers into the fewest possible requests of balanced size"""
+    if not registers:
+        return ()
+    no_chunks = -(-len(registers) // chunk_size)
+    size, rest = divmod(len(registers), no_chunks)
+    chunks = []
+    start = 0
+    for i in range(no_chunks):
+        end = start + size + (1 if i < rest else 0)
+        chunks.append(tuple(registers[start:end]))
+        start = end
+    return tuple(chunks)
+
+
+class ReadPlan:
+    """compiled plan to read a fixed list of tags.
+
+    Every register is requested only once, even if several tags share it
+    (e.g. the state bits in I51). ``registers`` holds the deduplicated
+    registers, ``chunks`` the readTags requests to send and ``indices``
+    the positions of the registers of each tag in ``registers``.
+    Build the plan once and pass it to read_values on every poll."""
+
+    def __init__(self, tags: Iterable[TagData], chunk_size: int = MAX_NO_TAGS):
+        self.tags: Tuple[TagData, ...] = tuple(dict.fromkeys(tags))
+        positions: Dict[str, int] = {}
+        self.indices: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(positions.setdefault(reg, len(positions)) for reg in tag.tags)
+            for tag in self.tags
+        )
+        self.registers: Tuple[str, ...] = tuple(positions)
+        self.chunks: Tuple[Tuple[str, ...], ...] = split_chunks(
+            self.registers, chunk_size
+        )
+        self._decoders = tuple(
+            (tag, tag.decoder, indices) for tag, indices in zip(self.tags, self.indices)
+        )
+        self._chunks = {chunk_size: self.chunks}
+
+    def chunks_for(self, chunk_size: int) -> Tuple[Tuple[str, ...], ...]:
+        """the requests to send with another chunk size"""
+        chunks = self._chunks.get(chunk_size)
+        if chunks is None:
+            chunks = self._chunks[chunk_size] = split_chunks(self.registers, chunk_size)
+        return chunks
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def decode(self, values: Sequence[str]) -> Dict[TagData, Any]:
+        """decodes the raw values of ``registers`` (in the same order)"""
+        return {
+            tag: decoder([values[i] for i in indices])
+            for tag, decoder, indices in self._decoders
+        }
+
+
 class Ecotouch:
     """Class to control Waterkotte Ecotouch heatpumps."""
 
     auth_cookies = None
 
-    def __init__(self, host):
+    def __init__(
+        self,
+        host,
+        session: Optional[requests.Session] = None,
+        pool_maxsize: int = POOL_MAXSIZE,
+        timeout: Union[float, Tuple[float, float]] = REQUEST_TIMEOUT,
+        cache_ttl: Optional[float] = None,
+        cache_size: int = CACHE_SIZE,
+        metadata_cache: Optional[MetadataCache] = None,
+        observer: Optional[Observer] = None,
+        retries: int = RETRIES,
+        backoff: float = BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+        poll_deadline: Optional[float] = None,
+        adaptive_chunks: bool = False,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
+        """``session`` may be a shared session created by create_session.
+        Otherwise the instance owns a session with ``pool_maxsize``
+        keep-alive connections, which is released by close().
+        ``timeout`` is the timeout of every request in seconds, either one
+        value or (connect timeout, read timeout).
+        If ``cache_ttl`` is set, register values are cached for that many
+        seconds (see RegisterCache). With a ``metadata_cache``, translations
+        and heatpump types are only downloaded once per firmware.
+        An ``observer`` (e.g. instrumentation.Metrics) receives timings and
+        counts of all requests.
+        Failed readTags/writeTags requests are repeated up to ``retries``
+        times, waiting ``backoff`` seconds doubled on every attempt (at most
+        ``max_backoff``) with random jitter. If the session expired, the
+        last login is repeated. With ``poll_deadline``, a call of
+        read_values or write_values gives up after that many seconds,
+        including all chunks and retries.
+        With ``adaptive_chunks``, the number of registers per readTags
+        request is learned from the measured latency (see ChunkSizer) and,
+        with a ``metadata_cache``, stored per heatpump and firmware.
+        A ``scheduler`` orders the requests by priority: writes before
+        reads before downloads of translations and heatpump types, unless
+        set otherwise with priority(). Share one scheduler between all
+        instances talking to the same heatpump."""
         self.hostname = host
+        self.timeout = timeout
+        self.cache = (
+            RegisterCache(cache_ttl, cache_size) if cache_ttl is not None else None
+        )
         self.language_dictionary = None
+        self.metadata_cache = metadata_cache
+        self._firmware_key: Optional[str] = None
+        self.observer = observer
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_deadline = poll_deadline
+        self._credentials: Optional[Tuple[str, str]] = None
+        self.chunk_sizer = ChunkSizer(MAX_NO_TAGS) if adaptive_chunks else None
+        self._chunk_state_loaded = False
+        self.scheduler = scheduler
+        self._priority = threading.local()
+        self._owns_session = session is None
+        if session is None:
+            session = create_session(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """closes the connections of the session if it is owned by this instance"""
+        if self._owns_session:
+            self.session.close()
+
+    @contextmanager
+    def priority(self, priority: int):
+        """requests sent by this thread in the with block get ``priority``
+        (see priority.RequestScheduler), e.g. priority.POLL for periodic polls"""
+        previous = getattr(self._priority, "value", None)
+        self._priority.value = priority
+        try:
+            yield
+        finally:
+            self._priority.value = previous
+
+    def _slot(self, path: str):
+        """waits for the scheduler to allow a request to ``path``"""
+        if self.scheduler is None:
+            return nullcontext()
+        priority = getattr(self._priority, "value", None)
+        if priority is None:
+            priority = DEFAULT_PRIORITIES.get(path, BULK)
+        return self.scheduler.slot(priority)
+
+    def _get(self, path: str, **kwargs) -> requests.Response:
+        """sends a GET request to the heatpump using the pooled session.
+        Streamed requests have to be scheduled by the caller (see _slot)."""
+        if self.scheduler is not None and not kwargs.get("stream"):
+            with self._slot(path):
+                return self._send_get(path, **kwargs)
+        return self._send_get(path, **kwargs)
+
+    def _send_get(self, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        if self.observer is None:
+            return self.session.get(f"http://{self.hostname}{path}", **kwargs)
+
+        # read the whole response, so parsing is not included in the timing
+        kwargs.pop("stream", None)
+        endpoint = endpoint_name(path)
+        start = time.perf_counter()
+        try:
+            response = self.session.get(f"http://{self.hostname}{path}", **kwargs)
+        except requests.RequestException as error:
+            self.observer.on_error(self.hostname, endpoint, error)
+            raise
+        self.observer.on_request(
+            self.hostname,
+            endpoint,
+            time.perf_counter() - start,
+            response.status_code,
+            len(response.content),
+        )
+        return response
 
-    def init_translations(self) -> Dict[str, Tuple[str, str, str]]:
+    def init_translations(self) -> TranslationTable:
         """initializes value-names: key: (de, en, fr)"""
-        try:
-            response = requests.get(
-                f"http://{self.hostname}/easycon/js/dictionary.js",
-                timeout=REQUEST_TIMEOUT,
+        if self.metadata_cache is None:
+            return self._download_translations()
+        return TranslationTable.from_json(
+            self.metadata_cache.get(
+                self.hostname,
+                self.firmware_key(),
+                "translations",
+                lambda: self._download_translations().to_json(),
             )
+        )
+
+    def _download_translations(self) -> TranslationTable:
+        try:
+            response = self._get("/easycon/js/dictionary.js")
             if not response.ok:
                 raise ConnectionException(
                     f"heatpump returned {response.status_code} {response.reason}"
                 )
-            TRANSLATION_REGEX = r'[^"]*'
-
-            def replace_unicode(match: re.Match[str]) -> str:
-                char_bytes = ord(match.group(1)).to_bytes(2, "little") + int(
-                    match.group(2), 16
-                ).to_bytes(2, "little")
-                return char_bytes.decode("utf-16")
-
-            def replace_x_code(match: re.Match[str]) -> str:
-                in_str = match.group(1)
-                char_bytes = int(in_str, 16).to_bytes(2, "little")
-                replacement = char_bytes.decode("utf-16")
-                return replacement
-
-            text = re.sub(r"\\x([0-9a-fA-F]{2})", replace_x_code, response.text)
-            text = re.sub(r"(\w)\\u(\d{4})", replace_unicode, text)
-
-            translations: Dict[str, tuple] = {}
-            matches = re.findall(
-                rf'lng(?P<id>[\w\d]+)=\["(?P<de_text>{TRANSLATION_REGEX})","(?P<en_text>{TRANSLATION_REGEX})","(?P<fr_text>{TRANSLATION_REGEX})"]',
-                text,
-            )
-            for match in matches:
-                translations[match[0]] = (
-                    match[1],
-                    match[2],
-                    match[3],
-                )
-            matches = re.findall(
-                rf'lng(?P<id>[\w\d]+)=\["(?P<de_text>{TRANSLATION_REGEX})","(?P<en_text>{TRANSLATION_REGEX})"]',
-                text,
-            )
-            for match in matches:
-                translations[match[0]] = (
-                    match[1],
-                    match[2],
-                    None,
-                )
-
-            matches = re.findall(
-                rf'lng(?P<id>[\w\d]+)="(?P<de_text>{TRANSLATION_REGEX})"', text
-            )
-            for match in matches:
-                translations[match[0]] = (
-                    match[1],
-                    match[1],
-                    match[1],
-                )
-
-            matches = re.findall(r"lng(?P<id>[\w\d]+)=lng(?P<other_id>[\w\d]+)", text)
-            for match in matches:
-                if match[1] in translations.keys():
-                    translations[match[0]] = translations[match[1]]
-            return translations
+            return parse_translations(response.text)
 
         except (ConnectionError, OSError) as conn_eror:
             raise ConnectionException("could not connect to heatpump") from conn_eror
 
+    def firmware_key(self) -> str:
+        """firmware version and build of the heatpump, which identify the
+        version of its metadata files. Read once per login."""
+        if self._firmware_key is None:
+            values = self.read_values(
+                [EcotouchTags.FIRMWARE_VERSION, EcotouchTags.BUILD]
+            )
+            self._firmware_key = (
+                f"{values[EcotouchTags.FIRMWARE_VERSION]}"
+                f"-{values[EcotouchTags.BUILD]}"
+            )
+        return self._firmware_key
+
     def get_tag_description(self, tag: TagData, language_no=0) -> str:
         """returns the description of a tag
         0=DE
@@ -312,44 +613,48 @@ class Ecotouch:
 
     def _get_status_response(self, response):
         """extracts state from response"""
-        match = re.search(r"^#([A-Z_]+)", response.text, re.MULTILINE)
-        if match is None:
-            raise InvalidResponseException("invalid response. could not read state")
-        return match.group(1)
+        return parse_status(response.text)
 
     hp_type_csv = None  # remember parsed csv data
 
     def decode_heatpump_series(self, heatpump_type: int) -> str:
         """Translates the heatpump type (number) to a human readable series string"""
         if self.hp_type_csv is None:
-            result = requests.get(
-                f"http://{self.hostname}/easycon/hpType.csv", timeout=REQUEST_TIMEOUT
-            )
-            if not result.ok:
-                raise ConnectionException(
-                    f"heatpump returned {result.status_code} {result.reason}"
+            if self.metadata_cache is None:
+                self.hp_type_csv = self._download_heatpump_types()
+            else:
+                self.hp_type_csv = self.metadata_cache.get(
+                    self.hostname,
+                    self.firmware_key(),
+                    "hp_types",
+                    self._download_heatpump_types,
                 )
+        return self.hp_type_csv[heatpump_type][2]
 
-            lines = result.text.splitlines()
-            hp_type_csv = [line.split(";") for line in lines]
-        return hp_type_csv[heatpump_type][2]
+    def _download_heatpump_types(self) -> List[List[str]]:
+        result = self._get("/easycon/hpType.csv")
+        if not result.ok:
+            raise ConnectionException(
+                f"heatpump returned {result.status_code} {result.reason}"
+            )
+        return parse_heatpump_types(result.text)
 
     def login(self, username="waterkotte", password="waterkotte"):
         """performs a login. Has to be called before any other method."""
         args = {"username": username, "password": password}
         try:
-            result = requests.get(
-                f"http://{self.hostname}/cgi/login",
-                params=args,
-                timeout=REQUEST_TIMEOUT,
-            )
+            result = self._get("/cgi/login", params=args)
             if not result.ok:
                 raise ConnectionException("invalid result from server")
             if self._get_status_response(result) != "S_OK":
+                if self.observer is not None:
+                    self.observer.on_auth_failure(self.hostname)
                 raise AuthenticationException(
                     f"login error: {self._get_status_response(result)}"
                 )
             self.auth_cookies = result.cookies
+            self._credentials = (username, password)
+            self._firmware_key = None
         except (ConnectionError, OSError) as conn_eror:
             raise ConnectionException("could not connect to heatpump") from conn_eror
 
@@ -360,78 +665,284 @@ class Ecotouch:
             return res[tag]
         return None
 
-    def write_values(self, kv_pairs: Dict[TagData, Any]):
-        """writes values to heatpump"""
-        to_write: Dict[str, str] = {}
+    def write_values(
+        self, kv_pairs: Dict[TagData, Any], verify: bool = False
+    ) -> Dict[str, str]:
+        """writes values to heatpump
+
+        The registers are sent in as few requests as possible, the registers
+        of one tag always in the same request. With ``verify`` the values
+        the heatpump returns after writing are compared to the written ones.
+        If any tag fails, the others are written anyway and a WriteException
+        reports the failed ones. Returns the confirmed register values."""
+        groups = []
         for tag, value in kv_pairs.items():
             if not tag.writeable:
                 raise InvalidValueException("tried to write to an readonly field")
-            to_write.update(tag.write_value(value))
-
-        self._write_tags(to_write)
+            groups.append(tag.write_value(value))
+        return self._write_groups(groups, verify)
 
-    def write_value(self, tag, value):
+    def write_value(self, tag, value, verify: bool = False):
         """writes single value to heatpump"""
-        self.write_values({tag: value})
-
-    def read_values(self, tags: List[TagData]) -> Dict[TagData, Any]:
-        """reads multiple values from heatpump"""
-        e_tags = []
-        for etag in tags:
-            for wtag in etag.tags:
-                e_tags.append(wtag)
-        e_values = self._read_tags(e_tags)
-
-        result = {}
-        for tag in tags:
-            str_vals = [e_values[e_tag] for e_tag in tag.tags]
-            result[tag] = tag.parse_value(str_vals)
+        self.write_values({tag: value}, verify)
+
+    def dump(self, out, ranges=None, workers: int = 1):
+        """writes the values of all registers in ``ranges`` (default: all A,
+        I and D registers) to the text stream ``out`` and returns DumpStats.
+        See pywaterkotte.dump.dump_registers."""
+        from .dump import DEFAULT_RANGES, dump_registers  # avoid import cycle
+
+        return dump_registers(self, out, ranges or DEFAULT_RANGES, workers)
+
+    def read_values(
+        self, tags: Union[ReadPlan, Iterable[TagData]]
+    ) -> Dict[TagData, Any]:
+        """reads multiple values from heatpump
+
+        ``tags`` can be a precompiled ReadPlan to avoid planning on every poll."""
+        plan = tags if isinstance(tags, ReadPlan) else ReadPlan(tags)
+        if self.observer is None:
+            return plan.decode(self._read_registers(plan))
+        values = self._read_registers(plan)
+        start = time.perf_counter()
+        result = plan.decode(values)
+        self.observer.on_decode(
+            self.hostname, len(plan.tags), time.perf_counter() - start
+        )
         return result
 
-    def _read_tags(self, tags: List[TagData], results=None) -> Dict[TagData, str]:
+    def read_raw(self, tags: Union[ReadPlan, Iterable[TagData]]):
+        """reads the raw values of the registers of ``tags`` as integers, in
+        the order of ReadPlan.registers: a numpy array if numpy is installed,
+        otherwise an array('q'). Decode them with vectorized.BulkDecoder."""
+        from .vectorized import to_int_array  # avoid import cycle
+
+        plan = tags if isinstance(tags, ReadPlan) else ReadPlan(tags)
+        return to_int_array(self._read_registers(plan))
+
+    def _read_registers(self, plan: ReadPlan) -> List[str]:
+        """reads the raw values of all registers of a plan, in plan order"""
+        if self.chunk_sizer is None:
+            chunks = plan.chunks
+        else:
+            chunks = plan.chunks_for(self._chunk_size())
+        values = self._read_register_values(plan.registers, chunks, self._deadline())
+        return [values[reg] for reg in plan.registers]
+
+    def _read_tags(self, tags: List[str]) -> Dict[str, str]:
         """reads a list of ecotouch tags"""
-        if results is None:
-            results = {}
-
-        if len(tags) == 0:
-            return results
-
-        if len(tags) > MAX_NO_TAGS:
-            results = self._read_tags(tags[MAX_NO_TAGS:], results)
-        tags = tags[:MAX_NO_TAGS]
-
-        args = {}
-        args["n"] = len(tags)
-        for i, tag in enumerate(tags):
-            args[f"t{i+1}"] = tag
-        result = requests.get(
-            f"http://{self.hostname}/cgi/readTags",
-            params=args,
-            cookies=self.auth_cookies,
-            timeout=REQUEST_TIMEOUT,
+        return self._read_register_values(
+            list(dict.fromkeys(tags)), deadline=self._deadline()
         )
-        for tag in tags:
-            match = re.search(
-                rf"#{tag}\t(?P<status>[A-Z_]+)\n\d+\t(?P<value>\-?\d+)",
-                result.text,
-                re.MULTILINE,
+
+    def _read_register_values(
+        self,
+        registers: Sequence[str],
+        chunks: Sequence[Sequence[str]] = None,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, str]:
+        """reads distinct registers, serving them from the cache if possible"""
+        values: Dict[str, str] = {}
+        if self.cache is not None:
+            values, missing = self.cache.lookup(registers)
+            if len(missing) != len(registers):
+                registers, chunks = missing, None
+        for chunk, records in self._fetch_chunks(registers, chunks, deadline):
+            chunk_values = check_tag_records(records, chunk)
+            values.update(chunk_values)
+            if self.cache is not None:
+                self.cache.update(chunk_values)
+        return values
+
+    def _fetch_chunks(
+        self,
+        registers: Sequence[str],
+        chunks: Sequence[Sequence[str]] = None,
+        deadline: Optional[float] = None,
+    ) -> Iterator[Tuple[Sequence[str], Dict[str, TagRecord]]]:
+        """requests registers in chunks of the current chunk size, yielding
+        every chunk with its unchecked records as soon as it is read"""
+        if not chunks:
+            chunks = split_chunks(
+                registers,
+                MAX_NO_TAGS if self.chunk_sizer is None else self._chunk_size(),
+            )
+        if self.observer is not None:
+            self.observer.on_read(self.hostname, len(chunks), len(registers))
+        chunk_size = self.chunk_sizer.size if self.chunk_sizer is not None else None
+        for chunk in chunks:
+            if chunk_size is None:
+                yield chunk, self._fetch_tags(chunk, deadline)
+            else:
+                yield chunk, self._fetch_tags_measured(chunk, deadline, chunk_size)
+
+    def _fetch_tags(
+        self, tags: Sequence[str], deadline: Optional[float] = None
+    ) -> Dict[str, TagRecord]:
+        """requests up to MAX_NO_TAGS tags and returns the parsed records"""
+        return self._request_records("/cgi/readTags", read_tags_params(tags), deadline)
+
+    def _chunk_size(self) -> int:
+        """current size of readTags requests, restoring a learned one first"""
+        if not self._chunk_state_loaded and self.metadata_cache is not None:
+            # set first: firmware_key reads values itself
+            self._chunk_state_loaded = True
+            state = self.metadata_cache.load(
+                self.hostname, self.firmware_key(), "chunk_size"
+            )
+            if state is not None:
+                self.chunk_sizer.restore(state)
+        return self.chunk_sizer.size
+
+    def _fetch_tags_measured(
+        self, tags: Sequence[str], deadline: Optional[float], chunk_size: int
+    ) -> Dict[str, TagRecord]:
+        """_fetch_tags, telling the chunk sizer how long it took"""
+        sizer = self.chunk_sizer
+        start = time.perf_counter()
+        try:
+            records = self._fetch_tags(tags, deadline)
+        except (ConnectionException, requests.RequestException) as error:
+            # only a timed out response hints at a too large request, not
+            # a heatpump which is offline or refuses connections. The
+            # state is stored with the next successful request.
+            if isinstance(error, requests.ReadTimeout) or isinstance(
+                error.__cause__, requests.ReadTimeout
+            ):
+                sizer.record_failure()
+            raise
+        if len(records) < len(tags):
+            # the heatpump dropped registers of an oversized request
+            sizer.record_failure()
+        else:
+            sizer.record(chunk_size, len(tags), time.perf_counter() - start)
+        self._store_chunk_state()
+        return records
+
+    def _store_chunk_state(self):
+        """persists a newly learned chunk size, once the firmware is known"""
+        sizer = self.chunk_sizer
+        if (
+            sizer.changed
+            and self.metadata_cache is not None
+            and self._firmware_key is not None
+        ):
+            sizer.changed = False
+            self.metadata_cache.store(
+                self.hostname, self._firmware_key, "chunk_size", sizer.state()
             )
-            if match is None:
-                raise Exception("tag not found in response")
-            val_str = match.group("value")
-            results[tag] = val_str
-        return results
 
-    def _write_tags(self, to_write: Dict[str, str]):
+    def _deadline(self) -> Optional[float]:
+        """monotonic time at which the current poll has to give up"""
+        if self.poll_deadline is None:
+            return None
+        return time.monotonic() + self.poll_deadline
+
+    def _request_timeout(self, deadline: Optional[float]):
+        """the timeout of the next request, shortened to meet the deadline"""
+        if deadline is None:
+            return self.timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ConnectionException(
+                f"no response within the deadline of {self.poll_deadline}s"
+            )
+        if isinstance(self.timeout, tuple):
+            connect, read = self.timeout
+        else:
+            connect = read = self.timeout
+        return (min(connect, remaining), min(read, remaining))
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """exponential backoff with jitter, so heatpumps are not hit in lockstep"""
+        delay = min(self.max_backoff, self.backoff * 2**attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _request_records(
+        self, path: str, params: Dict[str, Any], deadline: Optional[float] = None
+    ) -> Dict[str, TagRecord]:
+        """sends a readTags/writeTags request and parses the response,
+        retrying failed requests and logging in again if the session expired"""
+        attempt = 0
+        logged_in_again = False
+        while True:
+            try:
+                return self._send_records(path, params, deadline)
+            except SessionExpiredException:
+                if self._credentials is None or logged_in_again:
+                    raise
+                if self.observer is not None:
+                    self.observer.on_auth_failure(self.hostname)
+                logged_in_again = True
+                self.login(*self._credentials)
+            except (requests.RequestException, ConnectionException) as error:
+                delay = self._backoff_delay(attempt)
+                if attempt >= self.retries or (
+                    deadline is not None and time.monotonic() + delay >= deadline
+                ):
+                    if isinstance(error, ConnectionException):
+                        raise
+                    raise ConnectionException(
+                        "could not connect to heatpump"
+                    ) from error
+                attempt += 1
+                if self.observer is not None:
+                    self.observer.on_retry(
+                        self.hostname, endpoint_name(path), attempt, delay
+                    )
+                time.sleep(delay)
+
+    def _send_records(
+        self, path: str, params: Dict[str, Any], deadline: Optional[float]
+    ) -> Dict[str, TagRecord]:
+        """sends a readTags/writeTags request and parses the streamed response"""
+        timeout = self._request_timeout(deadline)
+        with self._slot(path):
+            result = self._get(path, params=params, stream=True, timeout=timeout)
+            with result:
+                if not result.ok:
+                    raise ConnectionException(
+                        f"heatpump returned {result.status_code} {result.reason}"
+                    )
+                if result.encoding is None:
+                    result.encoding = "latin-1"
+                if self.observer is None:
+                    return parse_tag_records(result.iter_lines(decode_unicode=True))
+                start = time.perf_counter()
+                records = parse_tag_records(result.iter_lines(decode_unicode=True))
+                self.observer.on_parse(
+                    self.hostname, endpoint_name(path), time.perf_counter() - start
+                )
+                return records
+
+    def _write_tags(self, to_write: Dict[str, str], verify: bool = False):
         """writes <value> into the tag <tag>"""
-        args = {"n": 1, "returnValue": "true"}
-        for i, (tag, value) in enumerate(to_write.items()):
-            args[f"t{i}"] = tag
-            args[f"v{i}"] = value
-
-        response = requests.get(
-            f"http://{self.hostname}/cgi/writeTags",
-            params=args,
-            cookies=self.auth_cookies,
-            timeout=REQUEST_TIMEOUT,
+        return self._write_groups(
+            [{tag: value} for tag, value in to_write.items()], verify
         )
+
+    def _write_groups(
+        self, groups: List[Dict[str, str]], verify: bool
+    ) -> Dict[str, str]:
+        """writes the registers of several tags in batched requests"""
+        written: Dict[str, str] = {}
+        errors: Dict[str, Optional[str]] = {}
+        mismatches: Dict[str, Tuple[str, str]] = {}
+        deadline = self._deadline()
+        for chunk in pack_write_chunks(groups, MAX_NO_TAGS):
+            if self.cache is not None:
+                self.cache.invalidate(chunk)
+            records = self._request_records(
+                "/cgi/writeTags", write_tags_params(chunk), deadline
+            )
+            chunk_written, chunk_errors, chunk_mismatches = check_write_records(
+                records, chunk, verify
+            )
+            written.update(chunk_written)
+            errors.update(chunk_errors)
+            mismatches.update(chunk_mismatches)
+            if self.cache is not None:
+                self.cache.update(chunk_written)
+        if errors or mismatches:
+            raise WriteException(errors, mismatches, written)
+        return written
@@ -0,0 +1,23 @@
+"""
+exceptions raised by pywaterkotte
+"""
+
+
+class InvalidResponseException(Exception):
+    """the heatpump sent an unexpected response"""
+
+
+class InvalidValueException(Exception):
+    """thrown if value to be written is not suitable for a tag"""
+
+
+class AuthenticationException(Exception):
+    """thrown if login failed"""
+
+
+class ConnectionException(Exception):
+    """thrown if connection with heatpump not possible"""
+
+
+class SessionExpiredException(AuthenticationException, InvalidResponseException):
+    """thrown if the heatpump requires a new login"""
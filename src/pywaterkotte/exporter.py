@@ -0,0 +1,328 @@
+"""
+exports tag values of one or many heatpumps as CSV or JSON Lines
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import IO, Any, Dict, Iterable, List, Optional, Sequence
+
+from .fleet import FLEET_TIMEOUT, DeviceResult, FleetPoller
+from .instrumentation import Observer
+from .registry import TAGS
+from .schedule import tag_category
+
+DEFAULT_INTERVAL = 10.0
+BACKUPS = 5
+PHASES = ("network", "parse", "decode", "output", "poll")
+
+
+def default_tag_names() -> List[str]:
+    """names of the measurements and energy counters of EcotouchTags"""
+    return [
+        name for name in TAGS if tag_category(TAGS[name]) in ("measurement", "counter")
+    ]
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class CsvFormat:
+    """one row per poll of a heatpump: time, host, one column per tag, error"""
+
+    def __init__(self, names: Sequence[str]):
+        self.names = list(names)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self.header = self._format(["time", "host"] + self.names + ["error"])
+
+    def _format(self, row: List[Any]) -> str:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(row)
+        return self._buffer.getvalue()
+
+    def row(self, timestamp: str, result: DeviceResult, values: List[Any]) -> str:
+        error = "" if result.error is None else str(result.error)
+        return self._format([timestamp, result.host] + values + [error])
+
+
+class JsonLinesFormat:
+    """one JSON object per poll of a heatpump"""
+
+    header = ""
+
+    def __init__(self, names: Sequence[str]):
+        self.names = list(names)
+
+    def row(self, timestamp: str, result: DeviceResult, values: List[Any]) -> str:
+        record: Dict[str, Any] = {"time": timestamp, "host": result.host}
+        if result.error is None:
+            record["values"] = dict(zip(self.names, values))
+        else:
+            record["error"] = str(result.error)
+        return json.dumps(record, default=str, ensure_ascii=False) + "\n"
+
+
+FORMATS = {"csv": CsvFormat, "jsonl": JsonLinesFormat}
+
+
+class StreamOutput:
+    """writes rows to an open text stream, the header only once"""
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+        self._started = False
+
+    def write(self, text: str, header: str = ""):
+        if not self._started:
+            self._started = True
+            self.stream.write(header)
+        self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class RotatingOutput:
+    """writes rows to ``path``. Once the file would exceed ``max_bytes``, it
+    is renamed to path.1 (path.1 to path.2 and so on, keeping ``backups``
+    files) and a new file with a new header is started."""
+
+    def __init__(self, path: str, max_bytes: int, backups: int = BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = self._open()
+
+    def _open(self) -> IO[str]:
+        # pylint: disable=consider-using-with
+        stream = open(self.path, "a", encoding="utf-8", newline="")
+        self._size = stream.tell()
+        return stream
+
+    def _rotate(self):
+        self._file.close()
+        for number in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{number}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{number + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = self._open()
+
+    def write(self, text: str, header: str = ""):
+        size = len(text.encode("utf-8"))
+        if self.max_bytes and self._size and self._size + size > self.max_bytes:
+            self._rotate()
+        if not self._size and header:
+            self._file.write(header)
+            self._size += len(header.encode("utf-8"))
+        self._file.write(text)
+        self._size += size
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class Profile(Observer):
+    """per phase timings: network (requests), parse (responses), decode
+    (values), output (formatting and writing) and poll (a whole device).
+    Phases of several devices overlap, as devices are polled in parallel."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # phase -> [count, total seconds, max seconds]
+        self.phases: Dict[str, List[float]] = {phase: [0, 0.0, 0.0] for phase in PHASES}
+        self.wall = 0.0
+
+    def add(self, phase: str, seconds: float):
+        with self._lock:
+            entry = self.phases[phase]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def on_request(
+        self, host: str, endpoint: str, seconds: float, status: int, size: int
+    ):
+        self.add("network", seconds)
+
+    def on_parse(self, host: str, endpoint: str, seconds: float):
+        self.add("parse", seconds)
+
+    def on_decode(self, host: str, tags: int, seconds: float):
+        self.add("decode", seconds)
+
+    def report(self) -> str:
+        """the timings as a table"""
+        lines = [
+            f"{'phase':<8} {'count':>8} {'total s':>10} {'mean ms':>10} {'max ms':>10}"
+        ]
+        with self._lock:
+            for phase, (count, total, maximum) in self.phases.items():
+                mean = total / count * 1000 if count else 0.0
+                lines.append(
+                    f"{phase:<8} {int(count):>8} {total:>10.3f} "
+                    f"{mean:>10.3f} {maximum * 1000:>10.3f}"
+                )
+        lines.append(f"{'wall':<8} {'':>8} {self.wall:>10.3f}")
+        return "\n".join(lines) + "\n"
+
+
+class Exporter:
+    """polls ``names`` (names of EcotouchTags) from all ``hosts`` every
+    ``interval`` seconds and writes one row per heatpump and poll to
+    ``output`` (StreamOutput or RotatingOutput). Memory use does not grow
+    with the number of polls."""
+
+    def __init__(
+        self,
+        hosts: Iterable[str],
+        names: Sequence[str],
+        output,
+        fmt: str = "csv",
+        interval: float = DEFAULT_INTERVAL,
+        username: str = "waterkotte",
+        password: str = "waterkotte",
+        timeout: float = FLEET_TIMEOUT,
+        profile: Optional[Profile] = None,
+    ):
+        unknown = [name for name in names if name not in TAGS]
+        if unknown:
+            raise ValueError(f"unknown tags: {', '.join(unknown)}")
+        self.names = list(names)
+        self.tags = [TAGS[name] for name in self.names]
+        self.output = output
+        self.format = FORMATS[fmt](self.names)
+        self.interval = interval
+        self.profile = profile
+        self.poller = FleetPoller(
+            hosts,
+            self.tags,
+            username=username,
+            password=password,
+            timeout=timeout,
+            observer=profile,
+        )
+
+    def close(self):
+        self.poller.close()
+        self.output.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def export_once(self):
+        """polls all heatpumps once and writes their rows"""
+        start = time.monotonic()
+        timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        for result in self.poller.poll():
+            output_start = time.perf_counter()
+            if result.values is None:
+                values = [None] * len(self.tags)
+            else:
+                values = [_plain(result.values.get(tag)) for tag in self.tags]
+            self.output.write(
+                self.format.row(timestamp, result, values), self.format.header
+            )
+            if self.profile is not None:
+                self.profile.add("output", time.perf_counter() - output_start)
+                self.profile.add("poll", result.latency)
+        self.output.flush()
+        if self.profile is not None:
+            self.profile.wall += time.monotonic() - start
+
+    def run(self, count: Optional[int] = None, sleep=time.sleep):
+        """exports every interval, ``count`` times or until interrupted"""
+        polls = 0
+        next_poll = time.monotonic()
+        while count is None or polls < count:
+            self.export_once()
+            polls += 1
+            if count is not None and polls >= count:
+                break
+            next_poll += self.interval
+            sleep(max(0.0, next_poll - time.monotonic()))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("hosts", nargs="+", help="addresses of the heatpumps")
+    parser.add_argument(
+        "--tags",
+        nargs="+",
+        metavar="NAME",
+        help="names of EcotouchTags (default: all measurements and counters)",
+    )
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--output", help="file to write to (default: stdout)")
+    parser.add_argument(
+        "--max-bytes",
+        type=int,
+        default=0,
+        help="rotate the output file once it exceeds this size",
+    )
+    parser.add_argument("--backups", type=int, default=BACKUPS)
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL)
+    parser.add_argument("--count", type=int, help="number of polls (default: no end)")
+    parser.add_argument("--timeout", type=float, default=FLEET_TIMEOUT)
+    parser.add_argument("--username", default="waterkotte")
+    parser.add_argument("--password", default="waterkotte")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print per phase timings to stderr when done",
+    )
+    args = parser.parse_args(argv)
+
+    if args.output:
+        output = RotatingOutput(args.output, args.max_bytes, args.backups)
+    else:
+        output = StreamOutput(sys.stdout)
+    profile = Profile() if args.profile else None
+    try:
+        exporter = Exporter(
+            args.hosts,
+            args.tags or default_tag_names(),
+            output,
+            fmt=args.format,
+            interval=args.interval,
+            username=args.username,
+            password=args.password,
+            timeout=args.timeout,
+            profile=profile,
+        )
+    except ValueError as error:
+        output.close()
+        parser.error(str(error))
+    with exporter:
+        try:
+            exporter.run(args.count)
+        except KeyboardInterrupt:
+            pass
+    if profile is not None:
+        sys.stderr.write(profile.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+parallel polling of many ecotouch heatpumps
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from .ecotouch import Ecotouch, ReadPlan, TagData, create_session
+from .exceptions import ConnectionException
+from .instrumentation import Observer
+from .priority import POLL
+
+FLEET_TIMEOUT = 10.0
+
+
+class DeviceResult(NamedTuple):
+    """outcome of polling a single heatpump"""
+
+    host: str
+    values: Optional[Dict[TagData, Any]]
+    error: Optional[Exception]
+    latency: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class FleetStats:
+    """aggregated statistics over all polls of a FleetPoller"""
+
+    polls: int = 0
+    failures: int = 0
+    cycles: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    min_latency: float = float("inf")
+    elapsed: float = 0.0
+    failures_by_host: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, result: DeviceResult):
+        self.polls += 1
+        if not result.ok:
+            self.failures += 1
+            self.failures_by_host[result.host] = (
+                self.failures_by_host.get(result.host, 0) + 1
+            )
+            return
+        self.total_latency += result.latency
+        self.max_latency = max(self.max_latency, result.latency)
+        self.min_latency = min(self.min_latency, result.latency)
+
+    @property
+    def successes(self) -> int:
+        return self.polls - self.failures
+
+    @property
+    def mean_latency(self) -> float:
+        """mean latency of the successful polls in seconds"""
+        return self.total_latency / self.successes if self.successes else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """successful polls per second of wall time"""
+        return self.successes / self.elapsed if self.elapsed else 0.0
+
+
+class _Device:
+    def __init__(self, ecotouch: Ecotouch):
+        self.ecotouch = ecotouch
+        self.logged_in = False
+        self.pending: Optional[Future] = None
+
+
+class FleetPoller:
+    """polls the same tags from many heatpumps in parallel.
+
+    Every heatpump is polled in its own worker thread using the login and
+    read_values semantics of Ecotouch. ``timeout`` applies to every
+    request and to the poll of a device including its retries; a device
+    that does not answer within ``timeout`` in total is reported as failed
+    without delaying the other devices. Failed devices log in again on
+    their next poll. An ``observer`` receives the measurements of all
+    devices (see Ecotouch)."""
+
+    def __init__(
+        self,
+        hosts: Iterable[str],
+        tags: Iterable[TagData],
+        username: str = "waterkotte",
+        password: str = "waterkotte",
+        max_workers: Optional[int] = None,
+        timeout: float = FLEET_TIMEOUT,
+        observer: Optional[Observer] = None,
+    ):
+        hosts = list(hosts)
+        self.plan = tags if isinstance(tags, ReadPlan) else ReadPlan(tags)
+        self.timeout = timeout
+        self.stats = FleetStats()
+        self._credentials = (username, password)
+        self._session = create_session(pool_connections=max(len(hosts), 1))
+        self._devices: List[_Device] = [
+            _Device(
+                Ecotouch(
+                    host,
+                    session=self._session,
+                    timeout=timeout,
+                    poll_deadline=timeout,
+                    observer=observer,
+                )
+            )
+            for host in hosts
+        ]
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or max(len(hosts), 1),
+            thread_name_prefix="pywaterkotte",
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """stops the workers and closes all connections.
+
+        Polls still running are awaited, which takes at most ``timeout``."""
+        self._executor.shutdown(wait=True)
+        self._session.close()
+
+    def _poll_device(self, device: _Device) -> DeviceResult:
+        start = time.monotonic()
+        try:
+            with device.ecotouch.priority(POLL):
+                if not device.logged_in:
+                    device.ecotouch.login(*self._credentials)
+                    device.logged_in = True
+                values = device.ecotouch.read_values(self.plan)
+            error = None
+        except Exception as exc:  # pylint: disable=broad-except
+            device.logged_in = False
+            values, error = None, exc
+        return DeviceResult(
+            device.ecotouch.hostname, values, error, time.monotonic() - start
+        )
+
+    def poll(self) -> Iterator[DeviceResult]:
+        """polls all heatpumps once, yielding each result as soon as it is there"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        pending: Dict[Future, _Device] = {}
+        try:
+            for device in self._devices:
+                if device.pending is not None and not device.pending.done():
+                    yield self._record(
+                        device,
+                        ConnectionException("previous poll still running"),
+                        0.0,
+                    )
+                    continue
+                device.pending = self._executor.submit(self._poll_device, device)
+                pending[device.pending] = device
+
+            while pending:
+                done, _ = wait(
+                    pending,
+                    timeout=max(deadline - time.monotonic(), 0),
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    break
+                for future in done:
+                    del pending[future]
+                    result = future.result()
+                    self.stats.add(result)
+                    yield result
+
+            for device in pending.values():
+                device.logged_in = False
+                yield self._record(
+                    device,
+                    ConnectionException(f"no response within {self.timeout}s"),
+                    time.monotonic() - start,
+                )
+        finally:
+            self.stats.cycles += 1
+            self.stats.elapsed += time.monotonic() - start
+
+    def _record(self, device: _Device, error: Exception, latency: float):
+        result = DeviceResult(device.ecotouch.hostname, None, error, latency)
+        self.stats.add(result)
+        return result
@@ -0,0 +1,348 @@
+"""
+local gateway sharing one heatpump session between many clients
+"""
+import argparse
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from .cache import RegisterCache
+from .ecotouch import Ecotouch
+from .exceptions import (
+    AuthenticationException,
+    ConnectionException,
+    InvalidResponseException,
+)
+from .protocol import (
+    STATUS_NEED_LOGIN,
+    STATUS_OK,
+    TOKEN_COOKIE,
+    TagRecord,
+    format_tag_records,
+    write_tags_params,
+)
+
+DEFAULT_PORT = 8080
+# seconds read values are shared with other clients
+DEFAULT_TTL = 1.0
+# files served from the heatpump unchanged, cached after the first request
+STATIC_FILES = ("/easycon/js/dictionary.js", "/easycon/hpType.csv")
+
+
+def _ok_values(records: Dict[str, TagRecord]) -> Dict[str, str]:
+    return {
+        register: record.value
+        for register, record in records.items()
+        if record.status == STATUS_OK and record.value
+    }
+
+
+class _Batch:
+    """registers read together in one upstream read"""
+
+    def __init__(self):
+        self.registers: Dict[str, None] = {}
+        self.records: Dict[str, TagRecord] = {}
+        self.error: Optional[Exception] = None
+        self.done = threading.Event()
+
+
+class ReadCoalescer:
+    """shares the reads and writes of many clients of one heatpump.
+
+    Only one upstream request runs at a time. Reads arriving meanwhile are
+    merged into a single batch which is sent as soon as the running
+    request is done; reads of registers already requested wait for that
+    request instead. Values read are served to all clients for ``ttl``
+    seconds, so the upstream load does not grow with the number of
+    clients. They are kept in ``ecotouch.cache``, which is created with
+    ``ttl`` if the instance has none. ``reads`` and ``upstream_reads``
+    count client reads and readTags requests sent to the heatpump."""
+
+    def __init__(self, ecotouch: Ecotouch, ttl: float = DEFAULT_TTL):
+        self.ecotouch = ecotouch
+        if ecotouch.cache is None:
+            ecotouch.cache = RegisterCache(ttl)
+        self.cache = ecotouch.cache
+        self.reads = 0
+        self.upstream_reads = 0
+        self.upstream_writes = 0
+        self._lock = threading.Lock()
+        self._upstream = threading.Lock()
+        self._in_flight: Optional[_Batch] = None
+        self._next: Optional[_Batch] = None
+
+    def read(self, registers: Sequence[str]) -> Dict[str, TagRecord]:
+        """the records of ``registers``; registers the heatpump did not
+        answer are missing"""
+        cached, missing = self.cache.lookup(registers)
+        records = {
+            register: TagRecord(STATUS_OK, value) for register, value in cached.items()
+        }
+        batches: List[_Batch] = []
+        leader = False
+        with self._lock:
+            self.reads += 1
+            in_flight = self._in_flight
+            rest = [
+                register
+                for register in missing
+                if in_flight is None or register not in in_flight.registers
+            ]
+            if len(rest) < len(missing):
+                batches.append(in_flight)
+            if rest:
+                if self._next is None:
+                    self._next = _Batch()
+                    leader = True
+                self._next.registers.update(dict.fromkeys(rest))
+                batches.append(self._next)
+        if leader:
+            self._run(batches[-1])
+        for batch in batches:
+            batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+            records.update(batch.records)
+        return {
+            register: records[register] for register in registers if register in records
+        }
+
+    def _run(self, batch: _Batch):
+        with self._upstream:
+            with self._lock:
+                # from now on new reads go into the next batch
+                self._next = None
+                self._in_flight = batch
+            try:
+                batch.records = self._fetch(list(batch.registers))
+            except Exception as error:  # pylint: disable=broad-except
+                # handed to every client waiting for the batch
+                batch.error = error
+            finally:
+                with self._lock:
+                    self._in_flight = None
+                batch.done.set()
+
+    def _fetch(self, registers: List[str]) -> Dict[str, TagRecord]:
+        # the records of failed registers are passed on to the clients, so
+        # the values are not read with _read_register_values, which raises
+        records: Dict[str, TagRecord] = {}
+        chunks = self.ecotouch._fetch_chunks(
+            registers, deadline=self.ecotouch._deadline()
+        )
+        for _, chunk_records in chunks:
+            self.upstream_reads += 1
+            records.update(chunk_records)
+        self.cache.update(_ok_values(records))
+        return records
+
+    def write(self, to_write: Dict[str, str]) -> Dict[str, TagRecord]:
+        """writes register values, returning the records of the heatpump"""
+        with self._upstream:
+            self.cache.invalidate(to_write)
+            self.upstream_writes += 1
+            records = self.ecotouch._request_records(
+                "/cgi/writeTags",
+                write_tags_params(to_write),
+                self.ecotouch._deadline(),
+            )
+            self.cache.update(_ok_values(records))
+        return records
+
+
+class Gateway(ThreadingHTTPServer):
+    """serves the cgi interface of one heatpump on a local port.
+
+    Clients use the gateway like the heatpump itself, e.g.
+    ``Ecotouch("localhost:8080")``, while the gateway talks to the heatpump
+    over the single session of ``ecotouch``, which has to be logged in.
+    Clients log in with ``username`` and ``password``; readTags and
+    writeTags without the token of a login are answered with
+    #E_NEED_LOGIN. Reads and writes
+    are shared through a ReadCoalescer, dictionary.js and hpType.csv are
+    downloaded once."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        ecotouch: Ecotouch,
+        address: Tuple[str, int] = ("127.0.0.1", DEFAULT_PORT),
+        ttl: float = DEFAULT_TTL,
+        username: str = "waterkotte",
+        password: str = "waterkotte",
+    ):
+        super().__init__(address, GatewayHandler)
+        self.ecotouch = ecotouch
+        self.coalescer = ReadCoalescer(ecotouch, ttl)
+        self.username = username
+        self.password = password
+        self.token = secrets.token_hex(8)
+        self._files: Dict[str, Tuple[bytes, str]] = {}
+        self._files_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host(self) -> str:
+        """host:port to pass to Ecotouch"""
+        return f"{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self) -> "Gateway":
+        """serves requests in a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def static_file(self, path: str) -> Tuple[bytes, str]:
+        """body and content type of a file served by the heatpump"""
+        with self._files_lock:
+            cached = self._files.get(path)
+            if cached is not None:
+                return cached
+            response = self.ecotouch._get(path)
+            if not response.ok:
+                raise ConnectionException(
+                    f"heatpump returned {response.status_code} {response.reason}"
+                )
+            cached = self._files[path] = (
+                response.content,
+                response.headers.get("Content-Type", "text/plain"),
+            )
+            return cached
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are sent separately, avoid delayed ACKs on keep-alive
+    disable_nagle_algorithm = True
+    server: Gateway
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        try:
+            if url.path == "/cgi/login":
+                self.login(params)
+            elif url.path in ("/cgi/readTags", "/cgi/writeTags") and (
+                not self.logged_in()
+            ):
+                # answered like the heatpump answers an expired session
+                self.respond(200, f"#{STATUS_NEED_LOGIN}\n")
+            elif url.path == "/cgi/readTags":
+                registers = [value for key, value in params.items() if key[:1] == "t"]
+                self.respond(200, format_tag_records(server.coalescer.read(registers)))
+            elif url.path == "/cgi/writeTags":
+                to_write = {
+                    register: params["v" + key[1:]]
+                    for key, register in params.items()
+                    if key[:1] == "t" and "v" + key[1:] in params
+                }
+                self.respond(200, format_tag_records(server.coalescer.write(to_write)))
+            elif url.path in STATIC_FILES:
+                body, content_type = server.static_file(url.path)
+                self.respond(200, body, content_type=content_type)
+            else:
+                self.respond(404, "")
+        except (
+            AuthenticationException,
+            ConnectionException,
+            InvalidResponseException,
+            requests.RequestException,
+        ):
+            # the clients see the heatpump as unreachable and retry
+            self.respond(502, "")
+
+    def logged_in(self) -> bool:
+        """whether the request carries the token of a login"""
+        for part in self.headers.get("Cookie", "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == TOKEN_COOKIE:
+                return secrets.compare_digest(value, self.server.token)
+        return False
+
+    def login(self, params: Dict[str, str]):
+        server = self.server
+        if (
+            params.get("username") != server.username
+            or params.get("password") != server.password
+        ):
+            self.respond(200, "#E_PASS_DONT_MATCH")
+            return
+        self.respond(
+            200,
+            f"1\n#S_OK\n{TOKEN_COOKIE}={server.token}",
+            {"Set-Cookie": f"{TOKEN_COOKIE}={server.token}; Path=/"},
+        )
+
+    def respond(
+        self,
+        status: int,
+        body,
+        headers: Optional[Dict[str, str]] = None,
+        content_type: str = "text/plain",
+    ):
+        payload = body if isinstance(body, bytes) else body.encode("latin-1", "replace")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("host", help="address of the heatpump")
+    parser.add_argument("--username", default="waterkotte")
+    parser.add_argument("--password", default="waterkotte")
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--ttl", type=float, default=DEFAULT_TTL, help="seconds values are shared"
+    )
+    args = parser.parse_args(argv)
+
+    ecotouch = Ecotouch(args.host)
+    ecotouch.login(args.username, args.password)
+    gateway = Gateway(
+        ecotouch,
+        address=(args.bind, args.port),
+        ttl=args.ttl,
+        username=args.username,
+        password=args.password,
+    )
+    print(f"serving {args.host} on http://{gateway.host}")
+    try:
+        gateway.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gateway.server_close()
+        ecotouch.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+instrumentation of the requests sent to heatpumps
+"""
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterable, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARSE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+CHUNK_BUCKETS = (1, 2, 3, 5, 10, 20, 50)
+
+
+def endpoint_name(path: str) -> str:
+    """short name of a request path, e.g. readTags for /cgi/readTags"""
+    return path.rsplit("/", 1)[-1]
+
+
+class Observer:
+    """receives measurements from Ecotouch; all methods do nothing by default.
+
+    Subclass it and override the methods of interest. Methods are called
+    from the thread which sent the request and must not block."""
+
+    def on_request(
+        self, host: str, endpoint: str, seconds: float, status: int, size: int
+    ):
+        """a response was received completely, ``size`` is its length in bytes"""
+
+    def on_error(self, host: str, endpoint: str, error: Exception):
+        """a request failed without a response (connection error, timeout)"""
+
+    def on_parse(self, host: str, endpoint: str, seconds: float):
+        """a readTags/writeTags response was parsed"""
+
+    def on_read(self, host: str, chunks: int, registers: int):
+        """read_values sent ``chunks`` requests for ``registers`` registers"""
+
+    def on_decode(self, host: str, tags: int, seconds: float):
+        """read_values decoded the values of ``tags`` tags"""
+
+    def on_retry(self, host: str, endpoint: str, attempt: int, delay: float):
+        """a failed request is repeated after ``delay`` seconds"""
+
+    def on_auth_failure(self, host: str):
+        """a login was rejected or the session had expired"""
+
+
+class Histogram:
+    """histogram with fixed upper bounds, as used by prometheus"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(upper bound, number of values <= bound), ending with +Inf"""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Iterable) -> str:
+    """prometheus labels, e.g. {host="heatpump",endpoint="readTags"}"""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def format_histogram(
+    prefix: str,
+    name: str,
+    label_names: Tuple[str, ...],
+    key: tuple,
+    hist: Histogram,
+) -> List[str]:
+    """the bucket, sum and count lines of one histogram"""
+    lines = []
+    for bound, count in hist.cumulative():
+        labels = format_labels(label_names + ("le",), key + (bound,))
+        lines.append(f"{prefix}_{name}_bucket{labels} {count}")
+    labels = format_labels(label_names, key)
+    lines.append(f"{prefix}_{name}_sum{labels} {hist.sum!r}")
+    lines.append(f"{prefix}_{name}_count{labels} {hist.count}")
+    return lines
+
+
+class Metrics(Observer):
+    """observer collecting counters and histograms per host and endpoint.
+
+    One instance can be shared by several Ecotouch instances. prometheus()
+    renders everything in the prometheus text exposition format."""
+
+    def __init__(
+        self,
+        latency_buckets: Sequence[float] = LATENCY_BUCKETS,
+        parse_buckets: Sequence[float] = PARSE_BUCKETS,
+        chunk_buckets: Sequence[float] = CHUNK_BUCKETS,
+    ):
+        self._lock = threading.Lock()
+        self.requests: DefaultDict[Tuple[str, str, int], int] = defaultdict(int)
+        self.bytes: DefaultDict[Tuple[str, str], int] = defaultdict(int)
+        self.errors: DefaultDict[Tuple[str, str, str], int] = defaultdict(int)
+        self.retries: DefaultDict[Tuple[str, str], int] = defaultdict(int)
+        self.auth_failures: DefaultDict[str, int] = defaultdict(int)
+        self.latency: DefaultDict[Tuple[str, str], Histogram] = defaultdict(
+            lambda: Histogram(latency_buckets)
+        )
+        self.parse_time: DefaultDict[Tuple[str, str], Histogram] = defaultdict(
+            lambda: Histogram(parse_buckets)
+        )
+        self.chunks: DefaultDict[str, Histogram] = defaultdict(
+            lambda: Histogram(chunk_buckets)
+        )
+
+    def on_request(
+        self, host: str, endpoint: str, seconds: float, status: int, size: int
+    ):
+        with self._lock:
+            self.requests[host, endpoint, status] += 1
+            self.bytes[host, endpoint] += size
+            self.latency[host, endpoint].observe(seconds)
+
+    def on_error(self, host: str, endpoint: str, error: Exception):
+        with self._lock:
+            self.errors[host, endpoint, type(error).__name__] += 1
+
+    def on_parse(self, host: str, endpoint: str, seconds: float):
+        with self._lock:
+            self.parse_time[host, endpoint].observe(seconds)
+
+    def on_read(self, host: str, chunks: int, registers: int):
+        with self._lock:
+            self.chunks[host].observe(chunks)
+
+    def on_retry(self, host: str, endpoint: str, attempt: int, delay: float):
+        with self._lock:
+            self.retries[host, endpoint] += 1
+
+    def on_auth_failure(self, host: str):
+        with self._lock:
+            self.auth_failures[host] += 1
+
+    def prometheus(self, prefix: str = "pywaterkotte") -> str:
+        """all metrics in the prometheus text exposition format"""
+        lines: List[str] = []
+
+        def counter(name, help_text, label_names, values: Dict):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for key, value in sorted(values.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                labels = format_labels(label_names, key)
+                lines.append(f"{prefix}_{name}{labels} {value}")
+
+        def histogram(name, help_text, label_names, values: Dict):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for key, hist in sorted(values.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                lines.extend(format_histogram(prefix, name, label_names, key, hist))
+
+        with self._lock:
+            counter(
+                "requests_total",
+                "Responses received from heatpumps.",
+                ("host", "endpoint", "status"),
+                self.requests,
+            )
+            counter(
+                "response_bytes_total",
+                "Bytes received from heatpumps.",
+                ("host", "endpoint"),
+                self.bytes,
+            )
+            counter(
+                "request_errors_total",
+                "Requests failed without a response.",
+                ("host", "endpoint", "error"),
+                self.errors,
+            )
+            counter(
+                "retries_total",
+                "Repeated requests.",
+                ("host", "endpoint"),
+                self.retries,
+            )
+            counter(
+                "auth_failures_total",
+                "Rejected logins and expired sessions.",
+                ("host",),
+                self.auth_failures,
+            )
+            histogram(
+                "request_duration_seconds",
+                "Round trip time of requests.",
+                ("host", "endpoint"),
+                self.latency,
+            )
+            histogram(
+                "parse_duration_seconds",
+                "Time spent parsing responses.",
+                ("host", "endpoint"),
+                self.parse_time,
+            )
+            histogram(
+                "read_chunks",
+                "Requests sent per read of several registers.",
+                ("host",),
+                self.chunks,
+            )
+        return "\n".join(lines) + "\n"
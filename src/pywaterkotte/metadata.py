@@ -0,0 +1,84 @@
+"""
+on-disk cache of the static files served by the heatpump
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+FORMAT_VERSION = 2
+
+
+def default_cache_dir() -> str:
+    """$XDG_CACHE_HOME/pywaterkotte, defaulting to ~/.cache/pywaterkotte"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "pywaterkotte")
+
+
+class MetadataCache:
+    """caches parsed metadata of heatpumps (translations, heatpump types).
+
+    Entries are stored per host and name as compact JSON files and are
+    only valid for the firmware they were created with; a firmware update
+    replaces them. Files are written atomically, so several processes can
+    share the directory. Within a process, entries are additionally kept
+    in memory and shared by all instances using the same directory."""
+
+    _memory: Dict[str, Tuple[str, Any]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or default_cache_dir()
+
+    def _path(self, host: str, name: str) -> str:
+        safe_host = re.sub(r"[^\w.-]", "_", host)
+        return os.path.join(self.directory, f"{safe_host}.{name}.json")
+
+    def load(self, host: str, firmware: str, name: str) -> Optional[Any]:
+        """returns the cached data or None if missing or for another firmware"""
+        path = self._path(host, name)
+        entry = self._memory.get(path)
+        if entry is not None and entry[0] == firmware:
+            return entry[1]
+        try:
+            with open(path, encoding="utf-8") as cache_file:
+                content = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if (
+            not isinstance(content, dict)
+            or content.get("version") != FORMAT_VERSION
+            or content.get("firmware") != firmware
+        ):
+            return None
+        with self._lock:
+            self._memory[path] = (firmware, content["data"])
+        return content["data"]
+
+    def store(self, host: str, firmware: str, name: str, data: Any):
+        """stores data (which has to be JSON serializable) for a firmware"""
+        path = self._path(host, name)
+        os.makedirs(self.directory, exist_ok=True)
+        content = {"version": FORMAT_VERSION, "firmware": firmware, "data": data}
+        file_no, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_no, "w", encoding="utf-8") as tmp_file:
+                json.dump(content, tmp_file, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._lock:
+            self._memory[path] = (firmware, data)
+
+    def get(self, host: str, firmware: str, name: str, loader: Callable[[], Any]):
+        """returns the cached data, calling ``loader`` to create it if needed"""
+        data = self.load(host, firmware, name)
+        if data is None:
+            data = loader()
+            self.store(host, firmware, name, data)
+        return data
@@ -0,0 +1,264 @@
+"""
+incremental COP, energy and compressor duty cycle from polled values
+"""
+import math
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from .ecotouch import EcotouchTags, TagData
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+WINDOWS = (HOUR, DAY)
+WINDOW_BUCKETS = 60
+# time constant of the rolling COP in seconds
+ROLLING_TAU = 900.0
+# decreases of a counter up to this many kWh are treated as noise, larger
+# ones as a reset (the yearly counters restart at the turn of the year)
+RESET_TOLERANCE = 1.0
+# electrical power in kW below which no rolling COP is reported
+MIN_POWER = 0.05
+
+HEAT_COUNTERS = (
+    EcotouchTags.HEATING_ENERGY_PRODUCED_YEAR,
+    EcotouchTags.HOT_WATER_ENERGY_PRODUCED_YEAR,
+)
+ELECTRICITY_COUNTERS = (
+    EcotouchTags.COMPRESSOR_ELECTRIC_CONSUMPTION_YEAR,
+    EcotouchTags.SOURCEPUMP_ELECTRIC_CONSUMPTION_YEAR,
+)
+# all tags used by PerformanceTracker
+TAGS = (
+    HEAT_COUNTERS
+    + ELECTRICITY_COUNTERS
+    + (
+        EcotouchTags.ELECTRICAL_POWER,
+        EcotouchTags.THERMAL_POWER,
+        EcotouchTags.STATE_COMPRESSOR,
+    )
+)
+
+
+class CounterDelta:
+    """turns readings of an energy counter into increments.
+
+    A counter going down by more than ``tolerance`` was reset, so its new
+    reading is the increment since the reset. Smaller decreases are
+    treated as noise and ignored."""
+
+    def __init__(self, tolerance: float = RESET_TOLERANCE):
+        self.tolerance = tolerance
+        self.last: Optional[float] = None
+        self.resets = 0
+
+    def update(self, value: float) -> float:
+        """the increment since the previous reading, 0 for the first one"""
+        last = self.last
+        if last is None:
+            self.last = value
+            return 0.0
+        if value >= last:
+            self.last = value
+            return value - last
+        if last - value <= self.tolerance:
+            return 0.0
+        self.resets += 1
+        self.last = value
+        return value
+
+
+class WindowedSum:
+    """sum of the values added during the last ``window`` seconds.
+
+    The window is split into ``buckets`` buckets, so values leave the sum
+    one bucket at a time and memory does not depend on the number of
+    values."""
+
+    def __init__(self, window: float, buckets: int = WINDOW_BUCKETS):
+        self.window = window
+        self.width = window / buckets
+        self._buckets = [0.0] * buckets
+        self._current: Optional[int] = None
+        self._sum = 0.0
+
+    def _advance(self, timestamp: float):
+        index = int(timestamp // self.width)
+        if self._current is None:
+            self._current = index
+            return
+        if index <= self._current:
+            return
+        count = len(self._buckets)
+        for number in range(self._current + 1, min(index, self._current + count) + 1):
+            self._buckets[number % count] = 0.0
+        self._current = index
+        # summed again instead of subtracting, so rounding errors do not add up
+        self._sum = math.fsum(self._buckets)
+
+    def add(self, timestamp: float, value: float):
+        self._advance(timestamp)
+        self._buckets[self._current % len(self._buckets)] += value
+        self._sum += value
+
+    def total(self, timestamp: Optional[float] = None) -> float:
+        if timestamp is not None:
+            self._advance(timestamp)
+        return self._sum
+
+
+class Ewma:
+    """exponentially weighted moving average over time with time constant
+    ``tau`` seconds, for irregularly spaced samples"""
+
+    def __init__(self, tau: float):
+        self.tau = tau
+        self.value: Optional[float] = None
+        self._timestamp: Optional[float] = None
+
+    def update(self, timestamp: float, value: float) -> float:
+        if self.value is None:
+            self.value = value
+        else:
+            elapsed = max(0.0, timestamp - self._timestamp)
+            weight = 1.0 - math.exp(-elapsed / self.tau)
+            self.value += weight * (value - self.value)
+        self._timestamp = timestamp
+        return self.value
+
+
+def _ratio(numerator: float, denominator: float) -> Optional[float]:
+    return numerator / denominator if denominator > 0 else None
+
+
+class Performance(NamedTuple):
+    """derived values after a sample, None where not known yet.
+
+    Energies are in kWh. ``cop`` is the rolling COP from the current
+    thermal and electrical power; ``window_cop`` and ``duty_cycle`` map
+    each window (seconds) to the COP from the energy counters and the
+    share of time the compressor ran; ``seasonal_cop`` covers everything
+    since the tracker was started."""
+
+    timestamp: float
+    heat: float
+    electricity: float
+    cop: Optional[float]
+    window_cop: Dict[float, Optional[float]]
+    seasonal_cop: Optional[float]
+    duty_cycle: Dict[float, Optional[float]]
+    compressor_starts: int
+
+
+class PerformanceTracker:
+    """derives COP, energy increments and the compressor duty cycle from the
+    results of read_values (or a PollScheduler) as they arrive.
+
+    Every update takes constant time and memory stays constant however long
+    the tracker runs. Tags missing in a result (e.g. counters which are
+    polled less often) are simply skipped. Heat is the sum of
+    ``heat_counters``, electricity the sum of ``electricity_counters``."""
+
+    def __init__(
+        self,
+        windows: Sequence[float] = WINDOWS,
+        buckets: int = WINDOW_BUCKETS,
+        tau: float = ROLLING_TAU,
+        heat_counters: Sequence[TagData] = HEAT_COUNTERS,
+        electricity_counters: Sequence[TagData] = ELECTRICITY_COUNTERS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.windows = tuple(windows)
+        self._clock = clock
+        self._counters: Tuple[Tuple[TagData, CounterDelta, bool], ...] = tuple(
+            (tag, CounterDelta(), True) for tag in heat_counters
+        ) + tuple((tag, CounterDelta(), False) for tag in electricity_counters)
+        self._heat = {window: WindowedSum(window, buckets) for window in self.windows}
+        self._electricity = {
+            window: WindowedSum(window, buckets) for window in self.windows
+        }
+        self._running = {
+            window: WindowedSum(window, buckets) for window in self.windows
+        }
+        self._observed = {
+            window: WindowedSum(window, buckets) for window in self.windows
+        }
+        self._thermal_power = Ewma(tau)
+        self._electrical_power = Ewma(tau)
+        self.heat = 0.0
+        self.electricity = 0.0
+        self.compressor_starts = 0
+        self._compressor: Optional[Tuple[float, bool]] = None
+
+    def update(
+        self, values: Dict[TagData, Any], timestamp: Optional[float] = None
+    ) -> Performance:
+        """adds a sample and returns the derived values"""
+        if timestamp is None:
+            timestamp = self._clock()
+        heat = electricity = 0.0
+        for tag, counter, is_heat in self._counters:
+            value = values.get(tag)
+            if value is None:
+                continue
+            delta = counter.update(value)
+            if is_heat:
+                heat += delta
+            else:
+                electricity += delta
+        if heat or electricity:
+            self.heat += heat
+            self.electricity += electricity
+            for window in self.windows:
+                self._heat[window].add(timestamp, heat)
+                self._electricity[window].add(timestamp, electricity)
+
+        cop = None
+        thermal_power = values.get(EcotouchTags.THERMAL_POWER)
+        electrical_power = values.get(EcotouchTags.ELECTRICAL_POWER)
+        if thermal_power is not None and electrical_power is not None:
+            thermal = self._thermal_power.update(timestamp, thermal_power)
+            electrical = self._electrical_power.update(timestamp, electrical_power)
+            if electrical >= MIN_POWER:
+                cop = thermal / electrical
+
+        running = values.get(EcotouchTags.STATE_COMPRESSOR)
+        if running is not None:
+            self._update_compressor(timestamp, running)
+
+        return Performance(
+            timestamp,
+            heat,
+            electricity,
+            cop,
+            {
+                window: _ratio(
+                    self._heat[window].total(timestamp),
+                    self._electricity[window].total(timestamp),
+                )
+                for window in self.windows
+            },
+            _ratio(self.heat, self.electricity),
+            {
+                window: _ratio(
+                    self._running[window].total(timestamp),
+                    self._observed[window].total(timestamp),
+                )
+                for window in self.windows
+            },
+            self.compressor_starts,
+        )
+
+    def _update_compressor(self, timestamp: float, running: bool):
+        previous = self._compressor
+        self._compressor = (timestamp, running)
+        if previous is None:
+            return
+        since, was_running = previous
+        # the state read last time is assumed to have lasted until now
+        elapsed = max(0.0, timestamp - since)
+        for window in self.windows:
+            self._observed[window].add(timestamp, elapsed)
+            if was_running:
+                self._running[window].add(timestamp, elapsed)
+        if running and not was_running:
+            self.compressor_starts += 1
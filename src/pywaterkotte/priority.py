@@ -0,0 +1,146 @@
+"""
+prioritized and rate limited requests to a heatpump
+"""
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+from .instrumentation import Histogram, format_histogram, format_labels
+
+# priority classes, lower values are served first
+CONTROL = 0
+INTERACTIVE = 1
+POLL = 2
+BULK = 3
+PRIORITY_NAMES = ("control", "interactive", "poll", "bulk")
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestScheduler:
+    """decides which request is sent to a heatpump next.
+
+    At most ``max_concurrent`` requests run at the same time and, with
+    ``rate``, at most ``rate`` requests are started per second (in bursts
+    of up to ``burst``). Waiting requests are served strictly by priority
+    (CONTROL, INTERACTIVE, POLL, BULK) and in order of arrival within a
+    priority. Every readTags chunk is a request of its own, so a write
+    waits at most for the chunk which is currently being read.
+
+    ``queued`` holds the number of waiting requests per priority,
+    ``max_queued`` its maximum, ``requests`` the requests started and
+    ``wait_time`` histograms of the time spent waiting."""
+
+    def __init__(
+        self,
+        max_concurrent: int = 1,
+        rate: Optional[float] = None,
+        burst: int = 1,
+    ):
+        self.max_concurrent = max_concurrent
+        self.rate = rate
+        self.burst = burst
+        self.queued = [0] * len(PRIORITY_NAMES)
+        self.max_queued = [0] * len(PRIORITY_NAMES)
+        self.requests = [0] * len(PRIORITY_NAMES)
+        self.wait_time = [Histogram(WAIT_BUCKETS) for _ in PRIORITY_NAMES]
+        self._condition = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+
+    def _take_token(self) -> float:
+        """takes a token of the rate limit, or returns the seconds until
+        the next one is available"""
+        if self.rate is None:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._refilled) * self.rate
+        )
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def acquire(self, priority: int) -> float:
+        """waits until a request of ``priority`` may be sent and returns the
+        seconds waited. Call release() once the response has been read."""
+        start = time.monotonic()
+        entry = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            self.queued[priority] += 1
+            self.max_queued[priority] = max(
+                self.max_queued[priority], self.queued[priority]
+            )
+            try:
+                while True:
+                    if (
+                        self._waiting[0] == entry
+                        and self._in_flight < self.max_concurrent
+                    ):
+                        delay = self._take_token()
+                        if not delay:
+                            break
+                        self._condition.wait(delay)
+                    else:
+                        self._condition.wait()
+            except BaseException:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self.queued[priority] -= 1
+                self._condition.notify_all()
+                raise
+            heapq.heappop(self._waiting)
+            self.queued[priority] -= 1
+            self._in_flight += 1
+            waited = time.monotonic() - start
+            self.requests[priority] += 1
+            self.wait_time[priority].observe(waited)
+            # the next request may be allowed to run in parallel
+            self._condition.notify_all()
+        return waited
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int):
+        """holds a request slot of ``priority`` for the with block"""
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def prometheus(self, prefix: str = "pywaterkotte", host: str = "") -> str:
+        """queue depths and wait times in the prometheus text exposition format"""
+        names = ("host", "priority") if host else ("priority",)
+        lines = [
+            f"# HELP {prefix}_queued_requests Requests waiting to be sent.",
+            f"# TYPE {prefix}_queued_requests gauge",
+        ]
+        with self._condition:
+            for name, queued in zip(PRIORITY_NAMES, self.queued):
+                key = (host, name) if host else (name,)
+                labels = format_labels(names, key)
+                lines.append(f"{prefix}_queued_requests{labels} {queued}")
+            lines.append(
+                f"# HELP {prefix}_queue_wait_seconds Time requests waited to be sent."
+            )
+            lines.append(f"# TYPE {prefix}_queue_wait_seconds histogram")
+            for name, hist in zip(PRIORITY_NAMES, self.wait_time):
+                key = (host, name) if host else (name,)
+                lines.extend(
+                    format_histogram(prefix, "queue_wait_seconds", names, key, hist)
+                )
+        return "\n".join(lines) + "\n"
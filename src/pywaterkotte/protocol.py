@@ -0,0 +1,197 @@
+"""
+parsing of the responses sent by the ecotouch cgi interface
+"""
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .exceptions import InvalidResponseException, SessionExpiredException
+
+STATUS_OK = "S_OK"
+# overall status sent instead of the records if the session expired
+STATUS_NEED_LOGIN = "E_NEED_LOGIN"
+# code sent before the value of a record
+RECORD_CODE = "192"
+# cookie holding the session token
+TOKEN_COOKIE = "IDALToken"
+
+
+class TagRecord(NamedTuple):
+    """status and raw value of a single tag as reported by the heatpump"""
+
+    status: str
+    value: Optional[str]
+
+
+class TagStatusException(InvalidResponseException):
+    """thrown if the heatpump did not report S_OK for one or more tags
+
+    ``errors`` maps every failed tag to the status sent by the heatpump,
+    or to ``None`` if the tag was missing in the response."""
+
+    action = "read"
+
+    def __init__(self, errors: Dict[str, Optional[str]]):
+        self.errors = errors
+        super().__init__(f"could not {self.action} tags ({self._details()})")
+
+    def _details(self) -> str:
+        return ", ".join(
+            f"{tag}: {status or 'missing'}" for tag, status in self.errors.items()
+        )
+
+
+class WriteException(TagStatusException):
+    """thrown if writing one or more tags failed.
+
+    Besides ``errors`` (see TagStatusException), ``mismatches`` holds the
+    tags whose read-back value differs from the written one as
+    ``(written, returned)`` and ``written`` the tags written successfully."""
+
+    action = "write"
+
+    def __init__(
+        self,
+        errors: Dict[str, Optional[str]],
+        mismatches: Dict[str, Tuple[str, str]],
+        written: Dict[str, str],
+    ):
+        self.mismatches = mismatches
+        self.written = written
+        super().__init__(errors)
+
+    def _details(self) -> str:
+        details = [super()._details()] if self.errors else []
+        details.extend(
+            f"{tag}: wrote {value}, read back {returned}"
+            for tag, (value, returned) in self.mismatches.items()
+        )
+        return ", ".join(details)
+
+
+def parse_tag_records(lines: Iterable[str]) -> Dict[str, TagRecord]:
+    """parses the records of a readTags/writeTags response in a single pass
+
+    Every record consists of a ``#TAG\\tSTATUS`` header, usually followed by a
+    ``CODE\\tVALUE`` line. ``lines`` may be any iterable of lines, so the
+    body can be parsed while it is streamed from the heatpump."""
+    records: Dict[str, TagRecord] = {}
+    tag = None
+    status = None
+    for line in lines:
+        if not line:
+            continue
+        if line[0] == "#":
+            if tag is not None:
+                records[tag] = TagRecord(status, None)
+            tag, sep, status = line[1:].partition("\t")
+            if not sep:
+                if tag.rstrip() == STATUS_NEED_LOGIN:
+                    raise SessionExpiredException("session expired")
+                raise InvalidResponseException(f"heatpump returned {tag}")
+            status = status.rstrip()
+        elif tag is not None:
+            records[tag] = TagRecord(status, line.partition("\t")[2].rstrip())
+            tag = None
+    if tag is not None:
+        records[tag] = TagRecord(status, None)
+    return records
+
+
+def format_tag_records(records: Dict[str, TagRecord]) -> str:
+    """formats records like the body of a readTags/writeTags response"""
+    lines = []
+    for tag, record in records.items():
+        lines.append(f"#{tag}\t{record.status}\n")
+        if record.value is not None:
+            lines.append(f"{RECORD_CODE}\t{record.value}\n")
+    return "".join(lines)
+
+
+def check_tag_records(
+    records: Dict[str, TagRecord], tags: Iterable[str]
+) -> Dict[str, str]:
+    """returns the values of ``tags`` or raises a TagStatusException"""
+    values = {}
+    errors: Dict[str, Optional[str]] = {}
+    for tag in tags:
+        record = records.get(tag)
+        if record is None:
+            errors[tag] = None
+        elif record.status != STATUS_OK or not record.value:
+            errors[tag] = record.status
+        else:
+            values[tag] = record.value
+    if errors:
+        raise TagStatusException(errors)
+    return values
+
+
+def parse_status(text: str) -> str:
+    """extracts the overall state (e.g. S_OK) from a response"""
+    match = re.search(r"^#([A-Z_]+)", text, re.MULTILINE)
+    if match is None:
+        raise InvalidResponseException("invalid response. could not read state")
+    return match.group(1)
+
+
+def read_tags_params(tags: Sequence[str]) -> Dict[str, Any]:
+    """query parameters of a readTags request"""
+    params: Dict[str, Any] = {"n": len(tags)}
+    for i, tag in enumerate(tags):
+        params[f"t{i+1}"] = tag
+    return params
+
+
+def write_tags_params(to_write: Dict[str, str]) -> Dict[str, Any]:
+    """query parameters of a writeTags request.
+
+    With returnValue the heatpump answers with the values of the tags
+    after writing, in the same format as readTags."""
+    params: Dict[str, Any] = {"n": len(to_write), "returnValue": "true"}
+    for i, (tag, value) in enumerate(to_write.items()):
+        params[f"t{i+1}"] = tag
+        params[f"v{i+1}"] = value
+    return params
+
+
+def pack_write_chunks(
+    groups: Iterable[Dict[str, str]], chunk_size: int
+) -> List[Dict[str, str]]:
+    """packs the registers of several tags into as few writeTags requests
+    as possible without splitting the registers of one tag"""
+    chunks: List[Dict[str, str]] = []
+    chunk: Dict[str, str] = {}
+    for group in groups:
+        if chunk and len(chunk) + len(group) > chunk_size:
+            chunks.append(chunk)
+            chunk = {}
+        chunk.update(group)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def check_write_records(
+    records: Dict[str, TagRecord], to_write: Dict[str, str], verify: bool = False
+) -> Tuple[Dict[str, str], Dict[str, Optional[str]], Dict[str, Tuple[str, str]]]:
+    """evaluates a writeTags response.
+
+    Returns the confirmed values, the tags with an error status (``None``
+    if missing in the response, which only counts with ``verify``) and,
+    with ``verify``, the tags whose returned value differs from the one
+    written as ``(written, returned)``."""
+    written: Dict[str, str] = {}
+    errors: Dict[str, Optional[str]] = {}
+    mismatches: Dict[str, Tuple[str, str]] = {}
+    for tag, value in to_write.items():
+        record = records.get(tag)
+        if record is None:
+            if verify:
+                errors[tag] = None
+        elif record.status != STATUS_OK:
+            errors[tag] = record.status
+        elif verify and record.value != value:
+            mismatches[tag] = (value, record.value)
+        else:
+            written[tag] = record.value if record.value else value
+    return written, errors, mismatches
@@ -0,0 +1,257 @@
+"""
+compact columnar storage of polled values
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .ecotouch import TagData
+
+MISSING_INT = -(2**63)
+MISSING_BOOL = -1
+
+SCHEMA_FILE = "schema.json"
+TIMESTAMP_COLUMN = "timestamp"
+
+
+def column_name(tag: TagData) -> str:
+    """name of the column of a tag, e.g. A444_A445 or I51.3"""
+    name = "_".join(tag.tags)
+    return f"{name}.{tag.bit}" if tag.bit is not None else name
+
+
+def column_type(tag: TagData) -> str:
+    """array typecode of the values of a tag: d (float), q (int), b (bool)"""
+    if tag.read_function is not TagData._parse_value_default:
+        raise ValueError(f"{column_name(tag)} has no numeric value")
+    prefix = tag.tags[0][0]
+    if prefix == "A":
+        return "d"
+    if prefix == "D" or tag.bit is not None:
+        return "b"
+    return "q"
+
+
+_MISSING = {"d": math.nan, "q": MISSING_INT, "b": MISSING_BOOL}
+
+
+def _is_missing(typecode: str, value) -> bool:
+    if typecode == "d":
+        return value != value  # nan
+    return value == _MISSING[typecode]
+
+
+class _MemoryColumn:
+    def __init__(self, typecode: str):
+        self.typecode = typecode
+        self.data = array(typecode)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def append(self, value):
+        self.data.append(value)
+
+    def slice(self, start: int, stop: int) -> Sequence:
+        return self.data[start:stop]
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _FileColumn:
+    """column appended to a file and read through a memory map"""
+
+    def __init__(self, path: str, typecode: str):
+        self.typecode = typecode
+        self._struct = struct.Struct("=" + typecode)
+        self._file = open(path, "a+b")  # pylint: disable=consider-using-with
+        self._length = os.path.getsize(path) // self._struct.size
+        self._map: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def truncate(self, length: int):
+        self._file.truncate(length * self._struct.size)
+        self._length = length
+
+    def append(self, value):
+        self._file.write(self._struct.pack(value))
+        self._length += 1
+
+    def slice(self, start: int, stop: int) -> Sequence:
+        """zero-copy view of the values start:stop"""
+        stop = min(stop, self._length)
+        if self._view is None or len(self._view) < stop:
+            self._file.flush()
+            if self._length == 0:
+                return array(self.typecode)
+            # older views keep their own reference to the previous map
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map).cast(self.typecode)
+        return self._view[start:stop]
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._view = None
+        self._map = None
+        self._file.close()
+
+
+class Recorder:
+    """records polled values in typed columns with a timestamp column.
+
+    The schema (the tags) is fixed when the recorder is created. Columns
+    are arrays of floats, integers or booleans (``column_type``); missing
+    values are stored as nan, MISSING_INT or MISSING_BOOL. With ``path``,
+    every column is appended to its own file in that directory and read
+    through memory maps, so recordings can be larger than memory and
+    reopened later. Timestamps have to be appended in ascending order,
+    which makes range reads a binary search."""
+
+    def __init__(self, tags: Sequence[TagData], path: Optional[str] = None):
+        self.tags = list(dict.fromkeys(tags))
+        self.path = path
+        self._types = [column_type(tag) for tag in self.tags]
+        names = [column_name(tag) for tag in self.tags]
+        schema = {
+            "columns": [[name, code] for name, code in zip(names, self._types)],
+        }
+        if path is None:
+            self._timestamps = _MemoryColumn("d")
+            self._columns = [_MemoryColumn(code) for code in self._types]
+        else:
+            os.makedirs(path, exist_ok=True)
+            schema_path = os.path.join(path, SCHEMA_FILE)
+            if os.path.exists(schema_path):
+                with open(schema_path, encoding="utf-8") as schema_file:
+                    if json.load(schema_file) != schema:
+                        raise ValueError(f"{path} was recorded with other tags")
+            else:
+                with open(schema_path, "w", encoding="utf-8") as schema_file:
+                    json.dump(schema, schema_file)
+            self._timestamps = _FileColumn(
+                os.path.join(path, f"{TIMESTAMP_COLUMN}.d"), "d"
+            )
+            self._columns = [
+                _FileColumn(os.path.join(path, f"{name}.{code}"), code)
+                for name, code in zip(names, self._types)
+            ]
+            # drop a partially written last row
+            length = min(len(column) for column in self._all_columns())
+            for column in self._all_columns():
+                column.truncate(length)
+        self._index = {tag: i for i, tag in enumerate(self.tags)}
+        # kept, so append does not have to read the timestamp column
+        length = len(self._timestamps)
+        self._last_timestamp: Optional[float] = (
+            self._timestamps.slice(length - 1, length)[0] if length else None
+        )
+
+    def _all_columns(self):
+        return [self._timestamps] + self._columns
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, values: Dict[TagData, Any], timestamp: Optional[float] = None):
+        """appends the result of a poll (e.g. of read_values)"""
+        if timestamp is None:
+            timestamp = time.time()
+        if self._last_timestamp is not None and timestamp < self._last_timestamp:
+            raise ValueError("timestamps have to be appended in ascending order")
+        self._timestamps.append(timestamp)
+        self._last_timestamp = timestamp
+        for tag, column, typecode in zip(self.tags, self._columns, self._types):
+            value = values.get(tag)
+            column.append(_MISSING[typecode] if value is None else value)
+
+    def flush(self):
+        for column in self._all_columns():
+            column.flush()
+
+    def close(self):
+        for column in self._all_columns():
+            column.close()
+
+    def _bounds(self, start: Optional[float], stop: Optional[float]) -> Tuple[int, int]:
+        timestamps = self._timestamps.slice(0, len(self))
+        first = 0 if start is None else bisect_left(timestamps, start)
+        last = len(timestamps) if stop is None else bisect_right(timestamps, stop)
+        return first, last
+
+    def range(
+        self, start: Optional[float] = None, stop: Optional[float] = None
+    ) -> Tuple[Sequence[float], Dict[TagData, Sequence]]:
+        """timestamps and columns of all samples with start <= timestamp <= stop"""
+        first, last = self._bounds(start, stop)
+        return self._timestamps.slice(first, last), {
+            tag: column.slice(first, last)
+            for tag, column in zip(self.tags, self._columns)
+        }
+
+    def downsample(
+        self,
+        tag: TagData,
+        interval: float,
+        how: str = "mean",
+        start: Optional[float] = None,
+        stop: Optional[float] = None,
+    ) -> List[Tuple[float, Any]]:
+        """aggregates a column into buckets of ``interval`` seconds.
+
+        ``how`` is one of mean, min, max, first, last or delta (last - first,
+        e.g. the energy of an interval from a counter). Missing values are
+        ignored; buckets without samples are left out. Returns a list of
+        (bucket start, value)."""
+        aggregate = _AGGREGATES[how]
+        first, last = self._bounds(start, stop)
+        timestamps = self._timestamps.slice(first, last)
+        column_no = self._index[tag]
+        values = self._columns[column_no].slice(first, last)
+        typecode = self._types[column_no]
+
+        result = []
+        bucket_start = None
+        bucket: List[Any] = []
+        for timestamp, value in zip(timestamps, values):
+            if _is_missing(typecode, value):
+                continue
+            this_bucket = math.floor(timestamp / interval) * interval
+            if this_bucket != bucket_start:
+                if bucket:
+                    result.append((bucket_start, aggregate(bucket)))
+                bucket_start, bucket = this_bucket, []
+            bucket.append(value)
+        if bucket:
+            result.append((bucket_start, aggregate(bucket)))
+        return result
+
+
+_AGGREGATES: Dict[str, Callable[[List[Any]], Any]] = {
+    "mean": lambda values: sum(values) / len(values),
+    "min": min,
+    "max": max,
+    "first": lambda values: values[0],
+    "last": lambda values: values[-1],
+    "delta": lambda values: values[-1] - values[0],
+}
@@ -0,0 +1,172 @@
+"""
+registry of tags, indexed by name, register and register type
+"""
+import gzip
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .ecotouch import EcotouchTags, TagData
+
+TagTable = Iterable[Tuple[str, TagData]]
+
+
+def ecotouch_tags() -> TagTable:
+    """the tags defined in EcotouchTags"""
+    return [
+        (name, tag)
+        for name, tag in vars(EcotouchTags).items()
+        if isinstance(tag, TagData)
+    ]
+
+
+def parse_tag_table(lines: Iterable[str]) -> TagTable:
+    """parses a tag table: one tag per line with tab separated fields
+
+        NAME  REGISTERS  [UNIT  [FLAGS  [BIT]]]
+
+    REGISTERS are separated by commas (e.g. A444,A445), FLAGS may contain
+    w for writeable tags. Empty lines and lines starting with # are
+    ignored. Tags of a table always use the default decoders."""
+    table = []
+    for line_no, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("#"):
+            continue
+        fields = line.split("\t")
+        if len(fields) < 2:
+            raise ValueError(f"line {line_no}: expected name and registers")
+        fields += [""] * (5 - len(fields))
+        name, registers, unit, flags, bit = fields[:5]
+        register_list = registers.split(",")
+        for register in register_list:
+            if register[:1] not in ("A", "I", "D") or not register[1:].isdigit():
+                raise ValueError(f"line {line_no}: invalid register {register!r}")
+        table.append(
+            (
+                name,
+                TagData(
+                    register_list,
+                    unit or None,
+                    writeable="w" in flags,
+                    bit=int(bit) if bit else None,
+                ),
+            )
+        )
+    return table
+
+
+def load_tag_table(path: str) -> TagTable:
+    """reads a tag table file (see parse_tag_table), gzip compressed if the
+    name ends with .gz"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as table_file:
+        return parse_tag_table(table_file)
+
+
+def _remove_identical(tags: List[TagData], tag: TagData):
+    for index, other in enumerate(tags):
+        if other is tag:
+            del tags[index]
+            return
+
+
+class TagRegistry:
+    """tags indexed by name, by register (e.g. I51) and by register type
+    prefix (A, I or D).
+
+    Tables added with add_table are loaded on first access, so large
+    tables cost neither import time nor memory until they are needed.
+    Later tables may replace tags of earlier ones by name."""
+
+    def __init__(self, tables: Iterable[Callable[[], TagTable]] = ()):
+        self._pending: List[Callable[[], TagTable]] = list(tables)
+        self._lock = threading.Lock()
+        self._by_name: Dict[str, TagData] = {}
+        self._names: Dict[TagData, str] = {}
+        self._by_register: Dict[str, List[TagData]] = {}
+        self._by_prefix: Dict[str, List[TagData]] = {}
+
+    def add_table(self, loader: Callable[[], TagTable]):
+        """adds a table of (name, tag) pairs, loaded on first access"""
+        with self._lock:
+            self._pending.append(loader)
+
+    def add_table_file(self, path: str):
+        """adds a tag table file (see load_tag_table), loaded on first access"""
+        self.add_table(lambda: load_tag_table(path))
+
+    def register(self, name: str, tag: TagData):
+        """adds a single tag"""
+        self._load()
+        with self._lock:
+            self._add(name, tag)
+
+    def _add(self, name: str, tag: TagData):
+        previous = self._by_name.get(name)
+        if previous is not None:
+            # equal tags may be registered under other names, so the
+            # entries of this name are removed by identity
+            for register in previous.tags:
+                _remove_identical(self._by_register[register], previous)
+            _remove_identical(self._by_prefix[previous.tags[0][0]], previous)
+            if self._names.get(previous) == name:
+                del self._names[previous]
+                for other, other_tag in self._by_name.items():
+                    if other != name and other_tag == previous:
+                        self._names[other_tag] = other
+                        break
+        self._by_name[name] = tag
+        self._names.setdefault(tag, name)
+        for register in tag.tags:
+            self._by_register.setdefault(register, []).append(tag)
+        self._by_prefix.setdefault(tag.tags[0][0], []).append(tag)
+
+    def _load(self):
+        # a loader is only removed once all its tags are added, so an empty
+        # list means everything is loaded
+        if not self._pending:
+            return
+        with self._lock:
+            while self._pending:
+                for name, tag in self._pending[0]():
+                    self._add(name, tag)
+                del self._pending[0]
+
+    def __getitem__(self, name: str) -> TagData:
+        self._load()
+        return self._by_name[name]
+
+    def get(self, name: str) -> Optional[TagData]:
+        self._load()
+        return self._by_name.get(name)
+
+    def __contains__(self, name: object) -> bool:
+        self._load()
+        return name in self._by_name
+
+    def __iter__(self) -> Iterator[str]:
+        self._load()
+        return iter(list(self._by_name))
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._by_name)
+
+    def name_of(self, tag: TagData) -> Optional[str]:
+        """the (first) name a tag, or an equal one, was registered with"""
+        self._load()
+        return self._names.get(tag)
+
+    def by_register(self, register: str) -> List[TagData]:
+        """all tags reading a register, e.g. the state bits of I51"""
+        self._load()
+        return list(self._by_register.get(register, ()))
+
+    def by_prefix(self, prefix: str) -> List[TagData]:
+        """all tags whose (first) register has the type ``prefix``"""
+        self._load()
+        return list(self._by_prefix.get(prefix, ()))
+
+
+# the tags of EcotouchTags; add extended tables with TAGS.add_table_file
+TAGS = TagRegistry([ecotouch_tags])
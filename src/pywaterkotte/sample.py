@@ -1,6 +1,5 @@
 from pywaterkotte import Ecotouch, EcotouchTags
-
-from time import sleep
+from pywaterkotte.schedule import PollScheduler
 
 
 wp = Ecotouch("192.168.2.22")
@@ -13,11 +12,14 @@ tags = [
     EcotouchTags.HARDWARE_REVISION,
     EcotouchTags.BIOS,
     EcotouchTags.BIOS_DATE,
+    EcotouchTags.OUTSIDE_TEMPERATURE,
+    EcotouchTags.FLOW_TEMPERATURE,
 ]
 
-while True:
-    result = wp.read_values(tags)
+# firmware and bios are read once a day, the temperatures every 3 seconds
+scheduler = PollScheduler(wp, tags, category_intervals={"measurement": 3})
+
+for result in scheduler:
     for k, v in result.items():
         unit = k.unit if k.unit is not None else ""
         print(f"\t{k.tags}:\t{v} {unit}")
-    sleep(3)
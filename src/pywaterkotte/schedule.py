@@ -0,0 +1,132 @@
+"""
+polling of tags with individual refresh intervals
+"""
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .ecotouch import Ecotouch, EcotouchTags, ReadPlan, TagData
+from .priority import POLL
+
+# values which never change while the heatpump is running
+STATIC_TAGS = frozenset(
+    [
+        EcotouchTags.FIRMWARE_VERSION,
+        EcotouchTags.BUILD,
+        EcotouchTags.HARDWARE_REVISION,
+        EcotouchTags.BIOS,
+        EcotouchTags.BIOS_DATE,
+        EcotouchTags.SERIAL_NUMBER,
+        EcotouchTags.HEATPUMP_TYPE,
+    ]
+)
+
+# default refresh intervals in seconds
+CATEGORY_INTERVALS = {
+    "static": 24 * 3600.0,
+    "counter": 300.0,
+    "setting": 60.0,
+    "measurement": 10.0,
+}
+
+MAX_CACHED_PLANS = 32
+
+
+def tag_category(tag: TagData) -> str:
+    """category of a tag used to choose its default refresh interval"""
+    if tag in STATIC_TAGS:
+        return "static"
+    if tag.unit == "kWh":
+        return "counter"
+    if tag.writeable:
+        return "setting"
+    return "measurement"
+
+
+class PollScheduler:
+    """reads tags from a heatpump, each at its own refresh interval.
+
+    Intervals are taken from ``intervals`` or else from ``category_intervals``
+    (see tag_category). Every tick only the tags that are due are read, in
+    as few readTags requests as possible; tags that would become due within
+    ``slack`` seconds are read along with them. Results are passed to the
+    subscribed callbacks and returned by tick() or yielded by iterating
+    over the scheduler."""
+
+    def __init__(
+        self,
+        ecotouch: Ecotouch,
+        tags: Iterable[TagData],
+        intervals: Optional[Dict[TagData, float]] = None,
+        category_intervals: Optional[Dict[str, float]] = None,
+        slack: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.ecotouch = ecotouch
+        self.slack = slack
+        self._clock = clock
+        self._sleep = sleep
+        categories = dict(CATEGORY_INTERVALS, **(category_intervals or {}))
+        intervals = intervals or {}
+        self.intervals: Dict[TagData, float] = {
+            tag: intervals.get(tag, categories[tag_category(tag)])
+            for tag in dict.fromkeys(tags)
+        }
+        now = clock()
+        self._next_due: Dict[TagData, float] = {tag: now for tag in self.intervals}
+        self._plans: Dict[Tuple[TagData, ...], ReadPlan] = {}
+        self._callbacks: List[Callable[[Dict[TagData, Any]], None]] = []
+
+    def subscribe(self, callback: Callable[[Dict[TagData, Any]], None]):
+        """registers a callback which gets the values read in every tick"""
+        self._callbacks.append(callback)
+
+    def next_due(self) -> float:
+        """clock time at which the next tag is due, math.inf without tags"""
+        return min(self._next_due.values(), default=math.inf)
+
+    def due_tags(self, now: Optional[float] = None) -> Tuple[TagData, ...]:
+        """tags which have to be read at ``now``"""
+        if now is None:
+            now = self._clock()
+        limit = now + self.slack
+        return tuple(tag for tag, due in self._next_due.items() if due <= limit)
+
+    def _plan(self, tags: Tuple[TagData, ...]) -> ReadPlan:
+        plan = self._plans.get(tags)
+        if plan is None:
+            if len(self._plans) >= MAX_CACHED_PLANS:
+                self._plans.clear()
+            plan = self._plans[tags] = ReadPlan(tags)
+        return plan
+
+    def tick(self, now: Optional[float] = None) -> Dict[TagData, Any]:
+        """reads all due tags. Tags which failed to read stay due."""
+        if now is None:
+            now = self._clock()
+        tags = self.due_tags(now)
+        if not tags:
+            return {}
+        with self.ecotouch.priority(POLL):
+            values = self.ecotouch.read_values(self._plan(tags))
+        for tag in tags:
+            self._next_due[tag] = now + self.intervals[tag]
+        for callback in self._callbacks:
+            callback(values)
+        return values
+
+    def __iter__(self) -> Iterator[Dict[TagData, Any]]:
+        return self.run()
+
+    def run(self) -> Iterator[Dict[TagData, Any]]:
+        """polls forever, yielding the values of every tick. Ends at once
+        if there are no tags to poll."""
+        while True:
+            next_due = self.next_due()
+            if next_due == math.inf:
+                return
+            delay = next_due - self._clock()
+            if delay > 0:
+                self._sleep(delay)
+            yield self.tick()
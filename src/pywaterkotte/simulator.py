@@ -0,0 +1,381 @@
+"""
+local simulator of the heatpump web interface for tests and load tests
+"""
+import argparse
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import IO, Any, Deque, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from .ecotouch import EcotouchTags, TagData
+from .protocol import TOKEN_COOKIE
+
+DEFAULT_DICTIONARY = (
+    'lngA1=["Außentemperatur","outside temperature","température extérieure"];\n'
+    'lngA2=["Außentemperatur 1h","outside temperature 1h",'
+    '"température extérieure 1h"];\n'
+)
+DEFAULT_HEATPUMP_TYPES = "0;x;DS 5012\n1;y;DS 5023\n2;z;DS 5027\n"
+
+TraceKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+# login parameters never written to traces and ignored when replaying
+CREDENTIAL_PARAMS = ("username", "password")
+REDACTED = "REDACTED"
+_TOKEN = re.compile(f"({TOKEN_COOKIE}=)[^;\\s]+")
+
+
+def default_registers() -> Dict[str, str]:
+    """a value for every register used by EcotouchTags"""
+    registers = {}
+    for tag in vars(EcotouchTags).values():
+        if isinstance(tag, TagData):
+            registers.update({register: "0" for register in tag.tags})
+    # year, month, day, hour, minute
+    registers.update(zip(EcotouchTags.HOLIDAY_START_TIME.tags, "21 1 1 0 0".split()))
+    registers.update(zip(EcotouchTags.HOLIDAY_END_TIME.tags, "21 1 15 0 0".split()))
+    registers.update({"I1": "10896", "I2": "123", "I3": "1234", "I4": "14092"})
+    return registers
+
+
+def _trace_key(path: str, params: Dict[str, str]) -> TraceKey:
+    # logins are matched whatever the credentials
+    return path, tuple(
+        sorted(
+            (key, value)
+            for key, value in params.items()
+            if key not in CREDENTIAL_PARAMS
+        )
+    )
+
+
+def load_trace(trace_file: IO[str]) -> List[Dict[str, Any]]:
+    """reads a trace: one JSON object per line with path, params, status,
+    body and elapsed (seconds), as written by trace_hook"""
+    return [json.loads(line) for line in trace_file if line.strip()]
+
+
+def trace_hook(trace_file: IO[str]):
+    """returns a requests response hook which appends every response to a
+    trace file, e.g. ``ecotouch.session.hooks["response"].append(hook)``.
+
+    Usernames, passwords and session tokens are left out of the trace."""
+    lock = threading.Lock()
+
+    def hook(response: requests.Response, *args, **kwargs):
+        url = urlsplit(response.url)
+        body = response.content.decode("latin-1")
+        if TOKEN_COOKIE in body:
+            body = _TOKEN.sub(rf"\g<1>{REDACTED}", body)
+        entry = {
+            "path": url.path,
+            "params": {
+                key: value
+                for key, value in parse_qsl(url.query)
+                if key not in CREDENTIAL_PARAMS
+            },
+            "status": response.status_code,
+            "body": body,
+            "elapsed": response.elapsed.total_seconds(),
+        }
+        with lock:
+            trace_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    return hook
+
+
+class Simulator(ThreadingHTTPServer):
+    """simulates the cgi interface of a heatpump on a local port.
+
+    Serves /cgi/login, /cgi/readTags, /cgi/writeTags, dictionary.js and
+    hpType.csv from ``registers`` (register -> raw value); written values
+    are stored. For load tests:
+
+    - every request is delayed by ``latency`` plus an exponentially
+      distributed ``jitter`` (its mean), giving a long tail
+    - ``error_rate`` of the requests fail with HTTP 500
+    - at most ``max_connections`` requests are served at the same time,
+      others get HTTP 503; ``requests_per_connection`` closes keep-alive
+      connections after that many requests
+    - with ``session_timeout``, readTags/writeTags require a login not
+      older than that and answer #E_NEED_LOGIN otherwise
+    - requests found in ``trace`` (see load_trace) are answered with the
+      recorded responses and delays, in recorded order
+
+    The statistics ``requests`` (path, params) and ``max_in_flight`` are
+    kept for tests."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        registers: Optional[Dict[str, str]] = None,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        username: str = "waterkotte",
+        password: str = "waterkotte",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        max_connections: Optional[int] = None,
+        requests_per_connection: Optional[int] = None,
+        session_timeout: Optional[float] = None,
+        trace: Iterable[Dict[str, Any]] = (),
+        dictionary: str = DEFAULT_DICTIONARY,
+        heatpump_types: str = DEFAULT_HEATPUMP_TYPES,
+        seed: Optional[int] = None,
+    ):
+        super().__init__(address, SimulatorHandler)
+        self.registers = default_registers() if registers is None else registers
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_connections = max_connections
+        self.requests_per_connection = requests_per_connection
+        self.session_timeout = session_timeout
+        self.dictionary = dictionary
+        self.heatpump_types = heatpump_types
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, float] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests: List[Tuple[str, Dict[str, str]]] = []
+        self.trace: Dict[TraceKey, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for entry in trace:
+            self.trace[_trace_key(entry["path"], entry["params"])].append(entry)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host(self) -> str:
+        """host:port to pass to Ecotouch"""
+        return f"{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self) -> "Simulator":
+        """serves requests in a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def delay(self) -> float:
+        """seconds to wait before answering a simulated request"""
+        if self.jitter:
+            with self.lock:
+                return self.latency + self.random.expovariate(1 / self.jitter)
+        return self.latency
+
+    def fails(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def replay(self, path: str, params: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """the next recorded response for a request, if any"""
+        with self.lock:
+            entries = self.trace.get(_trace_key(path, params))
+            if not entries:
+                return None
+            entry = entries[0]
+            entries.rotate(-1)
+            return entry
+
+    def login(self, params: Dict[str, str]) -> Tuple[str, Optional[str]]:
+        """returns the body and the token of a new session"""
+        if (
+            params.get("username") != self.username
+            or params.get("password") != self.password
+        ):
+            return "#E_PASS_DONT_MATCH", None
+        token = secrets.token_hex(8)
+        with self.lock:
+            self.sessions[token] = time.monotonic()
+        return f"1\n#S_OK\n{TOKEN_COOKIE}={token}", token
+
+    def logged_in(self, token: Optional[str]) -> bool:
+        if self.session_timeout is None:
+            return True
+        with self.lock:
+            started = self.sessions.get(token)
+            if started is None:
+                return False
+            if time.monotonic() - started > self.session_timeout:
+                del self.sessions[token]
+                return False
+        return True
+
+    def read_tags(self, params: Dict[str, str]) -> str:
+        records = []
+        for key, register in params.items():
+            if key[:1] != "t":
+                continue
+            value = self.registers.get(register)
+            if value is None:
+                records.append(f"#{register}\tE_INACTIVETAG\n")
+            else:
+                records.append(f"#{register}\tS_OK\n192\t{value}\n")
+        return "".join(records)
+
+    def write_tags(self, params: Dict[str, str]) -> str:
+        records = []
+        for key, register in params.items():
+            if key[:1] != "t" or "v" + key[1:] not in params:
+                continue
+            if register not in self.registers:
+                records.append(f"#{register}\tE_INACTIVETAG\n")
+                continue
+            value = params["v" + key[1:]]
+            self.registers[register] = value
+            records.append(f"#{register}\tS_OK\n192\t{value}\n")
+        return "".join(records)
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are sent separately, avoid delayed ACKs on keep-alive
+    disable_nagle_algorithm = True
+    server: Simulator
+
+    def setup(self):
+        super().setup()
+        self.handled_requests = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        self.handled_requests += 1
+        if (
+            server.requests_per_connection
+            and self.handled_requests >= server.requests_per_connection
+        ):
+            self.close_connection = True
+
+        with server.lock:
+            server.requests.append((url.path, params))
+            if server.max_connections and server.in_flight >= server.max_connections:
+                busy = True
+            else:
+                busy = False
+                server.in_flight += 1
+                server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        if busy:
+            self.respond(503, "")
+            return
+        try:
+            self.handle_request(url.path, params)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def handle_request(self, path: str, params: Dict[str, str]):
+        server = self.server
+        entry = server.replay(path, params)
+        if entry is not None:
+            time.sleep(entry.get("elapsed", 0.0))
+            self.respond(entry.get("status", 200), entry["body"])
+            return
+
+        time.sleep(server.delay())
+        if server.fails():
+            self.respond(500, "")
+            return
+
+        cookies = {}
+        if self.headers.get("Cookie"):
+            cookies = dict(
+                part.strip().split("=", 1)
+                for part in self.headers["Cookie"].split(";")
+                if "=" in part
+            )
+        if path == "/cgi/login":
+            body, token = server.login(params)
+            headers = {}
+            if token is not None:
+                headers["Set-Cookie"] = f"{TOKEN_COOKIE}={token}; Path=/"
+            self.respond(200, body, headers)
+        elif path in ("/cgi/readTags", "/cgi/writeTags"):
+            if not server.logged_in(cookies.get(TOKEN_COOKIE)):
+                self.respond(200, "#E_NEED_LOGIN\n")
+            elif path == "/cgi/readTags":
+                self.respond(200, server.read_tags(params))
+            else:
+                self.respond(200, server.write_tags(params))
+        elif path == "/easycon/js/dictionary.js":
+            self.respond(200, server.dictionary)
+        elif path == "/easycon/hpType.csv":
+            self.respond(200, server.heatpump_types)
+        else:
+            self.respond(404, "")
+
+    def respond(self, status: int, body: str, headers: Optional[Dict[str, str]] = None):
+        payload = body.encode("latin-1", errors="replace")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-connections", type=int)
+    parser.add_argument("--requests-per-connection", type=int)
+    parser.add_argument("--session-timeout", type=float)
+    parser.add_argument("--trace", type=argparse.FileType("r", encoding="utf-8"))
+    args = parser.parse_args(argv)
+
+    simulator = Simulator(
+        address=(args.bind, args.port),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        max_connections=args.max_connections,
+        requests_per_connection=args.requests_per_connection,
+        session_timeout=args.session_timeout,
+        trace=load_trace(args.trace) if args.trace else (),
+    )
+    print(f"simulating a heatpump on http://{simulator.host}")
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+parser for the translations in dictionary.js of the heatpump web interface
+"""
+import operator
+import re
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+Texts = Tuple[Optional[str], Optional[str], Optional[str]]
+
+# a javascript string literal, unrolled to avoid an alternation per character
+_STRING_BODY = r'[^"\\]*(?:\\.[^"\\]*)*'
+
+# one token per assignment: lngID=["de","en","fr"], lngID="..." or
+# lngID=lngOTHER. The lookbehind follows the literal, so the regex engine
+# can still search for "lng" instead of trying every position.
+_ASSIGNMENT = re.compile(
+    r"lng(?<!\wlng)(\w+)\s*=\s*"
+    rf'(?:\[\s*"({_STRING_BODY})"'
+    rf'(?:\s*,\s*"({_STRING_BODY})")?'
+    rf'(?:\s*,\s*"({_STRING_BODY})")?'
+    rf'(?:\s*,\s*"{_STRING_BODY}")*\s*\]'
+    rf'|"({_STRING_BODY})"'
+    rf"|lng(\w+))",
+    re.DOTALL,
+)
+_groups = operator.methodcaller("groups")
+_ESCAPE = re.compile(r"\\(x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|.)", re.DOTALL)
+_SIMPLE_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v"}
+
+
+def _replace_escape(match: "re.Match") -> str:
+    escape = match.group(1)
+    if len(escape) > 1:
+        return chr(int(escape[1:], 16))
+    return _SIMPLE_ESCAPES.get(escape, escape)
+
+
+def _decode(text: str) -> str:
+    if "\\" in text:
+        text = _ESCAPE.sub(_replace_escape, text)
+    return sys.intern(text)
+
+
+class TranslationTable(Mapping):
+    """read-only mapping key -> (de, en, fr).
+
+    The texts are kept in three parallel lists of interned strings; keys
+    only map to a row number, so aliases share the row of their target and
+    repeated texts are stored only once."""
+
+    def __init__(
+        self,
+        index: Dict[str, int],
+        de_texts: List[Optional[str]],
+        en_texts: List[Optional[str]],
+        fr_texts: List[Optional[str]],
+    ):
+        self._index = index
+        self._columns = (de_texts, en_texts, fr_texts)
+
+    def __getitem__(self, key: str) -> Texts:
+        row = self._index[key]
+        de_texts, en_texts, fr_texts = self._columns
+        return (de_texts[row], en_texts[row], fr_texts[row])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def text(self, key: str, language_no: int = 0) -> Optional[str]:
+        """returns a single text without building the tuple"""
+        row = self._index.get(key)
+        if row is None:
+            return None
+        return self._columns[language_no][row]
+
+    def to_json(self) -> Dict[str, Any]:
+        """compact JSON serializable form, see from_json"""
+        return {
+            "keys": list(self._index),
+            "rows": list(self._index.values()),
+            "texts": [list(column) for column in self._columns],
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "TranslationTable":
+        intern = sys.intern
+        columns = [
+            [intern(text) if text is not None else None for text in column]
+            for column in data["texts"]
+        ]
+        return cls(dict(zip(data["keys"], data["rows"])), *columns)
+
+
+def parse_translations(text: str) -> TranslationTable:
+    """parses the translations of dictionary.js: key: (de, en, fr)
+
+    The text is scanned once. ``lngX=["de","en","fr"]`` defines all three
+    languages, ``lngX=["de","en"]`` no french text and ``lngX="text"`` the
+    same text for all languages. Aliases ``lngX=lngY`` are resolved
+    transitively; aliases forming a cycle or pointing to unknown keys are
+    dropped. Later assignments replace earlier ones, like in javascript."""
+    definitions: Dict[str, int] = {}
+    aliases: Dict[str, str] = {}
+    de_texts: List[Optional[str]] = []
+    en_texts: List[Optional[str]] = []
+    fr_texts: List[Optional[str]] = []
+
+    for key, de_text, en_text, fr_text, scalar, alias in map(
+        _groups, _ASSIGNMENT.finditer(text)
+    ):
+        if alias is not None:
+            aliases[key] = alias
+            definitions.pop(key, None)
+            continue
+        if scalar is not None:
+            de_text = en_text = fr_text = _decode(scalar)
+        else:
+            de_text = _decode(de_text)
+            en_text = _decode(en_text) if en_text is not None else None
+            fr_text = _decode(fr_text) if fr_text is not None else None
+        definitions[key] = len(de_texts)
+        de_texts.append(de_text)
+        en_texts.append(en_text)
+        fr_texts.append(fr_text)
+        if aliases:
+            aliases.pop(key, None)
+
+    for key in aliases:
+        target = key
+        seen = set()
+        while target in aliases and target not in seen:
+            seen.add(target)
+            target = aliases[target]
+        if target in definitions:
+            definitions[key] = definitions[target]
+
+    return TranslationTable(definitions, de_texts, en_texts, fr_texts)
@@ -0,0 +1,128 @@
+"""
+vectorized decoding of many register values at once (uses numpy if installed)
+"""
+from array import array
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .ecotouch import ReadPlan, TagData
+from .exceptions import InvalidValueException
+
+try:
+    import numpy as np
+except ImportError:  # no cov
+    np = None
+
+HAS_NUMPY = np is not None
+
+# decoder kinds, see TagData._compile_decoder
+SCALED = "scaled"
+FLOAT32 = "float32"
+BITS = "bits"
+INTEGER = "integer"
+BOOLEAN = "boolean"
+OTHER = "other"
+
+
+def decoder_kind(tag: TagData) -> str:
+    """the vectorized decoder used for a tag, OTHER for tags decoded one by one"""
+    if tag.read_function is not TagData._parse_value_default:
+        return OTHER
+    prefix = tag.tags[0][0]
+    if prefix == "A":
+        return SCALED if len(tag.tags) == 1 else FLOAT32
+    if prefix == "I":
+        if tag.bit is not None:
+            return BITS
+        return INTEGER if len(tag.tags) == 1 else OTHER
+    if prefix == "D":
+        return BOOLEAN
+    return OTHER
+
+
+def to_int_array(values: Sequence[str]):
+    """raw register values as int64 numpy array, or array('q') without numpy"""
+    if np is not None:
+        return np.fromiter(map(int, values), dtype=np.int64, count=len(values))
+    return array("q", map(int, values))
+
+
+class BulkDecoder:
+    """decodes the raw values of a ReadPlan with one array operation per
+    kind of tag: A registers scaled by 1/10, float32 register pairs, bits of
+    I registers, plain I registers and D booleans. Tags with their own read
+    function are decoded one by one. Without numpy, decode falls back to
+    ReadPlan.decode."""
+
+    def __init__(self, plan: ReadPlan):
+        self.plan = plan
+        groups: Dict[str, List[Tuple[TagData, Tuple[int, ...]]]] = {}
+        positions: Dict[str, List[int]] = {}
+        for position, (tag, indices) in enumerate(zip(plan.tags, plan.indices)):
+            kind = decoder_kind(tag)
+            groups.setdefault(kind, []).append((tag, indices))
+            positions.setdefault(kind, []).append(position)
+        self._tags = {
+            kind: tuple(tag for tag, _ in group) for kind, group in groups.items()
+        }
+        self._positions = positions
+        self._others = [
+            (position, tag.decoder, indices)
+            for position, (tag, indices) in zip(
+                positions.get(OTHER, ()), groups.get(OTHER, ())
+            )
+        ]
+        if np is None:
+            return
+        self._index = {
+            kind: np.array([indices[0] for _, indices in group], dtype=np.intp)
+            for kind, group in groups.items()
+            if kind not in (OTHER, FLOAT32)
+        }
+        if FLOAT32 in groups:
+            pairs = np.array([indices for _, indices in groups[FLOAT32]], dtype=np.intp)
+            self._index[FLOAT32] = pairs
+        if BITS in groups:
+            self._bits = np.array([tag.bit for tag, _ in groups[BITS]], dtype=np.int64)
+
+    def arrays(self, raw) -> Dict[str, Tuple[Tuple[TagData, ...], Any]]:
+        """decoded values per kind: (tags, numpy array of their values).
+        Requires numpy; tags of kind OTHER are not included."""
+        if np is None:
+            raise RuntimeError("BulkDecoder.arrays requires numpy")
+        raw = np.asarray(raw, dtype=np.int64)
+        result = {}
+        index = self._index
+        if SCALED in index:
+            result[SCALED] = raw[index[SCALED]] / 10.0
+        if FLOAT32 in index:
+            pairs = raw[index[FLOAT32]] & 0xFFFF
+            words = ((pairs[:, 0] << 16) | pairs[:, 1]).astype(np.uint32)
+            result[FLOAT32] = words.view(np.float32)
+        if BITS in index:
+            result[BITS] = ((raw[index[BITS]] >> self._bits) & 1).astype(bool)
+        if INTEGER in index:
+            result[INTEGER] = raw[index[INTEGER]]
+        if BOOLEAN in index:
+            values = raw[index[BOOLEAN]]
+            invalid = (values != 0) & (values != 1)
+            if invalid.any():
+                position = int(invalid.argmax())
+                raise InvalidValueException(
+                    f"{values[position]} is not a valid value for "
+                    f"{self._tags[BOOLEAN][position].tags[0]}"
+                )
+            result[BOOLEAN] = values.astype(bool)
+        return {kind: (self._tags[kind], decoded) for kind, decoded in result.items()}
+
+    def decode(self, raw) -> Dict[TagData, Any]:
+        """decodes raw values (see Ecotouch.read_raw) like ReadPlan.decode"""
+        if np is None:
+            return self.plan.decode([str(value) for value in raw])
+        # values in the order of the plan, like ReadPlan.decode
+        values: List[Any] = [None] * len(self.plan.tags)
+        for kind, (_, decoded) in self.arrays(raw).items():
+            for position, value in zip(self._positions[kind], decoded.tolist()):
+                values[position] = value
+        for position, decoder, indices in self._others:
+            values[position] = decoder([str(raw[i]) for i in indices])
+        return dict(zip(self.plan.tags, values))
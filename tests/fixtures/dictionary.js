@@ -0,0 +1,16 @@
+// excerpt in the format of /easycon/js/dictionary.js
+var lngA1=["Au\xdfentemperatur","outside temperature","temp\xe9rature ext\xe9rieure"];
+var lngA2=["Au\xdfentemperatur 1h","outside temperature 1h","temp\xe9rature ext\xe9rieure 1h"];
+var lngA12=["Vorlauftemperatur","flow temperature"];
+var lngI51_3="Verdichter";
+var lngI105=["Wärmepumpentyp","heatpump type","type de pompe à chaleur"];
+var lngQuote=["Er sagte \"Hallo\"","he said \"hello\"","il a dit \"bonjour\""];
+var lngD420=lngHoliday;
+var lngHoliday=lngUrlaub;
+var lngUrlaub=["Urlaub","holiday","vacances"];
+var lngLoop1=lngLoop2;
+var lngLoop2=lngLoop1;
+var lngMissing=lngDoesNotExist;
+var lngA3=["alt","old","vieux"];
+var lngA3=["Au\xdfentemperatur 24h","outside temperature 24h","temp\xe9rature ext\xe9rieure 24h"];
+var lngEmpty=["","",""];
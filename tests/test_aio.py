@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from pywaterkotte.aio import AsyncEcotouch
+from pywaterkotte.ecotouch import (
+    AuthenticationException,
+    ConnectionException,
+    EcotouchTags,
+    InvalidValueException,
+)
+from pywaterkotte.protocol import TagStatusException
+from pywaterkotte.simulator import Simulator
+
+
+@pytest.fixture
+def fake_heatpump():
+    registers = {f"A{i}": str(i) for i in range(1, 301)}
+    registers["I263"] = "0"
+    with Simulator(registers) as simulator:
+        yield simulator
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_login(fake_heatpump):
+    async def main():
+        async with AsyncEcotouch(fake_heatpump.host) as wp:
+            await wp.login()
+            with pytest.raises(AuthenticationException):
+                await wp.login(password="wrong")
+
+    run(main())
+
+
+def test_read_values(fake_heatpump):
+    async def main():
+        async with AsyncEcotouch(fake_heatpump.host) as wp:
+            return await wp.read_values(
+                [EcotouchTags.OUTSIDE_TEMPERATURE, EcotouchTags.FLOW_TEMPERATURE]
+            )
+
+    result = run(main())
+    assert result == {
+        EcotouchTags.OUTSIDE_TEMPERATURE: 0.1,
+        EcotouchTags.FLOW_TEMPERATURE: 1.2,
+    }
+
+
+def test_read_chunks_concurrently(fake_heatpump):
+    fake_heatpump.latency = 0.05
+    tags = [f"A{i}" for i in range(1, 301)]
+
+    async def main(max_concurrency):
+        async with AsyncEcotouch(
+            fake_heatpump.host, max_concurrency=max_concurrency
+        ) as wp:
+            return await wp._read_tags(tags)
+
+    result = run(main(2))
+    assert result == {tag: tag[1:] for tag in tags}
+    assert len(fake_heatpump.requests) == 4
+    assert fake_heatpump.max_in_flight == 2
+
+    fake_heatpump.max_in_flight = 0
+    run(main(1))
+    assert fake_heatpump.max_in_flight == 1
+
+
+def test_read_tag_error(fake_heatpump):
+    async def main():
+        async with AsyncEcotouch(fake_heatpump.host) as wp:
+            await wp.read_value(EcotouchTags.HEATPUMP_TYPE)
+
+    with pytest.raises(TagStatusException) as exc_info:
+        run(main())
+    assert exc_info.value.errors == {"I105": "E_INACTIVETAG"}
+
+
+def test_write_values(fake_heatpump):
+    async def main():
+        async with AsyncEcotouch(fake_heatpump.host) as wp:
+            await wp.write_value(EcotouchTags.ADAPT_HEATING, 6)
+            with pytest.raises(InvalidValueException):
+                await wp.write_value(EcotouchTags.OUTSIDE_TEMPERATURE, 1.0)
+
+    run(main())
+    assert fake_heatpump.requests == [
+        ("/cgi/writeTags", {"n": "1", "returnValue": "true", "t1": "I263", "v1": "6"})
+    ]
+
+
+def test_translations(fake_heatpump):
+    async def main():
+        async with AsyncEcotouch(fake_heatpump.host) as wp:
+            return (
+                await wp.get_tag_description(EcotouchTags.OUTSIDE_TEMPERATURE, 1),
+                await wp.decode_heatpump_series(1),
+            )
+
+    assert run(main()) == ("outside temperature", "DS 5023")
+
+
+def test_relogin_after_session_expired(fake_heatpump):
+    fake_heatpump.session_timeout = 0.05
+    tags = [f"A{i}" for i in range(1, 301)]
+
+    async def main():
+        async with AsyncEcotouch(fake_heatpump.host) as wp:
+            await wp.login()
+            await wp._read_tags(tags)
+            await asyncio.sleep(0.1)
+            # the concurrent chunks log in again only once
+            return await wp._read_tags(tags)
+
+    assert run(main()) == {tag: tag[1:] for tag in tags}
+    paths = [path for path, _ in fake_heatpump.requests]
+    assert paths.count("/cgi/login") == 2
+
+
+def test_retry_failed_requests(fake_heatpump):
+    fake_heatpump.error_rate = 1.0
+
+    async def main(**kwargs):
+        async with AsyncEcotouch(fake_heatpump.host, **kwargs) as wp:
+            await wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+
+    with pytest.raises(ConnectionException):
+        run(main(retries=2, backoff=0))
+    assert len(fake_heatpump.requests) == 3
+
+    fake_heatpump.requests.clear()
+    start = time.monotonic()
+    with pytest.raises(ConnectionException):
+        run(main(retries=100, backoff=0.05, poll_deadline=0.3))
+    assert time.monotonic() - start < 1.0
+    assert 1 < len(fake_heatpump.requests) < 10
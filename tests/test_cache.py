@@ -0,0 +1,72 @@
+from pywaterkotte.cache import RegisterCache
+from pywaterkotte.ecotouch import Ecotouch, EcotouchTags
+import responses
+
+HOSTNAME = "hostname"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_expiry():
+    clock = FakeClock()
+    cache = RegisterCache(ttl=1.0, clock=clock)
+    cache.update({"A1": "86", "A2": "87"})
+    assert cache.lookup(["A1", "A3"]) == ({"A1": "86"}, ["A3"])
+    clock.now = 1.0
+    assert cache.lookup(["A1", "A2"]) == ({}, ["A1", "A2"])
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert cache.hit_ratio == 0.25
+
+
+def test_bounded_size():
+    cache = RegisterCache(ttl=10.0, maxsize=2)
+    cache.update({"A1": "1", "A2": "2"})
+    cache.lookup(["A1"])
+    cache.update({"A3": "3"})
+    assert len(cache) == 2
+    assert cache.lookup(["A1", "A2", "A3"]) == ({"A1": "1", "A3": "3"}, ["A2"])
+
+
+@responses.activate
+def test_ecotouch_reads_through_cache():
+    url = f"http://{HOSTNAME}/cgi/readTags"
+    responses.add(responses.GET, url, body="#I51\tS_OK\n192\t8\n#A1\tS_OK\n192\t86\n")
+    wp = Ecotouch(HOSTNAME, cache_ttl=60)
+    wp.read_values([EcotouchTags.STATE_COMPRESSOR, EcotouchTags.OUTSIDE_TEMPERATURE])
+    assert wp.read_value(EcotouchTags.STATE_SOURCEPUMP) is False
+    assert wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE) == 8.6
+    assert len(responses.calls) == 1
+    assert (wp.cache.hits, wp.cache.misses) == (2, 2)
+
+    # only the registers missing in the cache are requested
+    responses.replace(responses.GET, url, body="#A2\tS_OK\n192\t87\n")
+    result = wp.read_values(
+        [EcotouchTags.OUTSIDE_TEMPERATURE, EcotouchTags.OUTSIDE_TEMPERATURE_1H]
+    )
+    assert result[EcotouchTags.OUTSIDE_TEMPERATURE_1H] == 8.7
+    assert responses.calls[1].request.params == {"n": "1", "t1": "A2"}
+
+
+@responses.activate
+def test_write_updates_cache():
+    responses.add(
+        responses.GET,
+        f"http://{HOSTNAME}/cgi/readTags",
+        body="#I263\tS_OK\n192\t5\n#D420\tS_OK\n192\t0\n",
+    )
+    responses.add(
+        responses.GET,
+        f"http://{HOSTNAME}/cgi/writeTags",
+        body="#I263\tS_OK\n192\t6\n",
+    )
+    wp = Ecotouch(HOSTNAME, cache_ttl=60)
+    wp.read_values([EcotouchTags.ADAPT_HEATING, EcotouchTags.HOLIDAY_ENABLED])
+    wp.write_values({EcotouchTags.ADAPT_HEATING: 6, EcotouchTags.HOLIDAY_ENABLED: True})
+    # the confirmed value is cached, the unconfirmed one is dropped
+    assert wp.cache.lookup(["I263", "D420"]) == ({"I263": "6"}, ["D420"])
@@ -0,0 +1,125 @@
+from pywaterkotte.chunking import ChunkSizer
+from pywaterkotte.ecotouch import ConnectionException, Ecotouch, ReadPlan, TagData
+from pywaterkotte.metadata import MetadataCache
+from pywaterkotte.simulator import Simulator, default_registers
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clear_memory():
+    MetadataCache._memory.clear()
+
+
+def feed(sizer, seconds_per_request, count=3):
+    for _ in range(count):
+        sizer.record(sizer.size, sizer.size, seconds_per_request(sizer.size))
+
+
+def test_grows_while_faster():
+    sizer = ChunkSizer(40, max_size=200, samples=3)
+    # fixed overhead per request: bigger requests are cheaper per register
+    while not sizer.settled:
+        feed(sizer, lambda size: 0.05 + 0.001 * size)
+    assert sizer.size == 200
+    assert sizer.changed
+
+
+def test_settles_on_best_size():
+    sizer = ChunkSizer(40, max_size=500, samples=3)
+    # requests above 90 registers get slow
+    while not sizer.settled:
+        feed(sizer, lambda size: 0.05 + 0.001 * size + (1.0 if size > 90 else 0))
+    assert sizer.size == 90
+
+
+def test_small_requests_are_ignored():
+    sizer = ChunkSizer(100, samples=1)
+    sizer.record(100, 10, 1.0)
+    sizer.record(50, 50, 1.0)
+    assert sizer.size == 100 and not sizer.settled
+
+
+def test_failure_backs_off():
+    sizer = ChunkSizer(100, samples=1)
+    sizer.record_failure()
+    assert sizer.size == 50
+    assert sizer.max_size == 99
+    while not sizer.settled:
+        feed(sizer, lambda size: 0.05, count=1)
+    assert sizer.size == 99
+
+    # the cap is lifted after enough successful requests
+    assert sizer.settled and sizer.max_size == 99
+    # 3 requests while probing, the fifth lifts it
+    sizer.retest_after = 5
+    feed(sizer, lambda size: 0.05, count=1)
+    assert sizer.max_size == 99
+    feed(sizer, lambda size: 0.05, count=1)
+    assert sizer.max_size == 250 and not sizer.settled
+    while not sizer.settled:
+        feed(sizer, lambda size: 0.05, count=1)
+    assert sizer.size == 250
+
+    sizer.record_failure()
+    restored = ChunkSizer(75)
+    restored.restore(sizer.state())
+    assert (restored.size, restored.max_size, restored.settled) == (125, 249, True)
+
+
+def test_ecotouch_learns_chunk_size(tmp_path):
+    registers = default_registers()
+    registers.update({f"A{i}": str(i) for i in range(1, 601)})
+    plan = ReadPlan([TagData([f"A{i}"]) for i in range(1, 601)])
+    cache = MetadataCache(str(tmp_path))
+    with Simulator(registers, latency=0.01) as simulator:
+        with Ecotouch(simulator.host, adaptive_chunks=True, metadata_cache=cache) as wp:
+            for _ in range(10):
+                values = wp.read_values(plan)
+            assert values[plan.tags[599]] == 60.0
+            assert wp.chunk_sizer.settled
+            learned = wp.chunk_sizer.size
+        assert learned > 75
+
+        MetadataCache._memory.clear()
+        with Ecotouch(simulator.host, adaptive_chunks=True, metadata_cache=cache) as wp:
+            simulator.requests.clear()
+            wp.read_values(plan)
+            requests = [
+                params for path, params in simulator.requests if path == "/cgi/readTags"
+            ]
+            # firmware and build are read first to find the stored size
+            assert len(requests) == 1 + len(plan.chunks_for(learned))
+
+
+def test_unreachable_heatpump_keeps_chunk_size(tmp_path):
+    cache = MetadataCache(str(tmp_path))
+    with Simulator(latency=0.005) as simulator:
+        wp = Ecotouch(
+            simulator.host, adaptive_chunks=True, metadata_cache=cache, retries=0
+        )
+        wp.read_values([TagData(["A1"])])
+        wp.chunk_sizer.restore({"size": 150, "max_size": 250})
+        wp.chunk_sizer.changed = True
+        wp._store_chunk_state()
+        registers = [TagData([f"A{i}"]) for i in range(1, 301)]
+    # the simulator is stopped, new connections are refused
+    wp.session.close()
+    for _ in range(5):
+        with pytest.raises(ConnectionException):
+            wp.read_values(registers)
+    wp.close()
+    assert wp.chunk_sizer.state() == {"size": 150, "max_size": 250}
+    assert cache.load(simulator.host, wp._firmware_key, "chunk_size") == {
+        "size": 150,
+        "max_size": 250,
+    }
+
+
+def test_read_timeout_shrinks_chunk_size():
+    with Simulator(latency=0.2) as simulator:
+        with Ecotouch(
+            simulator.host, adaptive_chunks=True, retries=0, timeout=(1.0, 0.05)
+        ) as wp:
+            with pytest.raises(ConnectionException):
+                wp.read_values([TagData(["A1"])])
+            assert wp.chunk_sizer.size == 37
@@ -0,0 +1,59 @@
+from pywaterkotte.delta import ChangeStream, DeltaFilter
+from pywaterkotte.ecotouch import Ecotouch, EcotouchTags
+import responses
+
+HOSTNAME = "hostname"
+
+
+def test_delta_filter_deadbands():
+    flow = EcotouchTags.FLOW_TEMPERATURE
+    power = EcotouchTags.ELECTRICAL_POWER
+    compressor = EcotouchTags.STATE_COMPRESSOR
+    delta = DeltaFilter(deadbands={power: 0.5}, unit_deadbands={"°C": 0.2})
+
+    assert delta.update({flow: 30.0, power: 1.0, compressor: False}) == {
+        flow: 30.0,
+        power: 1.0,
+        compressor: False,
+    }
+    assert delta.update({flow: 30.1, power: 1.5, compressor: False}) == {}
+    # drift is measured against the last reported value
+    assert delta.update({flow: 30.3, power: 1.6, compressor: True}) == {
+        flow: 30.3,
+        power: 1.6,
+        compressor: True,
+    }
+    delta.reset()
+    assert len(delta.update({flow: 30.3})) == 1
+
+
+@responses.activate
+def test_change_stream():
+    url = f"http://{HOSTNAME}/cgi/readTags"
+    bodies = iter(
+        [
+            "#A12\tS_OK\n192\t300\n#I51\tS_OK\n192\t0\n",
+            "#A12\tS_OK\n192\t301\n#I51\tS_OK\n192\t0\n",
+            "#A12\tS_OK\n192\t301\n#I51\tS_OK\n192\t8\n",
+        ]
+    )
+    responses.add_callback(
+        responses.GET, url, callback=lambda request: (200, {}, next(bodies))
+    )
+    received = []
+    stream = ChangeStream(
+        Ecotouch(HOSTNAME),
+        [EcotouchTags.FLOW_TEMPERATURE, EcotouchTags.STATE_COMPRESSOR],
+        unit_deadbands={"°C": 0.5},
+        sleep=lambda seconds: None,
+    )
+    stream.subscribe(received.append)
+    changes = iter(stream)
+    assert next(changes) == {
+        EcotouchTags.FLOW_TEMPERATURE: 30.0,
+        EcotouchTags.STATE_COMPRESSOR: False,
+    }
+    # the second poll has no change beyond the deadband and is skipped
+    assert next(changes) == {EcotouchTags.STATE_COMPRESSOR: True}
+    assert len(responses.calls) == 3
+    assert len(received) == 2
@@ -0,0 +1,59 @@
+import io
+from urllib.parse import parse_qsl, urlsplit
+
+from pywaterkotte.dump import RegisterRange, dump_registers
+from pywaterkotte.ecotouch import Ecotouch
+import pytest
+import responses
+
+HOSTNAME = "hostname"
+
+
+def read_callback(request):
+    params = dict(parse_qsl(urlsplit(request.url).query))
+    records = []
+    for key, tag in params.items():
+        if key == "n":
+            continue
+        number = int(tag[1:])
+        if number % 10 == 0:
+            records.append(f"#{tag}\tE_INACTIVETAG\n")
+        else:
+            records.append(f"#{tag}\tS_OK\n192\t{number * 2}\n")
+    return (200, {}, "".join(records))
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+@responses.activate
+def test_dump(workers):
+    responses.add_callback(
+        responses.GET, f"http://{HOSTNAME}/cgi/readTags", callback=read_callback
+    )
+    out = io.StringIO()
+    stats = dump_registers(
+        Ecotouch(HOSTNAME),
+        out,
+        [RegisterRange("A", 1, 200), RegisterRange("D", 5, 12)],
+        workers=workers,
+    )
+    lines = out.getvalue().splitlines()
+    assert lines[:3] == ["A1\t2", "A2\t4", "A3\t6"]
+    assert "A10\t20" not in lines
+    assert lines[-1] == "D11\t22"
+    assert stats.registers == 206
+    assert stats.skipped == 20
+    assert stats.supported == len(lines)
+    assert stats.requests == 3
+    assert stats.registers_per_second > 0
+    assert "186 of 206 registers in 3 requests" in str(stats)
+
+
+@responses.activate
+def test_ecotouch_dump():
+    responses.add_callback(
+        responses.GET, f"http://{HOSTNAME}/cgi/readTags", callback=read_callback
+    )
+    out = io.StringIO()
+    stats = Ecotouch(HOSTNAME).dump(out, [RegisterRange("I", 1, 4)])
+    assert out.getvalue() == "I1\t2\nI2\t4\nI3\t6\n"
+    assert stats.requests == 1
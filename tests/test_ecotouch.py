@@ -2,9 +2,15 @@ from pywaterkotte.ecotouch import (
     Ecotouch,
     EcotouchTags,
     InvalidResponseException,
+    InvalidValueException,
     AuthenticationException,
+    ConnectionException,
+    ReadPlan,
     TagData,
+    create_session,
 )
+from pywaterkotte.protocol import WriteException, pack_write_chunks
+import requests
 import responses
 import pytest
 from datetime import datetime, date
@@ -157,3 +163,209 @@ def test_read_multiple_tags(wp_instance):
     assert result[EcotouchTags.OUTSIDE_TEMPERATURE_24H] == 9.2
     assert result[EcotouchTags.SOURCE_IN_TEMPERATURE] == 9.5
     assert result[EcotouchTags.SOURCE_OUT_TEMPERATURE] == 5.7
+
+
+@responses.activate
+def test_session_keeps_login_cookie():
+    responses.add(
+        responses.GET,
+        f"http://{HOSTNAME}/cgi/login",
+        body="1\n#S_OK\nIDALToken=7030fabe1f6beb2ca91a6cfd8806d6ad",
+        headers={"Set-Cookie": "IDALToken=7030fabe; Path=/"},
+    )
+    prepare_response("readTags", "#A1\tS_OK\n192\t86\n")
+    with Ecotouch(HOSTNAME) as wp:
+        wp.login()
+        assert wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE) == 8.6
+    assert responses.calls[1].request.headers["Cookie"] == "IDALToken=7030fabe"
+
+
+def test_shared_session(monkeypatch):
+    session = create_session(pool_connections=2)
+    closed = []
+    monkeypatch.setattr(session, "close", lambda: closed.append(session))
+    with Ecotouch("host1", session=session) as wp1:
+        wp2 = Ecotouch("host2", session=session)
+        assert wp1.session is wp2.session
+    # a shared session is not closed by the instances using it
+    assert closed == []
+
+    with Ecotouch("host1") as wp3:
+        monkeypatch.setattr(wp3.session, "close", lambda: closed.append(wp3))
+    assert closed == [wp3]
+
+
+def test_read_plan_dedupes_registers():
+    plan = ReadPlan(
+        [
+            EcotouchTags.STATE_SOURCEPUMP,
+            EcotouchTags.STATE_HEATINGPUMP,
+            EcotouchTags.OUTSIDE_TEMPERATURE,
+            EcotouchTags.STATE_COMPRESSOR,
+            EcotouchTags.STATE_COMPRESSOR,
+        ]
+    )
+    assert len(plan) == 4
+    assert plan.registers == ("I51", "A1")
+    assert plan.chunks == (("I51", "A1"),)
+    assert plan.indices == ((0,), (0,), (1,), (0,))
+
+
+def test_read_plan_chunks():
+    tags = [TagData([f"A{i}"]) for i in range(1, 81)]
+    plan = ReadPlan(tags)
+    assert [len(chunk) for chunk in plan.chunks] == [40, 40]
+    assert sum(plan.chunks, ()) == plan.registers
+    assert len(ReadPlan(tags[:75]).chunks) == 1
+
+
+@responses.activate
+def test_read_values_with_plan(wp_instance):
+    prepare_response("readTags", "#I51\tS_OK\n192\t170\n#A1\tS_OK\n192\t86\n")
+    plan = ReadPlan(
+        [
+            EcotouchTags.STATE_SOURCEPUMP,
+            EcotouchTags.STATE_COMPRESSOR,
+            EcotouchTags.OUTSIDE_TEMPERATURE,
+        ]
+    )
+    for _ in range(2):
+        assert wp_instance.read_values(plan) == {
+            EcotouchTags.STATE_SOURCEPUMP: False,
+            EcotouchTags.STATE_COMPRESSOR: True,
+            EcotouchTags.OUTSIDE_TEMPERATURE: 8.6,
+        }
+    assert len(responses.calls) == 2
+    assert responses.calls[0].request.params == {"n": "2", "t1": "I51", "t2": "A1"}
+
+
+def test_compiled_decoders():
+    assert EcotouchTags.OUTSIDE_TEMPERATURE.decoder(["-12"]) == -1.2
+    assert EcotouchTags.HOT_WATER_ENERGY_PRODUCED_YEAR.decoder(
+        ["17877", "-17979"]
+    ) == pytest.approx(6839.2, 0.1)
+    assert EcotouchTags.STATE_EXTERNAL_HEATER.decoder(["32"]) is True
+    assert EcotouchTags.SERIAL_NUMBER.decoder(["12", "345"]) == 12345
+    assert EcotouchTags.HOLIDAY_ENABLED.decoder(["0"]) is False
+    with pytest.raises(InvalidValueException):
+        EcotouchTags.HOLIDAY_ENABLED.decoder(["2"])
+
+
+def test_decoder_uses_read_function():
+    tag = TagData(["I7"], read_function=lambda tag, vals: (tag.tags, vals))
+    assert tag.parse_value(["1"]) == (("I7",), ["1"])
+    assert tag == TagData(["I7"], read_function=tag.read_function)
+
+
+@responses.activate
+def test_write_batched(wp_instance):
+    prepare_response(
+        "writeTags",
+        "".join(
+            f"#{tag}\tS_OK\n192\t{value}\n"
+            for tag, value in [
+                ("I1254", "19"),
+                ("I1253", "3"),
+                ("I1252", "2"),
+                ("I1250", "11"),
+                ("I1251", "0"),
+                ("I263", "6"),
+            ]
+        ),
+    )
+    written = wp_instance.write_values(
+        {
+            EcotouchTags.HOLIDAY_START_TIME: datetime(2019, 3, 2, 11, 00),
+            EcotouchTags.ADAPT_HEATING: 6,
+        },
+        verify=True,
+    )
+    assert len(responses.calls) == 1
+    assert responses.calls[0].request.params == {
+        "n": "6",
+        "returnValue": "true",
+        "t1": "I1254",
+        "v1": "19",
+        "t2": "I1253",
+        "v2": "3",
+        "t3": "I1252",
+        "v3": "2",
+        "t4": "I1250",
+        "v4": "11",
+        "t5": "I1251",
+        "v5": "0",
+        "t6": "I263",
+        "v6": "6",
+    }
+    assert written["I263"] == "6"
+
+
+@responses.activate
+def test_write_partial_failure(wp_instance):
+    prepare_response(
+        "writeTags",
+        "#I263\tS_OK\n192\t5\n#A37\tE_NOT_WRITEABLE\n#D420\tS_OK\n192\t1\n",
+    )
+    with pytest.raises(WriteException) as exc_info:
+        wp_instance.write_values(
+            {
+                EcotouchTags.ADAPT_HEATING: 6,
+                EcotouchTags.HOT_WATER_TEMPERATURE_SETPOINT: 50.0,
+                EcotouchTags.HOLIDAY_ENABLED: True,
+            },
+            verify=True,
+        )
+    assert exc_info.value.errors == {"A37": "E_NOT_WRITEABLE"}
+    assert exc_info.value.mismatches == {"I263": ("6", "5")}
+    assert exc_info.value.written == {"D420": "1"}
+
+
+def test_pack_write_chunks():
+    groups = [{"I1": "1", "I2": "2"}, {"I3": "3", "I4": "4"}, {"I5": "5"}]
+    assert pack_write_chunks(groups, 3) == [
+        {"I1": "1", "I2": "2"},
+        {"I3": "3", "I4": "4", "I5": "5"},
+    ]
+
+
+@responses.activate
+def test_retry_failed_requests():
+    prepare_response("readTags", requests.ConnectionError("reset"))
+    responses.add(responses.GET, f"http://{HOSTNAME}/cgi/readTags", body="", status=503)
+    prepare_response("readTags", "#A1\tS_OK\n192\t86\n")
+    wp = Ecotouch(HOSTNAME, backoff=0)
+    assert wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE) == 8.6
+    assert len(responses.calls) == 3
+
+    responses.reset()
+    prepare_response("readTags", requests.ConnectionError("reset"))
+    with pytest.raises(ConnectionException):
+        Ecotouch(HOSTNAME, retries=1, backoff=0).read_value(
+            EcotouchTags.OUTSIDE_TEMPERATURE
+        )
+
+
+@responses.activate
+def test_relogin_after_session_expired():
+    prepare_response("login", "1\n#S_OK\nIDALToken=123")
+    prepare_response("readTags", "#E_NEED_LOGIN\n")
+    prepare_response("readTags", "#A1\tS_OK\n192\t86\n")
+    wp = Ecotouch(HOSTNAME)
+    wp.login()
+    assert wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE) == 8.6
+    assert [call.request.path_url.split("?")[0] for call in responses.calls] == [
+        "/cgi/login",
+        "/cgi/readTags",
+        "/cgi/login",
+        "/cgi/readTags",
+    ]
+
+
+def test_timeouts():
+    wp = Ecotouch(HOSTNAME, timeout=(1.0, 5.0), poll_deadline=2.0)
+    assert wp._request_timeout(None) == (1.0, 5.0)
+    deadline = wp._deadline()
+    connect, read = wp._request_timeout(deadline)
+    assert connect == 1.0 and 1.9 < read <= 2.0
+    with pytest.raises(ConnectionException):
+        wp._request_timeout(deadline - 2.0)
@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+
+from pywaterkotte.exporter import (
+    Exporter,
+    Profile,
+    RotatingOutput,
+    StreamOutput,
+    default_tag_names,
+    main,
+)
+from pywaterkotte.simulator import Simulator, default_registers
+import pytest
+
+NAMES = ["OUTSIDE_TEMPERATURE", "STATE_COMPRESSOR", "HOLIDAY_START_TIME"]
+
+
+@pytest.fixture
+def simulator():
+    registers = default_registers()
+    registers.update({"A1": "-52", "I51": "170"})
+    with Simulator(registers) as sim:
+        yield sim
+
+
+def test_csv(simulator):
+    stream = io.StringIO()
+    with Exporter(
+        [simulator.host, "127.0.0.1:1"],
+        NAMES,
+        StreamOutput(stream),
+        interval=0,
+        timeout=1,
+    ) as exporter:
+        exporter.run(count=2)
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert len(rows) == 4
+    ok = [row for row in rows if row["host"] == simulator.host]
+    assert ok[0]["OUTSIDE_TEMPERATURE"] == "-5.2"
+    assert ok[0]["STATE_COMPRESSOR"] == "True"
+    assert ok[0]["HOLIDAY_START_TIME"] == "2021-01-01T00:00:00"
+    assert ok[0]["error"] == ""
+    failed = [row for row in rows if row["host"] == "127.0.0.1:1"]
+    assert failed[0]["OUTSIDE_TEMPERATURE"] == "" and failed[0]["error"]
+
+
+def test_jsonl_profile(simulator, capsys):
+    main(
+        [
+            simulator.host,
+            "--tags",
+            *NAMES,
+            "--format",
+            "jsonl",
+            "--count",
+            "3",
+            "--interval",
+            "0",
+        ]
+    )
+    main([simulator.host, "--format", "jsonl", "--count", "1", "--profile"])
+    out, err = capsys.readouterr()
+    lines = [json.loads(line) for line in out.splitlines()]
+    assert len(lines) == 3 + 1
+    assert lines[0]["values"]["OUTSIDE_TEMPERATURE"] == -5.2
+    assert set(lines[3]["values"]) == set(default_tag_names())
+    phases = {line.split()[0]: line.split() for line in err.splitlines()[1:]}
+    assert set(phases) == {"network", "parse", "decode", "output", "poll", "wall"}
+    assert int(phases["decode"][1]) == 1
+
+
+def test_unknown_tags(simulator):
+    with pytest.raises(SystemExit):
+        main([simulator.host, "--tags", "NO_SUCH_TAG"])
+
+
+def test_rotation(tmp_path):
+    path = str(tmp_path / "out.csv")
+    output = RotatingOutput(path, max_bytes=20, backups=2)
+    for i in range(5):
+        output.write(f"row {i:02}\n", "header\n")
+    output.close()
+    with open(path, encoding="utf-8") as current:
+        assert current.read() == "header\nrow 04\n"
+    with open(path + ".1", encoding="utf-8") as previous:
+        assert previous.read() == "header\nrow 03\n"
+    with open(path + ".2", encoding="utf-8") as oldest:
+        assert oldest.read() == "header\nrow 02\n"
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from pywaterkotte.ecotouch import ConnectionException, EcotouchTags
+from pywaterkotte.fleet import FleetPoller
+import requests
+import responses
+
+LOGIN_OK = "1\n#S_OK\nIDALToken=7030fabe1f6beb2ca91a6cfd8806d6ad"
+TAGS = [EcotouchTags.OUTSIDE_TEMPERATURE, EcotouchTags.STATE_COMPRESSOR]
+
+
+def prepare_device(host, temperature, read_callback=None):
+    responses.add(responses.GET, f"http://{host}/cgi/login", body=LOGIN_OK)
+    url = f"http://{host}/cgi/readTags"
+    if read_callback is not None:
+        responses.add_callback(responses.GET, url, callback=read_callback)
+    else:
+        responses.add(
+            responses.GET,
+            url,
+            body=f"#A1\tS_OK\n192\t{temperature}\n#I51\tS_OK\n192\t8\n",
+        )
+
+
+@responses.activate
+def test_poll_all_devices():
+    prepare_device("hp1", 86)
+    prepare_device("hp2", 12)
+    with FleetPoller(["hp1", "hp2"], TAGS) as poller:
+        results = {result.host: result for result in poller.poll()}
+        assert results["hp1"].values == {
+            EcotouchTags.OUTSIDE_TEMPERATURE: 8.6,
+            EcotouchTags.STATE_COMPRESSOR: True,
+        }
+        assert results["hp2"].values[EcotouchTags.OUTSIDE_TEMPERATURE] == 1.2
+        list(poller.poll())
+    # the login is only done once per device
+    logins = [call for call in responses.calls if "login" in call.request.url]
+    assert len(logins) == 2
+    assert poller.stats.polls == 4
+    assert poller.stats.failures == 0
+    assert poller.stats.cycles == 2
+    assert poller.stats.mean_latency > 0
+    assert poller.stats.throughput > 0
+
+
+@responses.activate
+def test_failures_are_isolated():
+    prepare_device("hp1", 86)
+    responses.add(
+        responses.GET,
+        "http://dead/cgi/login",
+        body=requests.ConnectionError("connection refused"),
+    )
+    with FleetPoller(["dead", "hp1"], TAGS) as poller:
+        results = {result.host: result for result in poller.poll()}
+    assert results["hp1"].ok
+    assert not results["dead"].ok
+    assert isinstance(results["dead"].error, ConnectionException)
+    assert poller.stats.failures_by_host == {"dead": 1}
+
+
+@responses.activate
+def test_slow_device_does_not_stall_cycle():
+    release = threading.Event()
+
+    def slow_read(request):
+        release.wait(5)
+        return (200, {}, "#A1\tS_OK\n192\t1\n#I51\tS_OK\n192\t0\n")
+
+    prepare_device("hp1", 86)
+    prepare_device("slow", 0, read_callback=slow_read)
+    with FleetPoller(["slow", "hp1"], TAGS, timeout=0.2) as poller:
+        start = time.monotonic()
+        results = list(poller.poll())
+        assert time.monotonic() - start < 2
+        assert [result.host for result in results] == ["hp1", "slow"]
+        assert isinstance(results[1].error, ConnectionException)
+
+        # the slow device is skipped while its previous poll is running
+        results = {result.host: result for result in poller.poll()}
+        assert results["hp1"].ok
+        assert "still running" in str(results["slow"].error)
+        release.set()
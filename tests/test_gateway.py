@@ -0,0 +1,121 @@
+import threading
+
+from pywaterkotte.ecotouch import (
+    AuthenticationException,
+    ConnectionException,
+    Ecotouch,
+    EcotouchTags,
+    SessionExpiredException,
+)
+from pywaterkotte.gateway import Gateway
+from pywaterkotte.simulator import Simulator
+import pytest
+import requests
+
+
+@pytest.fixture
+def simulator():
+    with Simulator({"A1": "-52", "A37": "480", "I51": "170"}, latency=0.05) as sim:
+        yield sim
+
+
+@pytest.fixture
+def gateway(simulator):
+    with Ecotouch(simulator.host) as upstream:
+        upstream.login()
+        with Gateway(upstream, address=("127.0.0.1", 0), ttl=0.5) as gateway:
+            yield gateway
+
+
+def read_requests(simulator):
+    return [params for path, params in simulator.requests if path == "/cgi/readTags"]
+
+
+def test_read_write(simulator, gateway):
+    with Ecotouch(gateway.host) as wp:
+        with pytest.raises(AuthenticationException):
+            wp.login(password="wrong")
+        wp.login()
+        assert wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE) == -5.2
+        wp.write_value(EcotouchTags.HOT_WATER_TEMPERATURE_SETPOINT, 48.5)
+        assert simulator.registers["A37"] == "485"
+        # the written value replaces the shared one
+        assert wp.read_value(EcotouchTags.HOT_WATER_TEMPERATURE_SETPOINT) == 48.5
+        assert wp.get_tag_description(EcotouchTags.OUTSIDE_TEMPERATURE, 1) == (
+            "outside temperature"
+        )
+        with pytest.raises(Exception, match="E_INACTIVETAG"):
+            wp.read_value(EcotouchTags.ADAPT_HEATING)
+    assert len(simulator.requests) < 10
+
+
+def test_concurrent_reads_are_coalesced(simulator, gateway):
+    tags = [
+        [EcotouchTags.OUTSIDE_TEMPERATURE],
+        [EcotouchTags.OUTSIDE_TEMPERATURE, EcotouchTags.STATE_COMPRESSOR],
+        [EcotouchTags.STATE_SOURCEPUMP, EcotouchTags.HOT_WATER_TEMPERATURE_SETPOINT],
+    ]
+    results = []
+    barrier = threading.Barrier(12)
+
+    def client(index):
+        with Ecotouch(gateway.host) as wp:
+            wp.login()
+            barrier.wait()
+            results.append(wp.read_values(tags[index % 3]))
+
+    simulator.requests.clear()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 12
+    assert all(
+        values.get(EcotouchTags.OUTSIDE_TEMPERATURE, -5.2) == -5.2 for values in results
+    )
+    # one read, at most one more for the reads that came while it was running
+    assert len(read_requests(simulator)) <= 2
+    assert gateway.coalescer.reads == 12
+
+
+def test_upstream_errors(simulator, gateway):
+    simulator.error_rate = 1.0
+    with Ecotouch(gateway.host, retries=0) as wp:
+        wp.login()
+        with pytest.raises(ConnectionException):
+            wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+
+
+def test_requests_without_login_are_rejected(simulator, gateway):
+    url = f"http://{gateway.host}/cgi/writeTags"
+    params = {"n": 1, "t1": "A37", "v1": "600", "returnValue": "true"}
+    assert requests.get(url, params=params).text == "#E_NEED_LOGIN\n"
+    response = requests.get(url, params=params, cookies={"IDALToken": "guessed"})
+    assert response.text == "#E_NEED_LOGIN\n"
+    assert simulator.registers["A37"] == "480"
+
+    with Ecotouch(gateway.host, retries=0) as wp:
+        with pytest.raises(SessionExpiredException):
+            wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+
+
+def test_reads_teach_the_chunk_sizer(simulator):
+    with Ecotouch(simulator.host, adaptive_chunks=True) as upstream:
+        upstream.login()
+        samples = []
+        record = upstream.chunk_sizer.record
+
+        def recording(*args):
+            samples.append(args)
+            record(*args)
+
+        upstream.chunk_sizer.record = recording
+        with Gateway(upstream, address=("127.0.0.1", 0)) as gateway, Ecotouch(
+            gateway.host
+        ) as wp:
+            wp.login()
+            wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+        assert [args[:2] for args in samples] == [(75, 1)]
+        # values are shared through the cache of the upstream instance
+        assert gateway.coalescer.cache is upstream.cache
@@ -0,0 +1,98 @@
+from pywaterkotte.ecotouch import (
+    AuthenticationException,
+    ConnectionException,
+    Ecotouch,
+    EcotouchTags,
+)
+from pywaterkotte.instrumentation import (
+    Histogram,
+    Metrics,
+    endpoint_name,
+    format_histogram,
+    format_labels,
+)
+from pywaterkotte.simulator import Simulator
+import pytest
+import requests
+import responses
+
+
+def test_histogram():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(2.65)
+
+
+def test_format_histogram():
+    histogram = Histogram((1.0,))
+    histogram.observe(0.5)
+    assert format_labels(("host", "le"), ('a"b', "1.0")) == '{host="a\\"b",le="1.0"}'
+    assert format_labels((), ()) == ""
+    assert format_histogram("p", "wait", ("host",), ("h",), histogram) == [
+        'p_wait_bucket{host="h",le="1.0"} 1',
+        'p_wait_bucket{host="h",le="+Inf"} 1',
+        'p_wait_sum{host="h"} 0.5',
+        'p_wait_count{host="h"} 1',
+    ]
+
+
+def test_endpoint_name():
+    assert endpoint_name("/cgi/readTags") == "readTags"
+    assert endpoint_name("/easycon/js/dictionary.js") == "dictionary.js"
+
+
+def test_metrics():
+    metrics = Metrics()
+    registers = {f"A{i}": str(i) for i in range(1, 101)}
+    with Simulator(registers) as simulator, Ecotouch(
+        simulator.host, observer=metrics
+    ) as wp:
+        with pytest.raises(AuthenticationException):
+            wp.login(password="wrong")
+        wp.login()
+        wp._read_tags([f"A{i}" for i in range(1, 101)])
+        host = simulator.host
+
+    assert metrics.requests == {
+        (host, "login", 200): 2,
+        (host, "readTags", 200): 2,
+    }
+    assert metrics.auth_failures == {host: 1}
+    assert metrics.latency[host, "readTags"].count == 2
+    assert metrics.parse_time[host, "readTags"].count == 2
+    assert metrics.chunks[host].sum == 2
+    assert metrics.bytes[host, "readTags"] == sum(
+        len(f"#A{i}\tS_OK\n192\t{i}\n") for i in range(1, 101)
+    )
+
+    text = metrics.prometheus()
+    assert "# TYPE pywaterkotte_requests_total counter" in text
+    assert (
+        f'pywaterkotte_requests_total{{host="{host}",endpoint="readTags",'
+        'status="200"} 2'
+    ) in text
+    assert f'pywaterkotte_auth_failures_total{{host="{host}"}} 1' in text
+    assert (
+        f'pywaterkotte_request_duration_seconds_bucket{{host="{host}",'
+        'endpoint="readTags",le="+Inf"} 2'
+    ) in text
+    assert f'pywaterkotte_read_chunks_count{{host="{host}"}} 1' in text
+
+
+@responses.activate
+def test_errors():
+    responses.add(
+        responses.GET,
+        "http://hostname/cgi/readTags",
+        body=requests.ConnectionError("unreachable"),
+    )
+    metrics = Metrics()
+    with pytest.raises(ConnectionException):
+        Ecotouch("hostname", observer=metrics, backoff=0).read_value(
+            EcotouchTags.OUTSIDE_TEMPERATURE
+        )
+    assert metrics.errors == {("hostname", "readTags", "ConnectionError"): 3}
+    assert metrics.retries == {("hostname", "readTags"): 2}
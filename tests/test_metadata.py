@@ -0,0 +1,80 @@
+from pywaterkotte.ecotouch import Ecotouch
+from pywaterkotte.metadata import MetadataCache
+import pytest
+import responses
+
+HOSTNAME = "hostname"
+DICTIONARY = 'lngA1=["Außentemperatur","outside temperature","température"];'
+
+
+@pytest.fixture(autouse=True)
+def clear_memory():
+    MetadataCache._memory.clear()
+
+
+def prepare_heatpump(firmware="10896"):
+    responses.add(
+        responses.GET,
+        f"http://{HOSTNAME}/cgi/readTags",
+        body=f"#I1\tS_OK\n192\t{firmware}\n#I2\tS_OK\n192\t123\n",
+    )
+    responses.add(
+        responses.GET, f"http://{HOSTNAME}/easycon/js/dictionary.js", body=DICTIONARY
+    )
+    responses.add(
+        responses.GET,
+        f"http://{HOSTNAME}/easycon/hpType.csv",
+        body="0;x;DS 5012\n1;y;DS 5023",
+    )
+
+
+def downloads():
+    return [call for call in responses.calls if "easycon" in call.request.url]
+
+
+def test_store_and_load(tmp_path):
+    cache = MetadataCache(str(tmp_path))
+    assert cache.load("192.168.1.2", "01.08.96-1", "translations") is None
+    cache.store("192.168.1.2", "01.08.96-1", "translations", {"A1": ["a", "b", "c"]})
+    MetadataCache._memory.clear()
+    assert MetadataCache(str(tmp_path)).load(
+        "192.168.1.2", "01.08.96-1", "translations"
+    ) == {"A1": ["a", "b", "c"]}
+    # another firmware invalidates the entry
+    assert cache.load("192.168.1.2", "01.09.00-1", "translations") is None
+    assert [path.name for path in tmp_path.iterdir()] == [
+        "192.168.1.2.translations.json"
+    ]
+
+
+@responses.activate
+def test_translations_cached_per_firmware(tmp_path):
+    prepare_heatpump()
+    cache = MetadataCache(str(tmp_path))
+    for _ in range(2):
+        wp = Ecotouch(HOSTNAME, metadata_cache=cache)
+        assert wp.init_translations() == {
+            "A1": ("Außentemperatur", "outside temperature", "température")
+        }
+        assert wp.decode_heatpump_series(1) == "DS 5023"
+        assert wp.decode_heatpump_series(0) == "DS 5012"
+    assert len(downloads()) == 2
+
+    # a new process only has the files
+    MetadataCache._memory.clear()
+    Ecotouch(HOSTNAME, metadata_cache=MetadataCache(str(tmp_path))).init_translations()
+    assert len(downloads()) == 2
+
+    responses.reset()
+    prepare_heatpump(firmware="10900")
+    Ecotouch(HOSTNAME, metadata_cache=cache).init_translations()
+    assert len(downloads()) == 1
+
+
+@responses.activate
+def test_heatpump_types_downloaded_once():
+    prepare_heatpump()
+    wp = Ecotouch(HOSTNAME)
+    wp.decode_heatpump_series(1)
+    wp.decode_heatpump_series(0)
+    assert len(downloads()) == 1
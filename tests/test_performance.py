@@ -0,0 +1,95 @@
+import pytest
+
+from pywaterkotte.ecotouch import EcotouchTags
+from pywaterkotte.performance import (
+    HOUR,
+    CounterDelta,
+    PerformanceTracker,
+    WindowedSum,
+)
+
+HEATING = EcotouchTags.HEATING_ENERGY_PRODUCED_YEAR
+HOT_WATER = EcotouchTags.HOT_WATER_ENERGY_PRODUCED_YEAR
+COMPRESSOR = EcotouchTags.COMPRESSOR_ELECTRIC_CONSUMPTION_YEAR
+SOURCEPUMP = EcotouchTags.SOURCEPUMP_ELECTRIC_CONSUMPTION_YEAR
+
+
+def counters(heating, hot_water, compressor, sourcepump):
+    return {
+        HEATING: heating,
+        HOT_WATER: hot_water,
+        COMPRESSOR: compressor,
+        SOURCEPUMP: sourcepump,
+    }
+
+
+def test_counter_delta():
+    counter = CounterDelta(tolerance=1.0)
+    assert counter.update(9000.0) == 0.0
+    assert counter.update(9002.5) == 2.5
+    # float noise
+    assert counter.update(9002.25) == 0.0
+    assert counter.update(9003.0) == 0.5
+    # new year
+    assert counter.update(0.75) == 0.75
+    assert counter.resets == 1
+
+
+def test_windowed_sum():
+    window = WindowedSum(60.0, buckets=6)
+    window.add(0.0, 1.0)
+    window.add(35.0, 2.0)
+    assert window.total(59.0) == 3.0
+    assert window.total(65.0) == 2.0
+    window.add(80.0, 4.0)
+    assert window.total(80.0) == 6.0
+    # a long gap clears everything
+    assert window.total(1000.0) == 0.0
+
+
+def test_energy_cop():
+    tracker = PerformanceTracker(windows=(HOUR,))
+    first = tracker.update(counters(1000, 500, 300, 20), timestamp=0)
+    assert first.heat == 0 and first.window_cop[HOUR] is None
+    for minute in range(1, 61):
+        # 4 kWh heat for 1 kWh electricity per minute
+        result = tracker.update(
+            counters(
+                1000 + 3 * minute, 500 + minute, 300 + 0.75 * minute, 20 + 0.25 * minute
+            ),
+            timestamp=minute * 60,
+        )
+    assert result.heat == 4.0 and result.electricity == 1.0
+    assert result.window_cop[HOUR] == pytest.approx(4.0)
+    assert result.seasonal_cop == pytest.approx(4.0)
+    assert tracker.heat == pytest.approx(240.0)
+
+    # counters restart at the turn of the year; values without counters
+    # leave the energies alone
+    result = tracker.update(counters(2, 0, 0.5, 0), timestamp=3660)
+    assert (result.heat, result.electricity) == (2.0, 0.5)
+    result = tracker.update({EcotouchTags.STATE_COMPRESSOR: True}, timestamp=3700)
+    assert (result.heat, result.electricity) == (0.0, 0.0)
+    assert tracker.heat == pytest.approx(242.0)
+
+
+def test_rolling_cop():
+    tracker = PerformanceTracker(tau=60.0)
+    values = {EcotouchTags.THERMAL_POWER: 8.0, EcotouchTags.ELECTRICAL_POWER: 2.0}
+    assert tracker.update(values, timestamp=0).cop == 4.0
+    values = {EcotouchTags.THERMAL_POWER: 0.0, EcotouchTags.ELECTRICAL_POWER: 0.0}
+    # the averages decay towards zero, so the COP is no longer reported
+    assert tracker.update(values, timestamp=60).cop == pytest.approx(4.0)
+    assert tracker.update(values, timestamp=600).cop is None
+
+
+def test_duty_cycle():
+    tracker = PerformanceTracker(windows=(HOUR,))
+    states = [False, True, True, False, True, False]
+    for index, running in enumerate(states):
+        result = tracker.update(
+            {EcotouchTags.STATE_COMPRESSOR: running}, timestamp=index * 600
+        )
+    # running during 3 of the 5 intervals of 10 minutes
+    assert result.duty_cycle[HOUR] == pytest.approx(0.6)
+    assert result.compressor_starts == 2
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from pywaterkotte.ecotouch import Ecotouch, EcotouchTags, ReadPlan, TagData
+from pywaterkotte.priority import BULK, CONTROL, POLL, RequestScheduler
+from pywaterkotte.simulator import Simulator, default_registers
+
+
+def wait_for(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end
+        time.sleep(0.001)
+
+
+def test_priority_order():
+    scheduler = RequestScheduler()
+    order = []
+
+    def request(priority):
+        with scheduler.slot(priority):
+            order.append(priority)
+
+    scheduler.acquire(BULK)
+    threads = []
+    for priority in (BULK, POLL, BULK, CONTROL):
+        thread = threading.Thread(target=request, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        wait_for(lambda: sum(scheduler.queued) == len(threads))
+    assert scheduler.max_queued[BULK] == 2
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    assert order == [CONTROL, POLL, BULK, BULK]
+    assert scheduler.requests == [1, 0, 1, 3]
+    assert scheduler.wait_time[CONTROL].count == 1
+    assert scheduler.queued == [0, 0, 0, 0]
+    metrics = scheduler.prometheus(host="hp1")
+    assert 'pywaterkotte_queued_requests{host="hp1",priority="bulk"} 0' in metrics
+    assert (
+        'pywaterkotte_queue_wait_seconds_count{host="hp1",priority="bulk"} 3' in metrics
+    )
+
+
+def test_rate_limit():
+    scheduler = RequestScheduler(max_concurrent=5, rate=50.0, burst=2)
+    start = time.monotonic()
+    for _ in range(7):
+        with scheduler.slot(POLL):
+            pass
+    # two in the first burst, then one every 20ms
+    assert time.monotonic() - start >= 0.09
+
+
+def test_write_preempts_bulk_read():
+    registers = default_registers()
+    registers.update({f"A{i}": str(i) for i in range(1, 601)})
+    plan = ReadPlan([TagData([f"A{i}"]) for i in range(1, 601)])
+    scheduler = RequestScheduler()
+    with Simulator(registers, latency=0.05) as simulator, Ecotouch(
+        simulator.host, scheduler=scheduler
+    ) as wp:
+        wp.login()
+        simulator.requests.clear()
+
+        def bulk_read():
+            with wp.priority(BULK):
+                wp.read_values(plan)
+
+        reader = threading.Thread(target=bulk_read)
+        reader.start()
+        wait_for(lambda: simulator.requests)
+        wp.write_value(EcotouchTags.HOT_WATER_TEMPERATURE_SETPOINT, 48.5)
+        reader.join()
+
+    paths = [path for path, _ in simulator.requests]
+    assert paths.count("/cgi/readTags") == len(plan.chunks) == 8
+    # the write is sent right after the chunk being read
+    assert paths.index("/cgi/writeTags") <= 2
+    assert scheduler.wait_time[CONTROL].sum < 0.2
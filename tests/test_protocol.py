@@ -0,0 +1,73 @@
+from pywaterkotte.ecotouch import (
+    Ecotouch,
+    EcotouchTags,
+    InvalidResponseException,
+    SessionExpiredException,
+)
+from pywaterkotte.protocol import (
+    TagRecord,
+    TagStatusException,
+    check_tag_records,
+    format_tag_records,
+    parse_tag_records,
+)
+import responses
+import pytest
+
+HOSTNAME = "hostname"
+
+
+def test_format_records():
+    body = "#A1\tS_OK\n192\t86\n#A9\tE_INACTIVETAG\n"
+    records = parse_tag_records(body.splitlines())
+    assert records["A9"] == TagRecord("E_INACTIVETAG", None)
+    assert format_tag_records(records) == body
+
+
+def test_parse_records():
+    body = "#A1\tS_OK\n192\t86\n#A2\tS_OK\n192\t-12\n#I51\tS_OK\n192\t170\n"
+    assert parse_tag_records(body.splitlines()) == {
+        "A1": TagRecord("S_OK", "86"),
+        "A2": TagRecord("S_OK", "-12"),
+        "I51": TagRecord("S_OK", "170"),
+    }
+
+
+def test_parse_records_crlf():
+    body = "#A1\tS_OK\r\n192\t86\r\n"
+    assert parse_tag_records(body.split("\n")) == {"A1": TagRecord("S_OK", "86")}
+
+
+def test_parse_records_without_value():
+    body = "#A1\tE_INACTIVETAG\n#A2\tS_OK\n192\t5\n#A3\tE_UNKNOWNTAG\n"
+    records = parse_tag_records(body.splitlines())
+    assert records["A1"] == TagRecord("E_INACTIVETAG", None)
+    assert records["A2"] == TagRecord("S_OK", "5")
+    assert records["A3"] == TagRecord("E_UNKNOWNTAG", None)
+
+
+def test_parse_records_global_status():
+    with pytest.raises(InvalidResponseException):
+        parse_tag_records(["#E_UNKNOWN"])
+    with pytest.raises(SessionExpiredException):
+        parse_tag_records(["#E_NEED_LOGIN"])
+
+
+def test_check_records():
+    records = parse_tag_records(["#A1\tS_OK", "192\t86", "#A2\tE_INACTIVETAG"])
+    assert check_tag_records(records, ["A1"]) == {"A1": "86"}
+    with pytest.raises(TagStatusException) as exc_info:
+        check_tag_records(records, ["A1", "A2", "A3"])
+    assert exc_info.value.errors == {"A2": "E_INACTIVETAG", "A3": None}
+
+
+@responses.activate
+def test_read_tag_error():
+    responses.add(
+        responses.GET,
+        f"http://{HOSTNAME}/cgi/readTags",
+        body="#A1\tE_INACTIVETAG\n192\t0\n",
+    )
+    with pytest.raises(TagStatusException) as exc_info:
+        Ecotouch(HOSTNAME).read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+    assert exc_info.value.errors == {"A1": "E_INACTIVETAG"}
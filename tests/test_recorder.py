@@ -0,0 +1,111 @@
+import math
+
+from pywaterkotte.ecotouch import EcotouchTags
+from pywaterkotte.recorder import MISSING_INT, Recorder, column_name, column_type
+import pytest
+
+TAGS = [
+    EcotouchTags.OUTSIDE_TEMPERATURE,
+    EcotouchTags.HEATING_ENERGY_PRODUCED_YEAR,
+    EcotouchTags.STATE_COMPRESSOR,
+    EcotouchTags.ADAPT_HEATING,
+]
+
+
+def record(recorder, count=10, start=1000.0):
+    for i in range(count):
+        recorder.append(
+            {
+                EcotouchTags.OUTSIDE_TEMPERATURE: 5.0 + i,
+                EcotouchTags.HEATING_ENERGY_PRODUCED_YEAR: 100.0 + 2 * i,
+                EcotouchTags.STATE_COMPRESSOR: i % 2 == 0,
+                EcotouchTags.ADAPT_HEATING: i,
+            },
+            timestamp=start + 10 * i,
+        )
+
+
+def test_schema():
+    assert column_name(EcotouchTags.HEATING_ENERGY_PRODUCED_YEAR) == "A452_A453"
+    assert column_name(EcotouchTags.STATE_COMPRESSOR) == "I51.3"
+    assert [column_type(tag) for tag in TAGS] == ["d", "d", "b", "q"]
+    with pytest.raises(ValueError):
+        column_type(EcotouchTags.HOLIDAY_START_TIME)
+
+
+def test_range():
+    recorder = Recorder(TAGS)
+    record(recorder)
+    assert len(recorder) == 10
+    timestamps, columns = recorder.range(1015, 1040)
+    assert list(timestamps) == [1020, 1030, 1040]
+    assert list(columns[EcotouchTags.OUTSIDE_TEMPERATURE]) == [7.0, 8.0, 9.0]
+    assert list(columns[EcotouchTags.STATE_COMPRESSOR]) == [1, 0, 1]
+    assert list(columns[EcotouchTags.ADAPT_HEATING]) == [2, 3, 4]
+    with pytest.raises(ValueError):
+        recorder.append({}, timestamp=1000)
+
+
+def test_missing_values():
+    recorder = Recorder(TAGS)
+    recorder.append({EcotouchTags.OUTSIDE_TEMPERATURE: 1.5}, timestamp=1)
+    recorder.append({EcotouchTags.OUTSIDE_TEMPERATURE: 2.5}, timestamp=2)
+    _, columns = recorder.range()
+    assert math.isnan(columns[EcotouchTags.HEATING_ENERGY_PRODUCED_YEAR][0])
+    assert columns[EcotouchTags.ADAPT_HEATING][0] == MISSING_INT
+    assert recorder.downsample(EcotouchTags.HEATING_ENERGY_PRODUCED_YEAR, 60) == []
+    assert recorder.downsample(EcotouchTags.OUTSIDE_TEMPERATURE, 60) == [(0, 2.0)]
+
+
+def test_downsample():
+    recorder = Recorder(TAGS)
+    record(recorder)
+    temperature = EcotouchTags.OUTSIDE_TEMPERATURE
+    assert recorder.downsample(temperature, 30) == [
+        (990, 5.5),
+        (1020, 8.0),
+        (1050, 11.0),
+        (1080, 13.5),
+    ]
+    assert recorder.downsample(temperature, 30, "max", start=1020) == [
+        (1020, 9.0),
+        (1050, 12.0),
+        (1080, 14.0),
+    ]
+    energy = EcotouchTags.HEATING_ENERGY_PRODUCED_YEAR
+    assert recorder.downsample(energy, 60, "delta") == [
+        (960, 2.0),
+        (1020, 10.0),
+        (1080, 2.0),
+    ]
+    assert recorder.downsample(energy, 60, "last") == [
+        (960, 102.0),
+        (1020, 114.0),
+        (1080, 118.0),
+    ]
+
+
+def test_file_backend(tmp_path):
+    path = str(tmp_path / "recording")
+    with Recorder(TAGS, path) as recorder:
+        record(recorder, count=5)
+        timestamps, columns = recorder.range(1010, 1030)
+        assert isinstance(timestamps, memoryview)
+        assert list(columns[EcotouchTags.OUTSIDE_TEMPERATURE]) == [6.0, 7.0, 8.0]
+        record(recorder, count=5, start=2000)
+        assert len(recorder.range()[0]) == 10
+
+    # a partially written row is dropped when reopening
+    with open(tmp_path / "recording" / "timestamp.d", "ab") as column_file:
+        column_file.write(b"\0" * 8)
+    with Recorder(TAGS, path) as recorder:
+        assert len(recorder) == 10
+        _, columns = recorder.range(2000)
+        assert list(columns[EcotouchTags.ADAPT_HEATING]) == [0, 1, 2, 3, 4]
+        # the last timestamp is known after reopening
+        with pytest.raises(ValueError, match="ascending"):
+            recorder.append({}, timestamp=2039)
+        recorder.append({}, timestamp=2040)
+
+    with pytest.raises(ValueError):
+        Recorder(TAGS[:2], path)
@@ -0,0 +1,108 @@
+import gzip
+import threading
+import time
+import pickle
+from dataclasses import FrozenInstanceError
+
+from pywaterkotte.ecotouch import EcotouchTags, TagData
+from pywaterkotte.registry import TAGS, TagRegistry, parse_tag_table
+import pytest
+
+TABLE = """# name\tregisters\tunit\tflags\tbit
+EXTRA_TEMPERATURE\tA900\t°C
+EXTRA_ENERGY\tA901,A902\tkWh
+EXTRA_SETPOINT\tI900\t\tw
+EXTRA_STATE\tI51\t\t\t7
+"""
+
+
+def test_tag_data_is_frozen_and_hashable():
+    tag = TagData(["A1"], "°C")
+    with pytest.raises(FrozenInstanceError):
+        tag.unit = "K"
+    assert tag == TagData(("A1",), "°C")
+    assert hash(tag) == hash(TagData(("A1",), "°C"))
+    assert TagData(["I51"], bit=0) != TagData(["I51"], bit=1)
+    assert tag.tags[0] is TagData(["A1"]).tags[0]
+    assert not hasattr(tag, "__dict__")
+    assert pickle.loads(pickle.dumps(EcotouchTags.STATE_COMPRESSOR)) == (
+        EcotouchTags.STATE_COMPRESSOR
+    )
+
+
+def test_default_registry():
+    assert TAGS["OUTSIDE_TEMPERATURE"] is EcotouchTags.OUTSIDE_TEMPERATURE
+    assert "OUTSIDE_TEMPERATURE" in TAGS
+    assert TAGS.get("NO_SUCH_TAG") is None
+    assert TAGS.name_of(EcotouchTags.STATE_COMPRESSOR) == "STATE_COMPRESSOR"
+    assert EcotouchTags.STATE_COMPRESSOR in TAGS.by_register("I51")
+    assert EcotouchTags.HEATING_ENERGY_PRODUCED_YEAR in TAGS.by_register("A453")
+    assert all(tag.tags[0].startswith("D") for tag in TAGS.by_prefix("D"))
+    assert len(TAGS) == len(list(TAGS))
+
+
+def test_tables_load_lazily(tmp_path):
+    path = tmp_path / "extended.tsv.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as table_file:
+        table_file.write(TABLE)
+    loads = []
+
+    def base():
+        loads.append("base")
+        return [("STATE_COMPRESSOR", EcotouchTags.STATE_COMPRESSOR)]
+
+    registry = TagRegistry([base])
+    registry.add_table_file(str(path))
+    assert loads == []
+    assert registry["EXTRA_ENERGY"] == TagData(["A901", "A902"], "kWh")
+    assert loads == ["base"]
+    assert registry["EXTRA_SETPOINT"].writeable
+    assert registry["EXTRA_STATE"].bit == 7
+    assert len(registry.by_register("I51")) == 2
+
+    registry.register("EXTRA_STATE", TagData(["I52"], bit=7))
+    assert len(registry.by_register("I51")) == 1
+    assert registry.by_register("I52") == [registry["EXTRA_STATE"]]
+
+
+def test_parse_tag_table_errors():
+    with pytest.raises(ValueError, match="line 2"):
+        parse_tag_table(["A\tA1", "broken"])
+    for line in ("NAME\t", "NAME\tA1,", "NAME\tA1,,A2", "NAME\tX1", "NAME\tI"):
+        with pytest.raises(ValueError, match="line 1: invalid register"):
+            parse_tag_table([line])
+
+
+def test_aliased_tags():
+    first, alias = TagData(["I51"], bit=3), TagData(["I51"], bit=3)
+    registry = TagRegistry()
+    registry.register("FIRST", first)
+    registry.register("ALIAS", alias)
+    assert registry.name_of(alias) == "FIRST"
+
+    registry.register("FIRST", TagData(["I52"]))
+    assert [tag is alias for tag in registry.by_register("I51")] == [True]
+    assert [tag is alias for tag in registry.by_prefix("I")] == [True, False]
+    assert registry.name_of(alias) == "ALIAS"
+
+
+def test_concurrent_load():
+    started = threading.Event()
+
+    def slow_table():
+        started.set()
+        for index in range(1, 1001):
+            if index == 2:
+                time.sleep(0.05)
+            yield f"TAG_{index}", TagData([f"A{index}"])
+
+    registry = TagRegistry([slow_table])
+    results = []
+    loader = threading.Thread(target=lambda: results.append(len(registry)))
+    loader.start()
+    started.wait()
+    # waits for the running load instead of seeing a partial registry
+    assert registry["TAG_1000"].tags == ("A1000",)
+    assert len(registry.by_prefix("A")) == 1000
+    loader.join()
+    assert results == [1000]
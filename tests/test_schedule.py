@@ -0,0 +1,117 @@
+import math
+
+from urllib.parse import parse_qsl, urlsplit
+
+from pywaterkotte.ecotouch import Ecotouch, EcotouchTags
+from pywaterkotte.protocol import TagStatusException
+from pywaterkotte.schedule import PollScheduler, tag_category
+import pytest
+import responses
+
+HOSTNAME = "hostname"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def requested_tags():
+    """registers requested by every readTags call so far"""
+    return [
+        [
+            value
+            for key, value in parse_qsl(urlsplit(call.request.url).query)
+            if key != "n"
+        ]
+        for call in responses.calls
+    ]
+
+
+def read_callback(request):
+    params = dict(parse_qsl(urlsplit(request.url).query))
+    body = "".join(
+        f"#{tag}\tS_OK\n192\t10896\n" for key, tag in params.items() if key != "n"
+    )
+    return (200, {}, body)
+
+
+@pytest.fixture
+def scheduler():
+    responses.add_callback(
+        responses.GET, f"http://{HOSTNAME}/cgi/readTags", callback=read_callback
+    )
+    clock = FakeClock()
+    return PollScheduler(
+        Ecotouch(HOSTNAME),
+        [
+            EcotouchTags.FIRMWARE_VERSION,
+            EcotouchTags.FLOW_TEMPERATURE,
+            EcotouchTags.RETURN_TEMPERATURE,
+        ],
+        intervals={EcotouchTags.RETURN_TEMPERATURE: 30},
+        clock=clock,
+        sleep=clock.sleep,
+    )
+
+
+def test_tag_category():
+    assert tag_category(EcotouchTags.BIOS_DATE) == "static"
+    assert tag_category(EcotouchTags.HEATING_ENERGY_PRODUCED_YEAR) == "counter"
+    assert tag_category(EcotouchTags.HOT_WATER_TEMPERATURE_SETPOINT) == "setting"
+    assert tag_category(EcotouchTags.FLOW_TEMPERATURE) == "measurement"
+
+
+@responses.activate
+def test_only_due_tags_are_read(scheduler):
+    ticks = iter(scheduler)
+    first = next(ticks)
+    assert set(first) == {
+        EcotouchTags.FIRMWARE_VERSION,
+        EcotouchTags.FLOW_TEMPERATURE,
+        EcotouchTags.RETURN_TEMPERATURE,
+    }
+    assert first[EcotouchTags.FIRMWARE_VERSION] == "01.08.96"
+    for _ in range(3):
+        next(ticks)
+    assert scheduler._clock() == 1030.0
+    assert requested_tags() == [
+        ["I1", "A12", "A11"],
+        ["A12"],
+        ["A12"],
+        ["A12", "A11"],
+    ]
+
+
+@responses.activate
+def test_callbacks(scheduler):
+    received = []
+    scheduler.subscribe(received.append)
+    scheduler.tick()
+    assert scheduler.tick() == {}
+    assert len(received) == 1
+    assert scheduler.next_due() == 1010.0
+
+
+@responses.activate
+def test_failed_tags_stay_due(scheduler):
+    responses.replace(
+        responses.GET, f"http://{HOSTNAME}/cgi/readTags", body="#A12\tE_INACTIVETAG\n"
+    )
+    with pytest.raises(TagStatusException):
+        scheduler.tick()
+    assert len(scheduler.due_tags()) == 3
+
+
+def test_no_tags():
+    clock = FakeClock()
+    scheduler = PollScheduler(Ecotouch(HOSTNAME), [], clock=clock, sleep=clock.sleep)
+    assert scheduler.next_due() == math.inf
+    assert scheduler.tick() == {}
+    assert list(scheduler) == []
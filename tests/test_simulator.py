@@ -0,0 +1,116 @@
+import io
+import threading
+import time
+
+from pywaterkotte.ecotouch import (
+    AuthenticationException,
+    ConnectionException,
+    Ecotouch,
+    EcotouchTags,
+    SessionExpiredException,
+)
+from pywaterkotte.simulator import Simulator, load_trace, trace_hook
+import pytest
+
+
+def test_read_write():
+    with Simulator() as simulator, Ecotouch(simulator.host) as wp:
+        with pytest.raises(AuthenticationException):
+            wp.login(password="wrong")
+        wp.login()
+        values = wp.read_values(
+            [
+                EcotouchTags.FIRMWARE_VERSION,
+                EcotouchTags.HOLIDAY_END_TIME,
+                EcotouchTags.OUTSIDE_TEMPERATURE,
+            ]
+        )
+        assert values[EcotouchTags.FIRMWARE_VERSION] == "01.08.96"
+        assert values[EcotouchTags.HOLIDAY_END_TIME].day == 15
+        wp.write_value(EcotouchTags.HOT_WATER_TEMPERATURE_SETPOINT, 48.5)
+        assert simulator.registers["A37"] == "485"
+        assert wp.read_value(EcotouchTags.HOT_WATER_TEMPERATURE_SETPOINT) == 48.5
+        assert wp.get_tag_description(EcotouchTags.OUTSIDE_TEMPERATURE, 1) == (
+            "outside temperature"
+        )
+        assert wp.decode_heatpump_series(1) == "DS 5023"
+
+
+def test_errors():
+    with Simulator(error_rate=1.0) as simulator, Ecotouch(simulator.host) as wp:
+        with pytest.raises(ConnectionException):
+            wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+
+
+def test_session_timeout():
+    with Simulator(session_timeout=0.05) as simulator, Ecotouch(simulator.host) as wp:
+        with pytest.raises(SessionExpiredException):
+            wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+        wp.login()
+        wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+        time.sleep(0.1)
+        # logs in again transparently
+        assert wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE) == 0.0
+        assert [path for path, _ in simulator.requests].count("/cgi/login") == 2
+
+
+def test_connection_limits():
+    with Simulator(max_connections=1, latency=0.2) as simulator:
+        with Ecotouch(simulator.host) as first, Ecotouch(
+            simulator.host, retries=0
+        ) as second:
+            results = []
+            thread = threading.Thread(
+                target=lambda: results.append(
+                    first.read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+                )
+            )
+            thread.start()
+            time.sleep(0.05)
+            with pytest.raises(ConnectionException):
+                second.read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+            thread.join()
+            assert results == [0.0]
+            assert simulator.max_in_flight == 1
+
+    with Simulator(requests_per_connection=1) as simulator, Ecotouch(
+        simulator.host
+    ) as wp:
+        for _ in range(3):
+            wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+
+
+def test_trace_replay():
+    trace_file = io.StringIO()
+    with Simulator() as simulator, Ecotouch(simulator.host) as wp:
+        wp.session.hooks["response"].append(trace_hook(trace_file))
+        simulator.registers["A1"] = "123"
+        wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+    trace_file.seek(0)
+    trace = load_trace(trace_file)
+    assert trace[0]["path"] == "/cgi/readTags"
+
+    with Simulator(trace=trace) as simulator, Ecotouch(simulator.host) as wp:
+        assert wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE) == 12.3
+        assert wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE_1H) == 0.0
+
+
+def test_trace_without_credentials():
+    trace_file = io.StringIO()
+    with Simulator(password="secret") as simulator, Ecotouch(simulator.host) as wp:
+        wp.session.hooks["response"].append(trace_hook(trace_file))
+        wp.login(password="secret")
+        wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE)
+        tokens = list(simulator.sessions)
+    recorded = trace_file.getvalue()
+    assert "secret" not in recorded
+    assert tokens and tokens[0] not in recorded
+    trace_file.seek(0)
+    trace = load_trace(trace_file)
+    assert trace[0]["path"] == "/cgi/login"
+    assert trace[0]["params"] == {}
+
+    # the recorded login is replayed for any credentials
+    with Simulator(trace=trace) as simulator, Ecotouch(simulator.host) as wp:
+        wp.login(password="other")
+        assert wp.read_value(EcotouchTags.OUTSIDE_TEMPERATURE) == 0.0
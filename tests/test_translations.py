@@ -0,0 +1,70 @@
+import os
+
+from pywaterkotte.ecotouch import Ecotouch, EcotouchTags
+from pywaterkotte.translations import TranslationTable, parse_translations
+import responses
+
+HOSTNAME = "hostname"
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "dictionary.js")
+
+
+def load_fixture():
+    with open(FIXTURE, encoding="utf-8") as fixture:
+        return fixture.read()
+
+
+def test_parse_translations():
+    table = parse_translations(load_fixture())
+    assert table["A1"] == (
+        "Außentemperatur",
+        "outside temperature",
+        "température extérieure",
+    )
+    assert table["A12"] == ("Vorlauftemperatur", "flow temperature", None)
+    assert table["I51_3"] == ("Verdichter",) * 3
+    assert table["I105"][0] == "Wärmepumpentyp"
+    assert table["Quote"][1] == 'he said "hello"'
+    # later assignments win
+    assert table["A3"][1] == "outside temperature 24h"
+    assert table["Empty"] == ("", "", "")
+
+
+def test_aliases_resolved_transitively():
+    table = parse_translations(load_fixture())
+    assert table["D420"] == ("Urlaub", "holiday", "vacances")
+    assert table["Holiday"] == table["D420"]
+    assert "Loop1" not in table
+    assert "Loop2" not in table
+    assert "Missing" not in table
+
+
+def test_table_is_compact():
+    table = parse_translations('lngA=["x","y","z"];lngB=["x","y","z"];lngC=lngA;')
+    assert len(table) == 3
+    # the alias shares the row of its target, equal texts are interned
+    de_texts = table._columns[0]
+    assert len(de_texts) == 2
+    assert de_texts[0] is de_texts[1]
+    assert table.text("C", 2) == "z"
+    assert table.text("unknown") is None
+
+
+def test_json_round_trip():
+    table = parse_translations(load_fixture())
+    assert dict(TranslationTable.from_json(table.to_json())) == dict(table)
+
+
+@responses.activate
+def test_tag_description():
+    responses.add(
+        responses.GET,
+        f"http://{HOSTNAME}/easycon/js/dictionary.js",
+        body=load_fixture(),
+    )
+    wp = Ecotouch(HOSTNAME)
+    assert wp.get_tag_description(EcotouchTags.OUTSIDE_TEMPERATURE, 1) == (
+        "outside temperature"
+    )
+    assert wp.get_tag_description(EcotouchTags.STATE_COMPRESSOR, 0) == "Verdichter"
+    assert wp.get_tag_description(EcotouchTags.FLOW_TEMPERATURE, 2) is None
+    assert wp.get_tag_description(EcotouchTags.HOLIDAY_ENABLED, 2) == "vacances"
@@ -0,0 +1,96 @@
+from array import array
+
+from pywaterkotte import vectorized
+from pywaterkotte.ecotouch import (
+    Ecotouch,
+    EcotouchTags,
+    InvalidValueException,
+    ReadPlan,
+    TagData,
+)
+from pywaterkotte.simulator import Simulator, default_registers
+from pywaterkotte.vectorized import (
+    BITS,
+    FLOAT32,
+    OTHER,
+    SCALED,
+    BulkDecoder,
+    decoder_kind,
+)
+import pytest
+
+ALL_TAGS = [tag for tag in vars(EcotouchTags).values() if isinstance(tag, TagData)]
+RAW = {
+    "A1": "-52",
+    "A444": "17877",
+    "A445": "-17979",
+    "I51": "170",
+    "I114": "12",
+    "I115": "345",
+    "D420": "1",
+}
+
+
+def raw_values(plan):
+    registers = default_registers()
+    registers.update(RAW)
+    return [registers[reg] for reg in plan.registers]
+
+
+def test_decoder_kind():
+    assert decoder_kind(EcotouchTags.OUTSIDE_TEMPERATURE) == SCALED
+    assert decoder_kind(EcotouchTags.HEATING_ENERGY_PRODUCED_YEAR) == FLOAT32
+    assert decoder_kind(EcotouchTags.STATE_COMPRESSOR) == BITS
+    assert decoder_kind(EcotouchTags.SERIAL_NUMBER) == OTHER
+    assert decoder_kind(EcotouchTags.HOLIDAY_START_TIME) == OTHER
+
+
+def test_decode_matches_plan():
+    pytest.importorskip("numpy")
+    plan = ReadPlan(ALL_TAGS)
+    values = raw_values(plan)
+    decoded = BulkDecoder(plan).decode(vectorized.to_int_array(values))
+    assert decoded == plan.decode(values)
+    assert list(decoded) == list(plan.tags)
+    assert decoded[EcotouchTags.OUTSIDE_TEMPERATURE] == -5.2
+    assert decoded[EcotouchTags.STATE_COMPRESSOR] is True
+
+
+def test_arrays():
+    numpy = pytest.importorskip("numpy")
+    plan = ReadPlan(
+        [
+            EcotouchTags.STATE_SOURCEPUMP,
+            EcotouchTags.STATE_HEATINGPUMP,
+            EcotouchTags.STATE_COMPRESSOR,
+        ]
+    )
+    tags, bits = BulkDecoder(plan).arrays(numpy.array([170]))[BITS]
+    assert tags == plan.tags
+    assert bits.tolist() == [False, True, True]
+
+    plan = ReadPlan([EcotouchTags.HOLIDAY_ENABLED])
+    with pytest.raises(InvalidValueException):
+        BulkDecoder(plan).decode(numpy.array([2]))
+
+
+def test_fallback_without_numpy(monkeypatch):
+    monkeypatch.setattr(vectorized, "np", None)
+    plan = ReadPlan(ALL_TAGS)
+    values = raw_values(plan)
+    raw = vectorized.to_int_array(values)
+    assert isinstance(raw, array)
+    assert BulkDecoder(plan).decode(raw) == plan.decode(values)
+
+
+def test_read_raw():
+    plan = ReadPlan([EcotouchTags.OUTSIDE_TEMPERATURE, EcotouchTags.ADAPT_HEATING])
+    with Simulator({"A1": "-52", "I263": "3"}) as simulator, Ecotouch(
+        simulator.host
+    ) as wp:
+        raw = wp.read_raw(plan)
+    assert list(raw) == [-52, 3]
+    assert BulkDecoder(plan).decode(raw) == {
+        EcotouchTags.OUTSIDE_TEMPERATURE: -5.2,
+        EcotouchTags.ADAPT_HEATING: 3,
+    }